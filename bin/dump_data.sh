@@ -50,7 +50,9 @@ cd "${DIR_REPO}"
 
 check_docker
 print_header 'Django dumpdata - Export LegalCode and Tool models'
+# --all: the default LegalCode manager defers the legal code HTML
 docker compose exec app python manage.py dumpdata \
+    --all \
     --format yaml \
     --indent 2 \
     --output "${DATA_FILE}" \
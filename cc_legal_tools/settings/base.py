@@ -364,3 +364,33 @@ TRANSLATION_REPOSITORY_DEPLOY_KEY = os.getenv(
 
 # This value may be overidden in dev settings
 PRETTIER_SLOW = False
+
+# Content-addressed cache of formatted (BeautifulSoup and Prettier) HTML used
+# by publish (keyed by the SHA-256 of the HTML formatter backend and version
+# and of the HTML before formatting). The least recently used entries are
+# removed once the cache exceeds the maximum size. (The tmp directory is
+# ignored by git.)
+FORMAT_CACHE_DIR = os.path.join(PROJECT_ROOT, "tmp", "format-cache")
+FORMAT_CACHE_MAX_SIZE = 256 * 1024 * 1024  # bytes
+
+# Cache of the RDF/XML element of each legal tool used by publish (keyed by
+# the fingerprint of the tool, its legal codes and its related tools). The
+# least recently used entries are removed once the cache exceeds the maximum
+# size. (The tmp directory is ignored by git.)
+RDF_CACHE_DIR = os.path.join(PROJECT_ROOT, "tmp", "rdf-cache")
+RDF_CACHE_MAX_SIZE = 64 * 1024 * 1024  # bytes
+
+# Prettier servers (the prettier service in docker-compose.yml). Hostnames are
+# resolved to all of their addresses so that requests are balanced across the
+# service replicas. This value may be overidden in dev settings
+PRETTIER_ENDPOINTS = ["http://prettier:3000"]
+
+# HTML formatter backend:
+#   "prettier" - Prettier servers (or the prettier command if PRETTIER_SLOW)
+#   "python"   - in-process formatter (legal_tools/html_formatter.py) that
+#                follows Prettier's layout, but only re-indents inline
+#                JavaScript and CSS (its output differs from Prettier's in the
+#                contents of <script> and <style> elements, so switching the
+#                backend changes the published pages)
+# This value may be overidden in dev settings
+HTML_FORMATTER = "prettier"
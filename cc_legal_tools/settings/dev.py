@@ -8,6 +8,7 @@
 # Standard library
 import os
 import sys
+import tempfile
 
 # Third-party
 from django.core.management.utils import get_random_secret_key
@@ -63,6 +64,15 @@ if (
         "debug_toolbar.middleware.DebugToolbarMiddleware",
     ]
 
+if "test" in sys.argv:
+    # Keep the caches written by the tests out of the repository
+    FORMAT_CACHE_DIR = os.path.join(
+        tempfile.gettempdir(), "cc-legal-tools-tests", "format-cache"
+    )
+    RDF_CACHE_DIR = os.path.join(
+        tempfile.gettempdir(), "cc-legal-tools-tests", "rdf-cache"
+    )
+
 PRETTIER_SLOW = os.getenv("PRETTIER_SLOW", False)
 if PRETTIER_SLOW and PRETTIER_SLOW.lower() in (
     "1",
@@ -75,3 +85,9 @@ if PRETTIER_SLOW and PRETTIER_SLOW.lower() in (
     PRETTIER_SLOW = True
 else:
     PRETTIER_SLOW = False
+
+# Comma separated list of Prettier server URLs
+if os.getenv("PRETTIER_ENDPOINTS"):
+    PRETTIER_ENDPOINTS = os.getenv("PRETTIER_ENDPOINTS").split(",")
+
+HTML_FORMATTER = os.getenv("HTML_FORMATTER", HTML_FORMATTER)  # noqa: F405
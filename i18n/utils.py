@@ -23,6 +23,9 @@ from i18n import (
 
 CACHED_APPLICABLE_LANGS = {}
 CACHED_WELL_TRANSLATED_LANGS = {}
+# Translation objects loaded by preload_translation_objects(), keyed by
+# (domain, language_code, language_default)
+PRELOADED_TRANSLATION_OBJECTS = {}
 
 
 # def get_locale_dir(locale_name):
@@ -79,6 +82,11 @@ def get_translation_object(
     translation system that could change on us.  It doesn't seem likely,
     though.
     """
+    preloaded = PRELOADED_TRANSLATION_OBJECTS.get(
+        (domain, language_code, language_default)
+    )
+    if preloaded:
+        return preloaded
 
     # Start with a translation object for the domain for this tool.
     tool_translation_object = translation.trans_real.DjangoTranslation(
@@ -105,6 +113,18 @@ def get_translation_object(
     return tool_translation_object
 
 
+def preload_translation_objects(keys):
+    """
+    Load the translation objects for the (domain, language_code,
+    language_default) keys so that get_translation_object() returns them
+    without reading the translation files again. The objects are shared, so
+    they must not be modified.
+    """
+    for key in keys:
+        if key not in PRELOADED_TRANSLATION_OBJECTS:
+            PRELOADED_TRANSLATION_OBJECTS[key] = get_translation_object(*key)
+
+
 @contextmanager
 def active_translation(
     translation_object: translation.trans_real.DjangoTranslation,
@@ -0,0 +1,243 @@
+"""
+Offline emulation of the Apache2 redirects configuration written by the
+publish command (config/language-redirects), so that it can be verified
+without deploying it.
+
+Only the subset of directives that the publish command writes is supported:
+- RedirectMatch 301 with an anchored pattern
+- RewriteMap with a txt or dbm map
+- RewriteCond on %{REQUEST_URI}, a RewriteMap lookup, or a file test (-f, -l,
+  -d) of %{REQUEST_FILENAME}
+- RewriteRule with the R=301 flag
+
+Directives are evaluated in the order of the configuration (the order of its
+steps) and the first redirect wins. The RedirectMatch directives are compiled
+into a RedirectMatchResolver (see redirect_utils) and %{REQUEST_FILENAME} is
+the path of the document root that the URL path maps to.
+"""
+
+# Standard library
+import dbm
+import os
+import re
+
+# First-party/Local
+from legal_tools.redirect_utils import RedirectMatchResolver
+
+RE_ARGUMENT = re.compile(r'"((?:[^"\\]|\\.)*)"|(\S+)')
+RE_DEFINE = re.compile(r"\$\{(\w+)\}")
+RE_MAP_LOOKUP = re.compile(r"\$\{([^:}]+):([^|}]*)(?:\|([^}]*))?\}")
+RE_REFERENCE = re.compile(r"([$%])([0-9])")
+RE_VARIABLE = re.compile(r"%\{([A-Z_]+)\}")
+FILE_TESTS = ("-d", "-f", "-l")
+
+
+def split_arguments(line):
+    """
+    Split the arguments of a directive (double quoted arguments may contain
+    whitespace).
+    """
+    return [
+        quoted if quoted else bare
+        for quoted, bare in RE_ARGUMENT.findall(line)
+    ]
+
+
+def load_rewrite_map(map_type, path):
+    """
+    Return the RewriteMap of the file as a dict.
+    """
+    if map_type == "txt":
+        rewrite_map = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                fields = line.split("#", 1)[0].split()
+                if len(fields) >= 2:
+                    rewrite_map.setdefault(fields[0], fields[1])
+        return rewrite_map
+    if map_type == "dbm":
+        try:
+            with dbm.open(path, "r") as db:
+                return {
+                    key.decode("utf-8"): db[key].decode("utf-8")
+                    for key in db.keys()
+                }
+        except dbm.error as e:
+            raise ValueError(f"Unable to open RewriteMap {path}: {e}")
+    raise ValueError(f"Unsupported RewriteMap type: {map_type}")
+
+
+class RewriteRule:
+    """
+    A RewriteRule that redirects, with its RewriteCond conditions (each a
+    test string, a compiled pattern or file test, and whether it is negated).
+    """
+
+    def __init__(self, pattern, substitution, conditions):
+        self.regex = re.compile(pattern)
+        self.substitution = substitution
+        self.conditions = conditions
+
+
+class RedirectConfig:
+    """
+    Resolve URL paths like Apache2 with the redirects configuration.
+
+    defines are the variables of the Define directives used by the
+    configuration (ex. CC_LEGAL_TOOLS_CONFIG).
+    """
+
+    def __init__(self, lines, document_root, defines=None):
+        self.document_root = document_root
+        self.defines = defines or {}
+        self.maps = {}
+        # RedirectMatchResolver or RewriteRule, in order
+        self.handlers = []
+        redirect_pairs = []
+        conditions = []
+        for number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            directive, *arguments = split_arguments(
+                RE_DEFINE.sub(self.substitute_define, line)
+            )
+            try:
+                if directive == "RedirectMatch":
+                    redirect_pairs.append(self.parse_redirect(arguments))
+                    continue
+                if redirect_pairs:
+                    self.handlers.append(RedirectMatchResolver(redirect_pairs))
+                    redirect_pairs = []
+                if directive == "RewriteMap":
+                    self.parse_rewrite_map(arguments)
+                elif directive == "RewriteCond":
+                    conditions.append(self.parse_condition(arguments))
+                elif directive == "RewriteRule":
+                    self.handlers.append(
+                        self.parse_rule(arguments, conditions)
+                    )
+                    conditions = []
+                else:
+                    raise ValueError(f"Unsupported directive: {directive}")
+            except (IndexError, re.error, ValueError) as e:
+                raise ValueError(f"Line {number}: {line}: {e}")
+        if redirect_pairs:
+            self.handlers.append(RedirectMatchResolver(redirect_pairs))
+
+    @classmethod
+    def from_file(cls, path, document_root, defines=None):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(f.read().splitlines(), document_root, defines)
+
+    def substitute_define(self, match):
+        # Map lookups (ex. ${map:key}) are not defines
+        return self.defines.get(match.group(1), match.group(0))
+
+    def parse_redirect(self, arguments):
+        status, pattern, destination = arguments
+        if status not in ("301", "permanent"):
+            raise ValueError(f"Unsupported status: {status}")
+        if not pattern.startswith("^") or not pattern.endswith("$"):
+            raise ValueError(f"Unanchored pattern: {pattern}")
+        return [pattern[1:-1], destination]
+
+    def parse_rewrite_map(self, arguments):
+        name, source = arguments
+        map_type, path = source.split(":", 1)
+        self.maps[name] = load_rewrite_map(map_type, path)
+
+    def parse_condition(self, arguments):
+        test_string, pattern = arguments[:2]
+        negated = pattern.startswith("!")
+        pattern = pattern.removeprefix("!")
+        if pattern not in FILE_TESTS:
+            pattern = re.compile(pattern)
+        return test_string, pattern, negated
+
+    def parse_rule(self, arguments, conditions):
+        pattern, substitution, flags = arguments
+        flags = flags.strip("[]").split(",")
+        if "R=301" not in flags:
+            raise ValueError(f"Unsupported flags: {','.join(flags)}")
+        return RewriteRule(pattern, substitution, conditions)
+
+    def expand(self, string, path, rule_match, condition_match):
+        """
+        Expand the server variables, the $N (rule) and %N (condition)
+        backreferences, and the RewriteMap lookups of the string.
+        """
+
+        def reference(match):
+            source = rule_match if match.group(1) == "$" else condition_match
+            if source is None:
+                return ""
+            return source.group(int(match.group(2))) or ""
+
+        def lookup(match):
+            name, key, default = match.groups()
+            return self.maps[name].get(key, default or "")
+
+        string = RE_VARIABLE.sub(
+            lambda match: self.get_variable(match.group(1), path), string
+        )
+        string = RE_REFERENCE.sub(reference, string)
+        return RE_MAP_LOOKUP.sub(lookup, string)
+
+    def get_variable(self, name, path):
+        if name == "REQUEST_URI":
+            return path
+        if name == "REQUEST_FILENAME":
+            return os.path.join(self.document_root, path.lstrip("/"))
+        raise ValueError(f"Unsupported server variable: {name}")
+
+    def apply_rule(self, rule, path):
+        rule_match = rule.regex.search(path)
+        if not rule_match:
+            return None
+        condition_match = None
+        for test_string, pattern, negated in rule.conditions:
+            value = self.expand(test_string, path, rule_match, condition_match)
+            if pattern == "-d":
+                result = os.path.isdir(value)
+            elif pattern == "-f":
+                result = os.path.isfile(value)
+            elif pattern == "-l":
+                result = os.path.islink(value)
+            else:
+                match = pattern.search(value)
+                result = match is not None
+                if match and not negated:
+                    condition_match = match
+            if result == negated:
+                return None
+        return self.expand(
+            rule.substitution, path, rule_match, condition_match
+        )
+
+    def resolve(self, path):
+        """
+        Return the redirect destination of the path (or None).
+        """
+        for handler in self.handlers:
+            if isinstance(handler, RewriteRule):
+                destination = self.apply_rule(handler, path)
+            else:
+                destination = handler.resolve(path)
+            if destination is not None:
+                return destination
+        return None
+
+
+def check_redirects(config, expected):
+    """
+    Return the paths (expected maps each path to its expected destination or
+    None) that the configuration resolves differently, with both
+    destinations.
+    """
+    mismatches = []
+    for path, destination in expected.items():
+        actual = config.resolve(path)
+        if actual != destination:
+            mismatches.append((path, destination, actual))
+    return mismatches
@@ -16,7 +16,12 @@ class LegalToolsConfig(AppConfig):
     verbose_name = name.replace("_", " ").title()
 
     def ready(self):
+        # Imported here as the models must be loaded first
+        # First-party/Local
+        from legal_tools.rdf_utils import connect_rdf_cache_signals
+
         setup_to_call_git()
+        connect_rdf_cache_signals()
 
         # Normalize all currently loaded language information using Babel
         for language_code in settings.LANG_INFO.keys():
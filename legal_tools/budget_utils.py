@@ -0,0 +1,196 @@
+"""
+Query budgets of the views.
+
+Each URL pattern (see urls.py) declares the maximum number of database queries
+that rendering one of its URLs may run (see query_budget):
+- queries: from the database (ex. the development server)
+- published: with the publish registry active (the publish tasks, see
+  publish_utils.warm_up and legal_tools.registry)
+
+The budgets are fixed numbers, measured on the URL sample (see
+get_sample_urls) with the test data. They only catch an N+1 query if the
+sample has enough tools to exceed them, so the tests also render the sample
+with 3 and 6 tools in each group and check that the maximum count of each
+URL pattern does not grow. The URL sample is checked by the tests and by the
+check_query_budgets command.
+"""
+
+# Standard library
+import time
+
+# Third-party
+from django.conf import settings
+from django.db import connection
+from django.http import Http404
+from django.urls import URLResolver, get_resolver, reverse
+
+# First-party/Local
+import legal_tools.models
+from legal_tools.utils import MockRequest
+
+# Legal codes (of distinct tools) of each valid group in the URL sample
+SAMPLE_LEGAL_CODES = 3
+
+
+class QueryBudget:
+    """
+    Maximum number of database queries to render a URL.
+    """
+
+    def __init__(self, queries, published):
+        self.queries = queries
+        self.published = published
+
+    def get_limit(self, published=False):
+        return self.published if published else self.queries
+
+
+def query_budget(pattern, queries, published=None):
+    """
+    Declare the query budget of the URL pattern (published defaults to
+    queries) and return the pattern.
+    """
+    if published is None:
+        published = queries
+    pattern.query_budget = QueryBudget(queries, published)
+    return pattern
+
+
+def get_query_budgets(resolver=None):
+    """
+    Return the query budget of each named URL pattern (of the resolver and of
+    its included URLconfs) that declares one.
+    """
+    if resolver is None:
+        resolver = get_resolver()
+    budgets = {}
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            budgets.update(get_query_budgets(pattern))
+        elif pattern.name and hasattr(pattern, "query_budget"):
+            budgets[pattern.name] = pattern.query_budget
+    return budgets
+
+
+class QueryRecorder:
+    """
+    Count and time the database queries (a database execute wrapper).
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start_time = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.seconds += time.perf_counter() - start_time
+
+
+class QueryCount:
+    """
+    The database queries run to render a URL and its query budget limit
+    (None if its URL pattern does not declare a budget).
+    """
+
+    def __init__(self, url, name, status_code, queries, seconds, limit):
+        self.url = url
+        self.name = name
+        self.status_code = status_code
+        self.queries = queries
+        self.seconds = seconds
+        self.limit = limit
+
+    @property
+    def exceeded(self):
+        return self.limit is not None and self.queries > self.limit
+
+
+def count_queries(urls, published=False):
+    """
+    Render each of the URLs (like save_url_as_static_file) and return their
+    QueryCount. published selects the budget limits of the publish tasks
+    (the caller activates the publish registry).
+    """
+    resolver = get_resolver()
+    budgets = get_query_budgets(resolver)
+    counts = []
+    for url in urls:
+        match = resolver.resolve(url)
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            try:
+                rsp = match.func(
+                    request=MockRequest(url), *match.args, **match.kwargs
+                )
+                status_code = rsp.status_code
+            except Http404:
+                status_code = 404
+        budget = budgets.get(match.url_name)
+        counts.append(
+            QueryCount(
+                url,
+                match.url_name,
+                status_code,
+                recorder.queries,
+                recorder.seconds,
+                budget.get_limit(published) if budget else None,
+            )
+        )
+    return counts
+
+
+def get_sample_urls(language_codes=None, legal_codes=SAMPLE_LEGAL_CODES):
+    """
+    Return a representative sample of the published URLs: the metadata, the
+    lists and the RDF/XML documents, the deed, legal code and RDF/XML of the
+    first legal_codes tools of each valid group (see validgroups), and the
+    dev index. language_codes are the languages of the lists (default: the
+    default language and the first mostly translated language).
+    """
+    if language_codes is None:
+        language_codes = [settings.LANGUAGE_CODE]
+        language_codes += [
+            language_code
+            for language_code in settings.LANGUAGES_MOSTLY_TRANSLATED[:1]
+            if language_code != settings.LANGUAGE_CODE
+        ]
+    urls = [
+        reverse("metadata_csv"),
+        reverse("view_legal_tool_rdf_index"),
+        reverse("view_image_rdf"),
+    ]
+    for category in ["licenses", "publicdomain"]:
+        urls.append(reverse("view_list", kwargs={"category": category}))
+        for language_code in language_codes:
+            urls.append(
+                reverse(
+                    "view_list_language_specified",
+                    kwargs={
+                        "category": category,
+                        "language_code": language_code,
+                    },
+                )
+            )
+    LegalCode = legal_tools.models.LegalCode
+    for queryset in LegalCode.objects.validgroups().values():
+        tool_ids = set()
+        for legal_code in queryset.select_related("tool").order_by("id"):
+            if legal_code.tool_id in tool_ids:
+                continue
+            tool_ids.add(legal_code.tool_id)
+            urls.append(legal_code.deed_url)
+            if not legal_code.tool.deed_only:
+                urls.append(legal_code.legal_code_url)
+            urls.append(
+                legal_tools.models.build_path(legal_code.tool.base_url, "rdf")
+            )
+            if len(tool_ids) == legal_codes:
+                break
+    # The dev index reloads the Deeds & UX translations (see
+    # load_deeds_ux_translations), so it is rendered last
+    urls.append(reverse("dev_index"))
+    return urls
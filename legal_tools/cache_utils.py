@@ -0,0 +1,75 @@
+"""
+On-disk content-addressed store shared by the publish caches (see
+format_utils.FormatCache and rdf_utils.RdfCache).
+"""
+
+# Standard library
+import os
+import tempfile
+
+
+class DiskCache:
+    """
+    On-disk content-addressed store. Entries are stored in files named by
+    their key (a hex digest computed by the caller from the content that the
+    entry is derived from). The modification time of an entry is updated when
+    it is used so that the least recently used entries are removed first by
+    prune().
+    """
+
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+
+    def get_path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        path = self.get_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def put(self, key, data):
+        path = self.get_path(key)
+        dirname = os.path.dirname(path)
+        os.makedirs(dirname, exist_ok=True)
+        # Write to a temporary file and rename it so that concurrent workers
+        # never read a partially written entry
+        fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def prune(self):
+        """
+        Remove the least recently used entries until the total size of the
+        cache doesn't exceed max_size. Returns the number of removed entries.
+        """
+        entries = []
+        total_size = 0
+        for dirpath, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:  # pragma: no cover
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+                total_size += stat.st_size
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            os.remove(path)
+            total_size -= size
+            removed += 1
+        return removed
@@ -0,0 +1,149 @@
+"""
+Pre-compressed siblings (ex. deed.en.html.gz) of the published files.
+
+Static file servers can send the siblings instead of compressing each
+response (ex. nginx gzip_static, Apache MultiViews). Siblings are only
+rewritten when the SHA-256 of their file changed since they were written (see
+CompressManifest).
+"""
+
+# Standard library
+import gzip
+import hashlib
+import json
+import logging
+import os
+
+# First-party/Local
+from legal_tools.utils import get_output_sync, save_bytes_to_file
+
+try:
+    # Third-party
+    import brotli
+except ImportError:
+    brotli = None
+
+LOG = logging.getLogger(__name__)
+COMPRESS_MANIFEST_FILENAME = "compress-manifest.json"
+COMPRESS_EXTENSIONS = (".csv", ".html", ".rdf")
+# RDF/XML of each tool is published without an extension
+COMPRESS_FILENAMES = ("rdf",)
+# Smaller files are not worth compressing (see nginx gzip_min_length)
+COMPRESS_MIN_SIZE = 1024
+ENCODINGS = {".gz": "gzip", ".br": "brotli"}
+
+
+def get_suffixes():
+    """
+    Return the suffixes of the siblings to write (brotli siblings require the
+    brotli package).
+    """
+    if brotli is None:
+        return [".gz"]
+    return [".gz", ".br"]
+
+
+def is_compressible(filename):
+    return (
+        filename.endswith(COMPRESS_EXTENSIONS)
+        or filename in COMPRESS_FILENAMES
+    )
+
+
+def compress_bytes(data, suffix):
+    if suffix == ".gz":
+        # mtime=0 keeps the output identical for identical content
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if suffix == ".br":
+        return brotli.compress(data, mode=brotli.MODE_TEXT)
+    raise ValueError(f"Unknown compression suffix: {suffix}")
+
+
+def compress_file(output_dir, relpath, digest):
+    """
+    Write the compressed siblings of the file unless its SHA-256 is still
+    digest (the SHA-256 of the file when they were written) and they exist.
+
+    Returns the relpath and SHA-256 of the file, its size, the size of each
+    sibling (by suffix), and whether the siblings were written.
+    """
+    path = os.path.join(output_dir, relpath)
+    with open(path, "rb") as f:
+        data = f.read()
+    file_digest = hashlib.sha256(data).hexdigest()
+    suffixes = get_suffixes()
+    current = file_digest == digest and all(
+        os.path.isfile(f"{path}{suffix}") for suffix in suffixes
+    )
+    sizes = {}
+    output_sync = get_output_sync()
+    for suffix in suffixes:
+        sibling = f"{path}{suffix}"
+        if current:
+            if output_sync:
+                output_sync.record(sibling)
+            sizes[suffix] = os.path.getsize(sibling)
+        else:
+            compressed = compress_bytes(data, suffix)
+            save_bytes_to_file(compressed, sibling)
+            sizes[suffix] = len(compressed)
+    return relpath, file_digest, len(data), sizes, not current
+
+
+class CompressManifest:
+    """
+    SHA-256 of each compressed file (by relpath) when its siblings were last
+    written.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.digests = {}
+        try:
+            with open(self.path, "rb") as f:
+                self.digests = json.loads(f.read().decode("utf-8"))
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            LOG.warning(f"Ignoring invalid compress manifest: {self.path}")
+
+    def save(self):
+        content = json.dumps(self.digests, indent=2, sort_keys=True)
+        save_bytes_to_file(f"{content}\n".encode("utf-8"), self.path)
+
+
+class CompressReport:
+    """
+    Totals of the compressed files and siblings, by suffix.
+    """
+
+    def __init__(self):
+        self.written = 0
+        self.unchanged = 0
+        self.totals = {}
+
+    def add(self, size, sizes, written):
+        if written:
+            self.written += 1
+        else:
+            self.unchanged += 1
+        for suffix, compressed_size in sizes.items():
+            totals = self.totals.setdefault(suffix, [0, 0, 0])
+            totals[0] += 1
+            totals[1] += size
+            totals[2] += compressed_size
+
+    def get_lines(self):
+        lines = [
+            f"Compressed {self.written} changed files (skipped"
+            f" {self.unchanged} unchanged files)"
+        ]
+        for suffix, (count, size, compressed_size) in sorted(
+            self.totals.items()
+        ):
+            ratio = compressed_size / size if size else 0
+            lines.append(
+                f"{ENCODINGS[suffix]}: {count} files, {size} bytes to"
+                f" {compressed_size} bytes ({ratio:.1%})"
+            )
+        return lines
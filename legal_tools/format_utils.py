@@ -0,0 +1,427 @@
+# Standard library
+import hashlib
+import logging
+import os
+import socket
+import subprocess
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+# Third-party
+import requests
+from bs4 import BeautifulSoup
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from requests.adapters import HTTPAdapter
+
+# First-party/Local
+from legal_tools.cache_utils import DiskCache
+from legal_tools.html_formatter import HTML_FORMATTER_VERSION, format_html
+from legal_tools.timing_utils import timed
+
+LOG = logging.getLogger(__name__)
+HTML_FORMATTERS = ("prettier", "python")
+PRETTIER_TIMEOUT = 5
+# Seconds allowed per document of a batch request
+PRETTIER_BATCH_TIMEOUT = 2
+# Attempts per request (5xx responses and connection errors are retried on
+# the next endpoint after a backoff of PRETTIER_BACKOFF * 2**retry seconds)
+PRETTIER_ATTEMPTS = 3
+PRETTIER_BACKOFF = 0.25
+# An endpoint is skipped for PRETTIER_UNHEALTHY_SECONDS after this many
+# consecutive failures
+PRETTIER_UNHEALTHY_FAILURES = 3
+PRETTIER_UNHEALTHY_SECONDS = 10
+# Keep-alive connections per endpoint
+PRETTIER_POOL_SIZE = 4
+
+_local = threading.local()
+# Format cache of this process (see init_format_cache)
+_cache = None
+# Prettier client of this process (see get_prettier_client)
+_client = None
+
+
+def clean_html_bytes(html_bytes):
+    """
+    Clean-up HTML using BeautifulSoup4
+    """
+    if not isinstance(html_bytes, bytes):
+        html_bytes = html_bytes.encode("utf-8")
+    return BeautifulSoup(html_bytes, features="lxml").encode()
+
+
+def get_html_formatter():
+    """
+    Return the name of the HTML formatter backend (HTML_FORMATTER setting).
+    """
+    formatter = settings.HTML_FORMATTER
+    if formatter not in HTML_FORMATTERS:
+        raise ImproperlyConfigured(
+            f"Invalid HTML_FORMATTER: {formatter!r} (valid values:"
+            f" {', '.join(HTML_FORMATTERS)})"
+        )
+    return formatter
+
+
+def format_html_bytes(data):
+    """
+    Format HTML using the configured backend
+    """
+    if get_html_formatter() == "python":
+        return format_html(data.decode("utf-8")).encode("utf-8")
+    return prettier_html_bytes(data)
+
+
+def prettier_html_bytes(data):  # pragma: no cover
+    """
+    Format HTML using Prettier
+    """
+    if settings.PRETTIER_SLOW:
+        # This logic path should only used by GitHub Actions
+        # (The multiple Prettier container model, below, is about 25% faster)
+        cmd = "prettier --parser html".split()
+        completed = subprocess.run(cmd, input=data, capture_output=True)
+        return completed.stdout
+    else:
+        response = get_prettier_client().post(
+            "/",
+            data=data,
+            headers={"Content-Type": "text/html"},
+            timeout=PRETTIER_TIMEOUT,
+        )
+        return response.content
+
+
+def encode_frames(documents):
+    """
+    Encode documents (bytes) as a sequence of frames: the byte length of the
+    document as a decimal number, a newline, and the document.
+    """
+    frames = []
+    for document in documents:
+        frames.append(f"{len(document)}\n".encode("ascii"))
+        frames.append(document)
+    return b"".join(frames)
+
+
+def decode_frames(data):
+    """
+    Decode a sequence of frames (see encode_frames) into a list of documents.
+    """
+    documents = []
+    offset = 0
+    while offset < len(data):
+        separator = data.find(b"\n", offset)
+        if separator == -1:
+            raise ValueError(f"Invalid frame header at byte {offset}")
+        start = separator + 1
+        end = start + int(data[offset:separator])
+        if end > len(data):
+            raise ValueError(f"Invalid frame length at byte {offset}")
+        documents.append(data[start:end])
+        offset = end
+    return documents
+
+
+def format_html_batch(documents):  # pragma: no cover
+    """
+    Format a list of HTML documents using a single Prettier batch request
+    """
+    response = get_prettier_client().post(
+        "/batch",
+        data=encode_frames(documents),
+        headers={"Content-Type": "application/octet-stream"},
+        timeout=PRETTIER_TIMEOUT + PRETTIER_BATCH_TIMEOUT * len(documents),
+    )
+    formatted = decode_frames(response.content)
+    if len(formatted) != len(documents):
+        raise ValueError(
+            f"Prettier batch returned {len(formatted)} documents for"
+            f" {len(documents)} requested"
+        )
+    return formatted
+
+
+def expand_endpoints(endpoints):
+    """
+    Return the endpoint URLs with each hostname replaced by each of its
+    addresses (a Docker Compose service name resolves to the addresses of all
+    of its replicas). Endpoints that can't be resolved are returned as is.
+    """
+    expanded = []
+    for endpoint in endpoints:
+        parts = urlsplit(endpoint.rstrip("/"))
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        try:
+            addresses = socket.getaddrinfo(
+                parts.hostname, port, type=socket.SOCK_STREAM
+            )
+        except socket.gaierror:
+            LOG.warning(f"Unable to resolve Prettier endpoint: {endpoint}")
+            addresses = []
+        urls = []
+        for family, _, _, _, sockaddr in addresses:
+            host = sockaddr[0]
+            if family == socket.AF_INET6:
+                host = f"[{host}]"
+            url = urlunsplit(
+                (parts.scheme, f"{host}:{port}", parts.path, "", "")
+            )
+            if url not in urls:
+                urls.append(url)
+        for url in urls or [urlunsplit(parts)]:
+            if url not in expanded:
+                expanded.append(url)
+    return expanded
+
+
+class PrettierEndpoint:
+    def __init__(self, url):
+        self.url = url
+        self.outstanding = 0
+        self.failures = 0
+        self.unhealthy_until = 0
+
+    def is_healthy(self, now):
+        return self.unhealthy_until <= now
+
+    def record_success(self):
+        self.failures = 0
+        self.unhealthy_until = 0
+
+    def record_failure(self, now):
+        self.failures += 1
+        if self.failures >= PRETTIER_UNHEALTHY_FAILURES:
+            self.unhealthy_until = now + PRETTIER_UNHEALTHY_SECONDS
+
+
+class PrettierClient:
+    """
+    HTTP client for the Prettier servers. Connections are kept alive in a
+    pool, each request is sent to the healthy endpoint with the fewest
+    outstanding requests (ties are broken round-robin), and requests that
+    fail with a 5xx response or a connection error are retried with backoff.
+    """
+
+    def __init__(self, endpoints):
+        self.endpoints = [PrettierEndpoint(url) for url in endpoints]
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.next_index = 0
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=len(self.endpoints),
+            pool_maxsize=PRETTIER_POOL_SIZE,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def acquire(self):
+        """
+        Select an endpoint and count the request as outstanding.
+        """
+        with self.lock:
+            now = time.monotonic()
+            count = len(self.endpoints)
+            # Round-robin order starting after the previously used endpoint
+            ordered = [
+                self.endpoints[(self.next_index + i) % count]
+                for i in range(count)
+            ]
+            healthy = [e for e in ordered if e.is_healthy(now)]
+            if healthy:
+                endpoint = min(healthy, key=lambda e: e.outstanding)
+            else:
+                # Try the endpoint that will recover soonest
+                endpoint = min(ordered, key=lambda e: e.unhealthy_until)
+            self.next_index = (self.endpoints.index(endpoint) + 1) % count
+            endpoint.outstanding += 1
+            return endpoint
+
+    def release(self, endpoint, success):
+        with self.lock:
+            endpoint.outstanding -= 1
+            if success:
+                endpoint.record_success()
+            else:
+                endpoint.record_failure(time.monotonic())
+
+    def get(self, path, **kwargs):
+        """
+        GET path and return the response (see send).
+        """
+        return self.send(self.session.get, path, **kwargs)
+
+    def post(self, path, **kwargs):
+        """
+        POST to path and return the response (see send).
+        """
+        return self.send(self.session.post, path, **kwargs)
+
+    def send(self, method, path, **kwargs):
+        """
+        Send the request with the session method and return the response.
+        Raises requests.HTTPError for 4xx responses (ex. HTML that Prettier
+        can't parse) and for 5xx responses after the last attempt.
+        """
+        for attempt in range(PRETTIER_ATTEMPTS):
+            if attempt:
+                time.sleep(PRETTIER_BACKOFF * 2 ** (attempt - 1))
+            endpoint = self.acquire()
+            try:
+                response = method(f"{endpoint.url}{path}", **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.release(endpoint, success=False)
+                LOG.warning(f"Prettier request to {endpoint.url} failed: {e}")
+                if attempt + 1 == PRETTIER_ATTEMPTS:
+                    raise
+                continue
+            if response.status_code >= 500:
+                self.release(endpoint, success=False)
+                LOG.warning(
+                    f"Prettier request to {endpoint.url} failed: status"
+                    f" {response.status_code}"
+                )
+                if attempt + 1 == PRETTIER_ATTEMPTS:
+                    response.raise_for_status()
+                continue
+            self.release(endpoint, success=True)
+            response.raise_for_status()
+            return response
+
+
+def get_prettier_client():
+    """
+    Return the Prettier client of this process (connections aren't shared with
+    forked processes).
+    """
+    global _client
+    if _client is None or _client.pid != os.getpid():
+        _client = PrettierClient(expand_endpoints(settings.PRETTIER_ENDPOINTS))
+    return _client
+
+
+def get_prettier_version():
+    """
+    Return the version of Prettier (of the prettier command if PRETTIER_SLOW,
+    otherwise of the Prettier servers).
+    """
+    if settings.PRETTIER_SLOW:  # pragma: no cover
+        completed = subprocess.run(
+            ["prettier", "--version"],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        return completed.stdout.strip()
+    response = get_prettier_client().get("/version", timeout=PRETTIER_TIMEOUT)
+    return response.text.strip()
+
+
+def get_format_cache_namespace():
+    """
+    Return the namespace of the format cache keys: the HTML formatter backend
+    and its version, so that HTML formatted by another backend or version
+    (ex. before upgrading Prettier) is not used.
+    """
+    formatter = get_html_formatter()
+    if formatter == "python":
+        version = HTML_FORMATTER_VERSION
+    else:
+        version = get_prettier_version()
+    return f"{formatter} {version}"
+
+
+class FormatQueue:
+    """
+    Accumulate cleaned HTML documents with their output filenames and format
+    them using one Prettier batch request per batch_size documents.
+    """
+
+    def __init__(self, batch_size, write, format_batch=format_html_batch):
+        self.batch_size = batch_size
+        self.write = write
+        self.format_batch = format_batch
+        self.pending = []
+
+    def add(self, output_filename, data, cache_key=None):
+        self.pending.append((output_filename, data, cache_key))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        pending = self.pending
+        self.pending = []
+        # Identical documents (ex. the redirects of a legal code) are only
+        # formatted once
+        unique = list(dict.fromkeys(data for _, data, _ in pending))
+        with timed("format_html_batch"):
+            formatted = dict(zip(unique, self.format_batch(unique)))
+        cache = get_format_cache()
+        for output_filename, data, cache_key in pending:
+            if cache and cache_key:
+                cache.put(cache_key, formatted[data])
+            self.write(formatted[data], output_filename)
+
+
+def get_format_queue():
+    return getattr(_local, "queue", None)
+
+
+def start_format_queue(batch_size, write):
+    """
+    Defer Prettier formatting of the pages saved by this thread to a queue
+    that is formatted in batches (see save_url_as_static_file and
+    save_redirects). Returns the queue.
+    """
+    _local.queue = FormatQueue(batch_size, write)
+    return _local.queue
+
+
+def stop_format_queue():
+    """
+    Format and write the remaining queued pages and stop deferring.
+    """
+    queue = get_format_queue()
+    _local.queue = None
+    if queue:
+        queue.flush()
+
+
+class FormatCache(DiskCache):
+    """
+    On-disk content-addressed cache of formatted HTML (see DiskCache). The
+    key of an entry is the SHA-256 of the namespace (see
+    get_format_cache_namespace) and of the HTML before formatting.
+    """
+
+    def __init__(self, directory, max_size, namespace=""):
+        super().__init__(directory, max_size)
+        self.namespace = namespace
+
+    def get_key(self, html_bytes):
+        if not isinstance(html_bytes, bytes):
+            html_bytes = html_bytes.encode("utf-8")
+        namespace = f"{self.namespace}\0".encode("utf-8")
+        return hashlib.sha256(namespace + html_bytes).hexdigest()
+
+
+def get_format_cache():
+    return _cache
+
+
+def init_format_cache(directory, max_size, namespace=""):
+    """
+    Enable (or, if directory is None, disable) the format cache of this
+    process (see get_format_cache_namespace for the namespace).
+    """
+    global _cache
+    if directory is None:
+        _cache = None
+    else:
+        _cache = FormatCache(directory, max_size, namespace)
+    return _cache
@@ -0,0 +1,1509 @@
+"""
+Pure-Python HTML formatter that follows the layout of Prettier's HTML printer
+(default options: printWidth 80, tabWidth 2, htmlWhitespaceSensitivity css)
+for the documents published by this application.
+
+The implementation mirrors Prettier: the HTML is parsed into a tree, the tree
+is preprocessed (whitespace extraction, CSS display, whitespace sensitivity)
+and printed to a document of groups, indents, lines and fills that is laid out
+by a Wadler-style printer.
+
+Differences from Prettier:
+- The contents of <script> and <style> elements are re-indented, but they are
+  not formatted as JavaScript/CSS, so the inline scripts and styles of the
+  published pages differ from Prettier's output (the rest of the output is
+  compared with Prettier's by ConformanceTest in tests/test_html_formatter.py)
+- Only the markup produced by BeautifulSoup is supported (all non-void
+  elements are explicitly closed)
+"""
+
+# Standard library
+import re
+import unicodedata
+from bisect import bisect_right
+
+# Version of the formatter output (change it when the output changes, so that
+# the format cache does not return outdated output)
+HTML_FORMATTER_VERSION = 1
+PRINT_WIDTH = 80
+TAB_WIDTH = 2
+
+# Elements whose CSS display isn't inline (Prettier uses the WHATWG rendering
+# defaults with a few overrides)
+DISPLAY = {
+    "button": "inline-block",
+    "template": "inline",
+    "source": "block",
+    "track": "block",
+    "script": "block",
+    "param": "block",
+    "details": "block",
+    "summary": "block",
+    "dialog": "block",
+    "meter": "inline-block",
+    "progress": "inline-block",
+    "object": "inline-block",
+    "video": "inline-block",
+    "audio": "inline-block",
+    "select": "inline-block",
+    "option": "block",
+    "optgroup": "block",
+    "li": "list-item",
+    "table": "table",
+    "caption": "table-caption",
+    "colgroup": "table-column-group",
+    "col": "table-column",
+    "thead": "table-header-group",
+    "tbody": "table-row-group",
+    "tfoot": "table-footer-group",
+    "tr": "table-row",
+    "td": "table-cell",
+    "th": "table-cell",
+    "input": "inline-block",
+    "textarea": "inline-block",
+    "marquee": "inline-block",
+}
+for _name in (
+    "area base basefont datalist head link meta noembed noframes rp style"
+    " title"
+).split():
+    DISPLAY[_name] = "none"
+for _name in (
+    "html body address blockquote center div figure figcaption footer form"
+    " header hr legend listing main p plaintext pre search xmp article aside"
+    " h1 h2 h3 h4 h5 h6 hgroup nav section dir dd dl dt menu ol ul fieldset"
+    " frameset frame"
+).split():
+    DISPLAY[_name] = "block"
+PRE_ELEMENTS = {"listing", "plaintext", "pre", "textarea", "xmp"}
+# A newline directly after the start tag of these elements is ignored
+IGNORE_FIRST_LF_ELEMENTS = {"listing", "pre", "textarea"}
+RAW_TEXT_ELEMENTS = {"script", "style"}
+VOID_ELEMENTS = {
+    "area",
+    "base",
+    "basefont",
+    "bgsound",
+    "br",
+    "col",
+    "embed",
+    "frame",
+    "hr",
+    "img",
+    "input",
+    "keygen",
+    "link",
+    "meta",
+    "param",
+    "source",
+    "track",
+    "wbr",
+}
+HTML_WHITESPACE = "\t\n\f\r "
+RE_WHITESPACE = re.compile(f"[{HTML_WHITESPACE}]+")
+RE_ATTRIBUTE = re.compile(
+    r"""([^\s"'>/=]+)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s"'=<>`]+))?"""
+)
+RE_START_TAG = re.compile(
+    r"<([a-zA-Z][^\s/>]*)((?:[^>\"']|\"[^\"]*\"|'[^']*')*)>"
+)
+RE_DISPLAY_COMMENT = re.compile(r"^\s*display:\s*([a-z]+)\s*$")
+
+
+# Document builders ###########################################################
+
+
+class Group:
+    __slots__ = ("contents", "should_break", "id")
+
+    def __init__(self, contents, group_id=None):
+        self.contents = contents
+        self.should_break = False
+        self.id = group_id
+
+
+class Fill:
+    __slots__ = ("parts",)
+
+    def __init__(self, parts):
+        self.parts = parts
+
+
+class Indent:
+    __slots__ = ("contents",)
+
+    def __init__(self, contents):
+        self.contents = contents
+
+
+class DedentToRoot:
+    __slots__ = ("contents",)
+
+    def __init__(self, contents):
+        self.contents = contents
+
+
+class IfBreak:
+    __slots__ = ("break_contents", "flat_contents", "group_id")
+
+    def __init__(self, break_contents, flat_contents, group_id=None):
+        self.break_contents = break_contents
+        self.flat_contents = flat_contents
+        self.group_id = group_id
+
+
+class Line:
+    __slots__ = ("hard", "soft", "literal")
+
+    def __init__(self, hard=False, soft=False, literal=False):
+        self.hard = hard
+        self.soft = soft
+        self.literal = literal
+
+
+class BreakParent:
+    __slots__ = ()
+
+
+BREAK_PARENT = BreakParent()
+LINE = Line()
+SOFTLINE = Line(soft=True)
+HARDLINE = [Line(hard=True), BREAK_PARENT]
+LITERALLINE = [Line(hard=True, literal=True), BREAK_PARENT]
+MODE_BREAK = "break"
+MODE_FLAT = "flat"
+
+
+def join(separator, docs):
+    parts = []
+    for index, doc in enumerate(docs):
+        if index:
+            parts.append(separator)
+        parts.append(doc)
+    return parts
+
+
+def replace_end_of_line(text, replacement=None):
+    if replacement is None:
+        replacement = LITERALLINE
+    return join(replacement, text.split("\n"))
+
+
+def clean_doc(parts):
+    """
+    Flatten nested lists, drop empty strings and concatenate adjacent strings.
+    Returns a string if only a single string remains.
+    """
+    flat = []
+
+    def add(doc):
+        if isinstance(doc, list):
+            for part in doc:
+                add(part)
+        elif isinstance(doc, str):
+            if not doc:
+                return
+            if flat and isinstance(flat[-1], str):
+                flat[-1] += doc
+            else:
+                flat.append(doc)
+        else:
+            flat.append(doc)
+
+    add(parts)
+    if len(flat) == 1 and isinstance(flat[0], str):
+        return flat[0]
+    return flat
+
+
+def get_string_width(text):
+    if text.isascii():
+        return len(text)
+    width = 0
+    for character in text:
+        if unicodedata.combining(character) or (
+            unicodedata.category(character) in ("Cc", "Mn", "Me", "Cf")
+        ):
+            continue
+        if unicodedata.east_asian_width(character) in ("F", "W"):
+            width += 2
+        else:
+            width += 1
+    return width
+
+
+def propagate_breaks(doc):
+    """
+    Break every group that contains a hard line (or a broken group).
+    """
+    visited = set()
+
+    def visit(doc):
+        # Returns True if doc contains a break parent
+        if isinstance(doc, str):
+            return False
+        if isinstance(doc, list):
+            contains = False
+            for part in doc:
+                contains = visit(part) or contains
+            return contains
+        if isinstance(doc, BreakParent):
+            return True
+        if isinstance(doc, Group):
+            if id(doc) not in visited:
+                visited.add(id(doc))
+                if visit(doc.contents):
+                    doc.should_break = True
+            return doc.should_break
+        if isinstance(doc, Fill):
+            return visit(doc.parts)
+        if isinstance(doc, IfBreak):
+            contains = visit(doc.break_contents)
+            return visit(doc.flat_contents) or contains
+        if isinstance(doc, (Indent, DedentToRoot)):
+            return visit(doc.contents)
+        return False
+
+    visit(doc)
+
+
+def trim(out):
+    """
+    Remove trailing spaces and tabs from the output. Returns the number of
+    removed characters.
+    """
+    trimmed = 0
+    while out:
+        stripped = out[-1].rstrip(" \t")
+        trimmed += len(out[-1]) - len(stripped)
+        if stripped:
+            out[-1] = stripped
+            break
+        out.pop()
+    return trimmed
+
+
+def fits(next_cmd, rest_cmds, width, group_modes, must_be_flat=False):
+    rest_index = len(rest_cmds)
+    cmds = [next_cmd]
+    out = []
+    while width >= 0:
+        if not cmds:
+            if rest_index == 0:
+                return True
+            rest_index -= 1
+            cmds.append(rest_cmds[rest_index])
+            continue
+        _, mode, doc = cmds.pop()
+        if isinstance(doc, str):
+            out.append(doc)
+            width -= get_string_width(doc)
+        elif isinstance(doc, (list, Fill)):
+            parts = doc if isinstance(doc, list) else doc.parts
+            for part in reversed(parts):
+                cmds.append((None, mode, part))
+        elif isinstance(doc, (Indent, DedentToRoot)):
+            cmds.append((None, mode, doc.contents))
+        elif isinstance(doc, Group):
+            if must_be_flat and doc.should_break:
+                return False
+            group_mode = MODE_BREAK if doc.should_break else mode
+            cmds.append((None, group_mode, doc.contents))
+        elif isinstance(doc, IfBreak):
+            if doc.group_id:
+                group_mode = group_modes.get(doc.group_id, MODE_FLAT)
+            else:
+                group_mode = mode
+            if group_mode == MODE_BREAK:
+                contents = doc.break_contents
+            else:
+                contents = doc.flat_contents
+            if contents:
+                cmds.append((None, mode, contents))
+        elif isinstance(doc, Line):
+            if mode == MODE_BREAK or doc.hard:
+                return True
+            if not doc.soft:
+                out.append(" ")
+                width -= 1
+    return False
+
+
+def print_doc(doc, width=PRINT_WIDTH):
+    """
+    Lay out the document using the Prettier algorithm.
+    """
+    propagate_breaks(doc)
+    group_modes = {}
+    pos = 0
+    # Commands are (indentation, mode, doc)
+    cmds = [("", MODE_BREAK, doc)]
+    out = []
+    should_remeasure = False
+    while cmds:
+        indentation, mode, doc = cmds.pop()
+        if isinstance(doc, str):
+            out.append(doc)
+            if cmds:
+                pos += get_string_width(doc)
+        elif isinstance(doc, list):
+            for part in reversed(doc):
+                cmds.append((indentation, mode, part))
+        elif isinstance(doc, Indent):
+            cmds.append((indentation + " " * TAB_WIDTH, mode, doc.contents))
+        elif isinstance(doc, DedentToRoot):
+            cmds.append(("", mode, doc.contents))
+        elif isinstance(doc, Group):
+            if mode == MODE_FLAT and not should_remeasure:
+                group_mode = MODE_BREAK if doc.should_break else MODE_FLAT
+                cmds.append((indentation, group_mode, doc.contents))
+            else:
+                should_remeasure = False
+                next_cmd = (indentation, MODE_FLAT, doc.contents)
+                if not doc.should_break and fits(
+                    next_cmd, cmds, width - pos, group_modes
+                ):
+                    cmds.append(next_cmd)
+                else:
+                    cmds.append((indentation, MODE_BREAK, doc.contents))
+            if doc.id:
+                group_modes[doc.id] = cmds[-1][1]
+        elif isinstance(doc, Fill):
+            print_fill(doc, indentation, mode, cmds, width - pos, group_modes)
+        elif isinstance(doc, IfBreak):
+            if doc.group_id:
+                group_mode = group_modes.get(doc.group_id, MODE_FLAT)
+            else:
+                group_mode = mode
+            if group_mode == MODE_BREAK:
+                contents = doc.break_contents
+            else:
+                contents = doc.flat_contents
+            if contents:
+                cmds.append((indentation, mode, contents))
+        elif isinstance(doc, Line):
+            if mode == MODE_FLAT and not doc.hard:
+                if not doc.soft:
+                    out.append(" ")
+                    pos += 1
+                continue
+            if mode == MODE_FLAT:
+                should_remeasure = True
+            if doc.literal:
+                out.append("\n")
+                pos = 0
+            else:
+                pos -= trim(out)
+                out.append(f"\n{indentation}")
+                pos = len(indentation)
+    return "".join(out)
+
+
+def print_fill(doc, indentation, mode, cmds, remaining, group_modes):
+    parts = doc.parts
+    if not parts:
+        return
+    content = parts[0]
+    content_flat = (indentation, MODE_FLAT, content)
+    content_break = (indentation, MODE_BREAK, content)
+    content_fits = fits(content_flat, [], remaining, group_modes, True)
+    if len(parts) == 1:
+        cmds.append(content_flat if content_fits else content_break)
+        return
+    whitespace = parts[1]
+    whitespace_flat = (indentation, MODE_FLAT, whitespace)
+    whitespace_break = (indentation, MODE_BREAK, whitespace)
+    if len(parts) == 2:
+        if content_fits:
+            cmds.extend([whitespace_flat, content_flat])
+        else:
+            cmds.extend([whitespace_break, content_break])
+        return
+    remaining_cmd = (indentation, mode, Fill(parts[2:]))
+    pair_flat = (indentation, MODE_FLAT, [content, whitespace, parts[2]])
+    pair_fits = fits(pair_flat, [], remaining, group_modes, True)
+    if pair_fits:
+        cmds.extend([remaining_cmd, whitespace_flat, content_flat])
+    elif content_fits:
+        cmds.extend([remaining_cmd, whitespace_break, content_flat])
+    else:
+        cmds.extend([remaining_cmd, whitespace_break, content_break])
+
+
+# HTML tree ###################################################################
+
+
+class Node:
+    def __init__(self, node_type, start, end, name=None):
+        self.type = node_type
+        self.name = name
+        self.attrs = []
+        self.children = []
+        self.parent = None
+        self.prev = None
+        self.next = None
+        self.value = None
+        # Source positions (offsets)
+        self.start = start
+        self.end = end
+        self.start_tag_end = end
+        self.end_tag_start = None
+        # Preprocessing flags
+        self.css_display = "inline"
+        self.has_leading_spaces = False
+        self.has_trailing_spaces = False
+        self.has_dangling_spaces = False
+        self.is_leading_space_sensitive = False
+        self.is_trailing_space_sensitive = False
+        self.is_dangling_space_sensitive = False
+        self.is_whitespace_sensitive = False
+        self.is_indentation_sensitive = False
+        self.is_self_closing = False
+
+    @property
+    def first_child(self):
+        return self.children[0] if self.children else None
+
+    @property
+    def last_child(self):
+        return self.children[-1] if self.children else None
+
+    def link_children(self):
+        previous = None
+        for child in self.children:
+            child.parent = self
+            child.prev = previous
+            child.next = None
+            if previous:
+                previous.next = child
+            previous = child
+
+
+class Parser:
+    """
+    Parse HTML into a tree of Nodes, tracking the source position of each node
+    (Prettier uses line numbers to preserve line breaks around some nodes).
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.newlines = [m.start() for m in re.finditer("\n", text)]
+
+    def line(self, offset):
+        return bisect_right(self.newlines, offset - 1)
+
+    def parse(self):
+        text = self.text
+        root = Node("root", 0, len(text))
+        stack = [root]
+        pos = 0
+        while pos < len(text):
+            current = stack[-1]
+            if text.startswith("<!--", pos):
+                end = text.find("-->", pos + 4)
+                end = len(text) if end == -1 else end + 3
+                node = Node("comment", pos, end)
+                value_start, value_end = pos + 4, end - 3
+                node.value = text[value_start:value_end]
+                current.children.append(node)
+                pos = end
+                continue
+            if text.startswith("<!", pos):
+                end = text.find(">", pos)
+                end = len(text) if end == -1 else end + 1
+                node = Node("docType", pos, end)
+                value_start, value_end = pos + 2, end - 1
+                node.value = re.sub(
+                    r"^doctype\s+", "", text[value_start:value_end], flags=re.I
+                )
+                current.children.append(node)
+                pos = end
+                continue
+            if text.startswith("</", pos):
+                end = text.find(">", pos)
+                end = len(text) if end == -1 else end + 1
+                name_start, name_end = pos + 2, end - 1
+                name = text[name_start:name_end].strip().lower()
+                for index in range(len(stack) - 1, 0, -1):
+                    if stack[index].name == name:
+                        for element in stack[index:]:
+                            element.end_tag_start = pos
+                            element.end = end
+                        del stack[index:]
+                        break
+                pos = end
+                continue
+            match = RE_START_TAG.match(text, pos)
+            if match:
+                pos = self.add_element(match, stack)
+                continue
+            end = text.find("<", pos + 1)
+            end = len(text) if end == -1 else end
+            if (
+                current.name in IGNORE_FIRST_LF_ELEMENTS
+                and not current.children
+                and text.startswith("\n", pos)
+            ):
+                pos += 1
+            if pos < end:
+                self.add_text(current, pos, end)
+            pos = end
+        for element in stack[1:]:
+            element.end = len(text)
+        return root
+
+    def add_element(self, match, stack):
+        text = self.text
+        raw_name, raw_attrs = match.groups()
+        name = raw_name.lower()
+        element = Node("element", match.start(), match.end(), name)
+        element.raw_name = raw_name
+        self_closing = raw_attrs.rstrip().endswith("/")
+        if self_closing:
+            raw_attrs = raw_attrs.rstrip()[:-1]
+        for attr_match in RE_ATTRIBUTE.finditer(raw_attrs):
+            attr_name, attr_value = attr_match.groups()
+            if attr_value is not None and attr_value[:1] in ("'", '"'):
+                attr_value = attr_value[1:-1]
+            element.attrs.append((attr_name, attr_value))
+        stack[-1].children.append(element)
+        end = match.end()
+        if name in VOID_ELEMENTS or self_closing:
+            element.is_self_closing = True
+            return end
+        if name in RAW_TEXT_ELEMENTS:
+            close = re.compile(rf"</{name}\s*>", re.I).search(text, end)
+            close_start = close.start() if close else len(text)
+            if close_start > end:
+                self.add_text(element, end, close_start)
+            element.end_tag_start = close_start
+            element.end = close.end() if close else len(text)
+            return element.end
+        stack.append(element)
+        return end
+
+    def add_text(self, parent, start, end):
+        if parent.children and parent.children[-1].type == "text":
+            node = parent.children[-1]
+            node.end = end
+        else:
+            node = Node("text", start, end)
+            parent.children.append(node)
+        start = node.start
+        node.value = self.text[start:end]
+
+
+# Preprocessing ###############################################################
+
+
+def walk(node):
+    yield node
+    for child in node.children:
+        yield from walk(child)
+
+
+def is_script_like(node):
+    return node.type == "element" and node.name in RAW_TEXT_ELEMENTS
+
+
+def is_pre_like(node):
+    return node.type == "element" and node.name in PRE_ELEMENTS
+
+
+def is_text_like(node):
+    return node is not None and node.type in ("text", "comment")
+
+
+def is_block_like_display(display):
+    return (
+        display == "block"
+        or display == "list-item"
+        or display.startswith("table")
+    )
+
+
+def is_first_child_leading_space_sensitive_display(display):
+    return not is_block_like_display(display) and display != "inline-block"
+
+
+def split_whitespace(value):
+    match = re.match(
+        f"^([{HTML_WHITESPACE}]*)(.*?)([{HTML_WHITESPACE}]*)$", value, re.S
+    )
+    return match.groups()
+
+
+def extract_whitespaces(root):
+    for node in walk(root):
+        if node.type not in ("root", "element"):
+            continue
+        children = node.children
+        if not children or (
+            len(children) == 1
+            and children[0].type == "text"
+            and not children[0].value.strip(HTML_WHITESPACE)
+        ):
+            node.has_dangling_spaces = bool(children)
+            node.children = []
+            continue
+        is_whitespace_sensitive = is_script_like(node) or is_pre_like(node)
+        node.is_whitespace_sensitive = is_whitespace_sensitive
+        node.is_indentation_sensitive = is_pre_like(node)
+        if is_whitespace_sensitive:
+            node.link_children()
+            continue
+        result = []
+        for index, child in enumerate(children):
+            if child.type != "text":
+                result.append(child)
+                continue
+            leading, text, trailing = split_whitespace(child.value)
+            prev_child = result[-1] if result else None
+            next_child = (
+                children[index + 1] if index + 1 < len(children) else None
+            )
+            if not text:
+                if prev_child:
+                    prev_child.has_trailing_spaces = True
+                if next_child:
+                    next_child.has_leading_spaces = True
+                continue
+            child.value = text
+            child.start += len(leading)
+            child.end -= len(trailing)
+            if leading:
+                if prev_child:
+                    prev_child.has_trailing_spaces = True
+                child.has_leading_spaces = True
+            if trailing:
+                child.has_trailing_spaces = True
+                if next_child:
+                    next_child.has_leading_spaces = True
+            result.append(child)
+        node.children = result
+        node.link_children()
+
+
+def add_css_display(root):
+    for node in walk(root):
+        node.link_children()
+    for node in walk(root):
+        if node.prev and node.prev.type == "comment":
+            match = RE_DISPLAY_COMMENT.match(node.prev.value)
+            if match:
+                node.css_display = match.group(1)
+                continue
+        if node.type != "element":
+            continue
+        ancestor = node
+        in_svg = False
+        while ancestor.type == "element":
+            if ancestor.name == "svg":
+                in_svg = True
+                break
+            if ancestor.name == "foreignobject":
+                break
+            ancestor = ancestor.parent
+        if in_svg:
+            node.css_display = (
+                "inline-block" if node.name == "svg" else "block"
+            )
+        else:
+            node.css_display = DISPLAY.get(node.name, "inline")
+
+
+def add_is_self_closing(root):
+    for node in walk(root):
+        if node.type in ("text", "comment", "docType"):
+            node.is_self_closing = True
+
+
+def is_leading_space_sensitive(node):
+    result = _is_leading_space_sensitive(node)
+    if (
+        result
+        and not node.prev
+        and node.parent.name in IGNORE_FIRST_LF_ELEMENTS
+    ):
+        return False
+    return result
+
+
+def _is_leading_space_sensitive(node):
+    parent = node.parent
+    if node.type == "text" and node.prev and node.prev.type == "text":
+        return True
+    if parent.css_display == "none" or is_pre_like(parent):
+        return True
+    if not node.prev and (
+        parent.type == "root"
+        or is_pre_like(node)
+        or is_script_like(parent)
+        or not is_first_child_leading_space_sensitive_display(
+            parent.css_display
+        )
+    ):
+        return False
+    if node.prev and is_block_like_display(node.prev.css_display):
+        return False
+    return True
+
+
+def is_trailing_space_sensitive(node):
+    parent = node.parent
+    if node.type == "text" and node.next and node.next.type == "text":
+        return True
+    if parent.css_display == "none" or is_pre_like(parent):
+        return True
+    if not node.next and (
+        parent.type == "root"
+        or is_pre_like(node)
+        or is_script_like(parent)
+        or not is_first_child_leading_space_sensitive_display(
+            parent.css_display
+        )
+    ):
+        return False
+    if node.next and is_block_like_display(node.next.css_display):
+        return False
+    return True
+
+
+def add_is_space_sensitive(root):
+    for node in walk(root):
+        if node.type not in ("root", "element"):
+            continue
+        if not node.children:
+            node.is_dangling_space_sensitive = (
+                is_first_child_leading_space_sensitive_display(
+                    node.css_display
+                )
+                and not is_script_like(node)
+            )
+            continue
+        for child in node.children:
+            child.is_leading_space_sensitive = is_leading_space_sensitive(
+                child
+            )
+            child.is_trailing_space_sensitive = is_trailing_space_sensitive(
+                child
+            )
+        children = node.children
+        for index, child in enumerate(children):
+            if index:
+                child.is_leading_space_sensitive = (
+                    children[index - 1].is_trailing_space_sensitive
+                    and child.is_leading_space_sensitive
+                )
+            if index < len(children) - 1:
+                child.is_trailing_space_sensitive = (
+                    children[index + 1].is_leading_space_sensitive
+                    and child.is_trailing_space_sensitive
+                )
+
+
+def is_simple_element(node):
+    return (
+        node.type == "element"
+        and not node.attrs
+        and len(node.children) == 1
+        and node.first_child.type == "text"
+        and not RE_WHITESPACE.search(node.first_child.value)
+        and not node.first_child.has_leading_spaces
+        and not node.first_child.has_trailing_spaces
+        and node.is_leading_space_sensitive
+        and not node.has_leading_spaces
+        and node.is_trailing_space_sensitive
+        and not node.has_trailing_spaces
+        and node.prev is not None
+        and node.prev.type == "text"
+        and node.next is not None
+        and node.next.type == "text"
+    )
+
+
+def merge_simple_elements_into_text(root):
+    for node in walk(root):
+        index = 0
+        while index < len(node.children):
+            child = node.children[index]
+            if is_simple_element(child):
+                prev_child, next_child = child.prev, child.next
+                text = Node("text", prev_child.start, next_child.end)
+                text.value = (
+                    f"{prev_child.value}<{child.raw_name}>"
+                    f"{child.first_child.value}</{child.raw_name}>"
+                    f"{next_child.value}"
+                )
+                text.is_leading_space_sensitive = (
+                    prev_child.is_leading_space_sensitive
+                )
+                text.is_trailing_space_sensitive = (
+                    next_child.is_trailing_space_sensitive
+                )
+                text.has_leading_spaces = prev_child.has_leading_spaces
+                text.has_trailing_spaces = next_child.has_trailing_spaces
+                text.is_self_closing = True
+                node.children[index - 1] = text
+                # Remove the element and the next text
+                del node.children[index]
+                del node.children[index]
+                node.link_children()
+            index += 1
+
+
+# Printing ####################################################################
+
+
+class Printer:
+    def __init__(self, text):
+        self.text = text
+        self.parser = Parser(text)
+        self.group_ids = 0
+
+    def format(self):
+        root = self.parser.parse()
+        extract_whitespaces(root)
+        add_css_display(root)
+        add_is_self_closing(root)
+        add_is_space_sensitive(root)
+        merge_simple_elements_into_text(root)
+        doc = [Group(self.print_children(root)), HARDLINE]
+        return print_doc(doc)
+
+    def new_group_id(self):
+        self.group_ids += 1
+        return self.group_ids
+
+    # Source lines
+
+    def line(self, offset):
+        return self.parser.line(offset)
+
+    def has_leading_linebreak(self, node):
+        if not node.has_leading_spaces:
+            return False
+        if node.prev:
+            return self.line(node.prev.end) < self.line(node.start)
+        parent = node.parent
+        return parent.type == "root" or (
+            self.line(parent.start_tag_end) < self.line(node.start)
+        )
+
+    def has_trailing_linebreak(self, node):
+        if not node.has_trailing_spaces:
+            return False
+        if node.next:
+            return self.line(node.next.start) > self.line(node.end)
+        parent = node.parent
+        return parent.type == "root" or (
+            parent.end_tag_start is not None
+            and self.line(parent.end_tag_start) > self.line(node.end)
+        )
+
+    def has_surrounding_linebreak(self, node):
+        return self.has_leading_linebreak(
+            node
+        ) and self.has_trailing_linebreak(node)
+
+    def force_next_empty_line(self, node):
+        return node.next is not None and (
+            self.line(node.end) + 1 < self.line(node.next.start)
+        )
+
+    # Whitespace preferences
+
+    @staticmethod
+    def prefer_hardline_as_surrounding_spaces(node):
+        if node.type in ("comment", "docType"):
+            return True
+        return node.type == "element" and node.name in ("script", "select")
+
+    def prefer_hardline_as_leading_spaces(self, node):
+        return (
+            self.prefer_hardline_as_surrounding_spaces(node)
+            or (
+                node.prev is not None
+                and self.prefer_hardline_as_trailing_spaces(node.prev)
+            )
+            or self.has_surrounding_linebreak(node)
+        )
+
+    def prefer_hardline_as_trailing_spaces(self, node):
+        return (
+            self.prefer_hardline_as_surrounding_spaces(node)
+            or (node.type == "element" and node.name == "br")
+            or self.has_surrounding_linebreak(node)
+        )
+
+    # Forced breaks
+
+    @staticmethod
+    def force_break_children(node):
+        return (
+            node.type == "element"
+            and bool(node.children)
+            and (
+                node.name in ("html", "head", "ul", "ol", "select")
+                or (
+                    node.css_display.startswith("table")
+                    and node.css_display != "table-cell"
+                )
+            )
+        )
+
+    def force_break_content(self, node):
+        if self.force_break_children(node):
+            return True
+        if (
+            node.type == "element"
+            and node.children
+            and (
+                node.name in ("body", "script", "style")
+                or any(
+                    any(c.type != "text" for c in child.children)
+                    for child in node.children
+                )
+            )
+        ):
+            return True
+        first, last = node.first_child, node.last_child
+        return bool(
+            first
+            and first is last
+            and first.type != "text"
+            and self.has_leading_linebreak(first)
+            and (
+                not last.is_trailing_space_sensitive
+                or self.has_trailing_linebreak(last)
+            )
+        )
+
+    # Tag marker borrowing
+
+    @staticmethod
+    def needs_to_borrow_prev_closing_tag_end_marker(node):
+        # <p></p
+        # >123
+        return (
+            node.prev is not None
+            and node.prev.type != "docType"
+            and not is_text_like(node.prev)
+            and node.is_leading_space_sensitive
+            and not node.has_leading_spaces
+        )
+
+    @staticmethod
+    def needs_to_borrow_last_child_closing_tag_end_marker(node):
+        # <p
+        #   ><a></a
+        #   ></p
+        # >
+        last = node.last_child
+        if last is None:
+            return False
+        descendant = last
+        while descendant.children:
+            descendant = descendant.last_child
+        return (
+            last.is_trailing_space_sensitive
+            and not last.has_trailing_spaces
+            and not is_text_like(descendant)
+            and not is_pre_like(node)
+        )
+
+    @staticmethod
+    def needs_to_borrow_parent_closing_tag_start_marker(node):
+        # <p>
+        #   123</p
+        # >
+        descendant = node
+        while descendant.children:
+            descendant = descendant.last_child
+        return (
+            node.next is None
+            and not node.has_trailing_spaces
+            and node.is_trailing_space_sensitive
+            and is_text_like(descendant)
+        )
+
+    @staticmethod
+    def needs_to_borrow_next_opening_tag_start_marker(node):
+        # 123<p
+        # >
+        return (
+            node.next is not None
+            and not is_text_like(node.next)
+            and is_text_like(node)
+            and node.is_trailing_space_sensitive
+            and not node.has_trailing_spaces
+        )
+
+    @staticmethod
+    def needs_to_borrow_parent_opening_tag_end_marker(node):
+        # <p
+        #   >123
+        return (
+            node.prev is None
+            and node.is_leading_space_sensitive
+            and not node.has_leading_spaces
+        )
+
+    # Tag markers
+
+    @staticmethod
+    def closing_tag_end_marker(node):
+        if node.type == "element" and node.is_self_closing:
+            return "/>"
+        return ">"
+
+    def opening_tag_prefix(self, node):
+        if self.needs_to_borrow_parent_opening_tag_end_marker(node):
+            return ">"
+        if self.needs_to_borrow_prev_closing_tag_end_marker(node):
+            return self.closing_tag_end_marker(node.prev)
+        return ""
+
+    def closing_tag_suffix(self, node):
+        if self.needs_to_borrow_parent_closing_tag_start_marker(node):
+            return f"</{node.parent.raw_name}"
+        if self.needs_to_borrow_next_opening_tag_start_marker(node):
+            return self.opening_tag_start(node.next, marker_only=True)
+        return ""
+
+    def opening_tag_start(self, node, marker_only=False):
+        if node.type == "docType":
+            start, end = node.start, node.start + len("<!doctype")
+            marker = self.text[start:end]
+        else:
+            marker = f"<{node.raw_name}"
+        if marker_only:
+            return marker
+        if node.prev and self.needs_to_borrow_next_opening_tag_start_marker(
+            node.prev
+        ):
+            return ""
+        return [self.opening_tag_prefix(node), marker]
+
+    def closing_tag_prefix(self, node):
+        if self.needs_to_borrow_last_child_closing_tag_end_marker(node):
+            return self.closing_tag_end_marker(node.last_child)
+        return ""
+
+    def closing_tag_start(self, node):
+        if node.last_child and (
+            self.needs_to_borrow_parent_closing_tag_start_marker(
+                node.last_child
+            )
+        ):
+            return ""
+        return [self.closing_tag_prefix(node), f"</{node.raw_name}"]
+
+    def closing_tag_end(self, node):
+        if node.next:
+            borrowed = self.needs_to_borrow_prev_closing_tag_end_marker(
+                node.next
+            )
+        else:
+            borrowed = self.needs_to_borrow_last_child_closing_tag_end_marker(
+                node.parent
+            )
+        if borrowed:
+            return ""
+        return [
+            self.closing_tag_end_marker(node),
+            self.closing_tag_suffix(node),
+        ]
+
+    def closing_tag(self, node):
+        return [
+            "" if node.is_self_closing else self.closing_tag_start(node),
+            self.closing_tag_end(node),
+        ]
+
+    # Attributes
+
+    def print_attribute(self, name, value):
+        if value is None:
+            return name
+        value = value.replace("&apos;", "'").replace("&quot;", '"')
+        lowered = name.lower()
+        if value and lowered == "class":
+            value = " ".join(value.split())
+            return [name, '="', Group(value.replace('"', "&quot;")), '"']
+        if value and lowered == "style":
+            declarations = print_style_declarations(value)
+            if declarations is not None:
+                return [
+                    name,
+                    '="',
+                    Group([Indent([SOFTLINE, declarations]), SOFTLINE]),
+                    '"',
+                ]
+        if value.count("'") < value.count('"'):
+            quote = "'"
+            value = value.replace("'", "&apos;")
+        else:
+            quote = '"'
+            value = value.replace('"', "&quot;")
+        return [name, "=", quote, replace_end_of_line(value), quote]
+
+    def print_attributes(self, node):
+        if not node.attrs:
+            return " " if node.is_self_closing else ""
+        printed = [self.print_attribute(name, v) for name, v in node.attrs]
+        parts = [Indent([LINE, join(LINE, printed)])]
+        if (
+            node.first_child
+            and self.needs_to_borrow_parent_opening_tag_end_marker(
+                node.first_child
+            )
+        ) or (
+            node.is_self_closing
+            and self.needs_to_borrow_last_child_closing_tag_end_marker(
+                node.parent
+            )
+        ):
+            parts.append(" " if node.is_self_closing else "")
+        else:
+            parts.append(LINE if node.is_self_closing else SOFTLINE)
+        return parts
+
+    def opening_tag(self, node):
+        if node.is_self_closing:
+            end = ""
+        elif node.first_child and (
+            self.needs_to_borrow_parent_opening_tag_end_marker(
+                node.first_child
+            )
+        ):
+            end = ""
+        else:
+            end = ">"
+        return [self.opening_tag_start(node), self.print_attributes(node), end]
+
+    # Nodes
+
+    def print_node(self, node):
+        if node.type == "element":
+            return self.print_element(node)
+        if node.type == "text":
+            return self.print_text(node)
+        if node.type == "comment":
+            start, end = node.start, node.end
+            return [
+                self.opening_tag_prefix(node),
+                replace_end_of_line(self.text[start:end]),
+                self.closing_tag_suffix(node),
+            ]
+        # docType
+        value = re.sub(r"^html\b", "html", node.value, flags=re.I)
+        value = re.sub(r"\s+", " ", value)
+        return [
+            Group([self.opening_tag_start(node), " ", value]),
+            self.closing_tag_end(node),
+        ]
+
+    def print_text(self, node):
+        parent = node.parent
+        if parent.is_whitespace_sensitive:
+            if parent.is_indentation_sensitive:
+                value = replace_end_of_line(node.value)
+            else:
+                value = replace_end_of_line(
+                    dedent_string(trim_preserve_indentation(node.value)),
+                    HARDLINE,
+                )
+            return [
+                self.opening_tag_prefix(node),
+                value,
+                self.closing_tag_suffix(node),
+            ]
+        words = RE_WHITESPACE.split(node.value)
+        printed = clean_doc(
+            [
+                self.opening_tag_prefix(node),
+                join(LINE, words),
+                self.closing_tag_suffix(node),
+            ]
+        )
+        if isinstance(printed, list):
+            return Fill(printed)
+        return printed
+
+    def print_element(self, node):
+        if not node.children:
+            if node.has_dangling_spaces and node.is_dangling_space_sensitive:
+                contents = LINE
+            else:
+                contents = ""
+            return Group(
+                [
+                    Group(self.opening_tag(node)),
+                    contents,
+                    self.closing_tag(node),
+                ]
+            )
+        first = node.first_child
+        if first.has_leading_spaces and first.is_leading_space_sensitive:
+            line_before = LINE
+        elif (
+            first.type == "text"
+            and node.is_whitespace_sensitive
+            and node.is_indentation_sensitive
+        ):
+            line_before = DedentToRoot(SOFTLINE)
+        else:
+            line_before = SOFTLINE
+        return Group(
+            [
+                Group(self.opening_tag(node)),
+                BREAK_PARENT if self.force_break_content(node) else "",
+                Indent([line_before, self.print_children(node)]),
+                self.line_after_children(node),
+                self.closing_tag(node),
+            ]
+        )
+
+    def line_after_children(self, node):
+        last = node.last_child
+        if node.next:
+            borrowed = self.needs_to_borrow_prev_closing_tag_end_marker(
+                node.next
+            )
+        else:
+            borrowed = self.needs_to_borrow_last_child_closing_tag_end_marker(
+                node.parent
+            )
+        if borrowed:
+            if last.has_trailing_spaces and last.is_trailing_space_sensitive:
+                return " "
+            return ""
+        if last.has_trailing_spaces and last.is_trailing_space_sensitive:
+            return LINE
+        if last.type == "comment" or (
+            last.type == "text"
+            and node.is_whitespace_sensitive
+            and node.is_indentation_sensitive
+        ):
+            depth = 0
+            ancestor = node.parent
+            while ancestor is not None:
+                depth += 1
+                ancestor = ancestor.parent
+            indentation = TAB_WIDTH * (depth - 1)
+            value = last.value or ""
+            if re.search(rf"\n[\t ]{{{indentation}}}$", value):
+                return ""
+        return SOFTLINE
+
+    def between_line(self, prev_node, next_node):
+        if is_text_like(prev_node) and is_text_like(next_node):
+            if prev_node.is_trailing_space_sensitive:
+                if prev_node.has_trailing_spaces:
+                    if self.prefer_hardline_as_leading_spaces(next_node):
+                        return HARDLINE
+                    return LINE
+                return ""
+            if self.prefer_hardline_as_leading_spaces(next_node):
+                return HARDLINE
+            return SOFTLINE
+        if (
+            self.needs_to_borrow_next_opening_tag_start_marker(prev_node)
+            and (
+                next_node.first_child
+                or next_node.is_self_closing
+                or (next_node.type == "element" and next_node.attrs)
+            )
+        ) or (
+            prev_node.type == "element"
+            and prev_node.is_self_closing
+            and self.needs_to_borrow_prev_closing_tag_end_marker(next_node)
+        ):
+            return ""
+        if (
+            not next_node.is_leading_space_sensitive
+            or self.prefer_hardline_as_leading_spaces(next_node)
+            or (
+                self.needs_to_borrow_prev_closing_tag_end_marker(next_node)
+                and prev_node.last_child
+                and self.needs_to_borrow_parent_closing_tag_start_marker(
+                    prev_node.last_child
+                )
+                and prev_node.last_child.last_child
+                and self.needs_to_borrow_parent_closing_tag_start_marker(
+                    prev_node.last_child.last_child
+                )
+            )
+        ):
+            return HARDLINE
+        return LINE if next_node.has_leading_spaces else SOFTLINE
+
+    def print_children(self, node):
+        children = node.children
+        if self.force_break_children(node):
+            parts = [BREAK_PARENT]
+            for child in children:
+                if child.prev:
+                    between = self.between_line(child.prev, child)
+                    if between:
+                        parts.append(between)
+                        if self.force_next_empty_line(child.prev):
+                            parts.append(HARDLINE)
+                parts.append(self.print_node(child))
+            return parts
+
+        group_ids = [self.new_group_id() for _ in children]
+        parts = []
+        for index, child in enumerate(children):
+            if is_text_like(child):
+                if child.prev and is_text_like(child.prev):
+                    between = self.between_line(child.prev, child)
+                    if between:
+                        if self.force_next_empty_line(child.prev):
+                            parts.append(
+                                [HARDLINE, HARDLINE, self.print_node(child)]
+                            )
+                        else:
+                            parts.append([between, self.print_node(child)])
+                        continue
+                parts.append(self.print_node(child))
+                continue
+
+            prev_parts = []
+            leading_parts = []
+            trailing_parts = []
+            next_parts = []
+            prev_between = (
+                self.between_line(child.prev, child) if child.prev else ""
+            )
+            next_between = (
+                self.between_line(child, child.next) if child.next else ""
+            )
+            if prev_between:
+                if self.force_next_empty_line(child.prev):
+                    prev_parts.extend([HARDLINE, HARDLINE])
+                elif prev_between is HARDLINE:
+                    prev_parts.append(HARDLINE)
+                elif is_text_like(child.prev):
+                    leading_parts.append(prev_between)
+                else:
+                    leading_parts.append(
+                        IfBreak("", SOFTLINE, group_ids[index - 1])
+                    )
+            if next_between:
+                if self.force_next_empty_line(child):
+                    if is_text_like(child.next):
+                        next_parts.extend([HARDLINE, HARDLINE])
+                elif next_between is HARDLINE:
+                    if is_text_like(child.next):
+                        next_parts.append(HARDLINE)
+                else:
+                    trailing_parts.append(next_between)
+            parts.append(
+                [
+                    *prev_parts,
+                    Group(
+                        [
+                            *leading_parts,
+                            Group(
+                                [self.print_node(child), *trailing_parts],
+                                group_ids[index],
+                            ),
+                        ]
+                    ),
+                    *next_parts,
+                ]
+            )
+        return parts
+
+
+def trim_preserve_indentation(text):
+    text = text.rstrip(HTML_WHITESPACE)
+    return re.sub(r"^[\t\f\r ]*\n", "", text, count=1)
+
+
+def dedent_string(text):
+    indentation = None
+    for line in text.split("\n"):
+        if not line:
+            continue
+        if line[0] not in HTML_WHITESPACE:
+            return text
+        stripped = line.lstrip()
+        if not stripped:
+            continue
+        width = len(line) - len(stripped)
+        if indentation is None or width < indentation:
+            indentation = width
+    if not indentation:
+        return text
+    return "\n".join(line[indentation:] for line in text.split("\n"))
+
+
+def split_css(text, separator):
+    """
+    Split CSS on separator, ignoring separators in strings and parentheses.
+    """
+    parts = []
+    depth = 0
+    quote = None
+    current = []
+    for character in text:
+        if quote:
+            if character == quote:
+                quote = None
+        elif character in ("'", '"'):
+            quote = character
+        elif character == "(":
+            depth += 1
+        elif character == ")":
+            depth -= 1
+        elif character == separator and depth == 0:
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(character)
+    parts.append("".join(current))
+    return parts
+
+
+def print_style_declarations(value):
+    """
+    Return a document of the CSS declarations of a style attribute (or None if
+    the value isn't a list of declarations).
+    """
+    if "{" in value or "}" in value:
+        return None
+    declarations = []
+    for declaration in split_css(value, ";"):
+        if not declaration.strip():
+            continue
+        parts = split_css(declaration, ":")
+        if len(parts) < 2 or not parts[0].strip():
+            return None
+        prop = parts[0].strip()
+        if not prop.startswith("--"):
+            prop = prop.lower()
+        css_value = " ".join(":".join(parts[1:]).split())
+        css_value = re.sub(r"\s*,\s*", ", ", css_value)
+        css_value = re.sub(r"\s*!\s*important$", " !important", css_value)
+        declarations.append(f"{prop}: {css_value}")
+    if not declarations:
+        return None
+    doc = []
+    for index, declaration in enumerate(declarations):
+        if index:
+            doc.append(LINE)
+        if index < len(declarations) - 1:
+            doc.append(f"{declaration};")
+        else:
+            doc.extend([declaration, IfBreak(";", "")])
+    return doc
+
+
+def format_html(text):
+    """
+    Format HTML (str) with the layout of Prettier's HTML printer.
+    """
+    return Printer(text).format()
@@ -0,0 +1,73 @@
+# Standard library
+import logging
+from argparse import ArgumentParser
+
+# Third-party
+from django.core.management import BaseCommand, CommandError
+
+# First-party/Local
+from legal_tools.budget_utils import count_queries, get_sample_urls
+from legal_tools.publish_utils import warm_up
+from legal_tools.utils import init_utils_logger
+
+LOG = logging.getLogger(__name__)
+LOG_LEVELS = {
+    0: logging.ERROR,
+    1: logging.WARNING,
+    2: logging.INFO,
+    3: logging.DEBUG,
+}
+
+
+class Command(BaseCommand):
+    """
+    Render a representative sample of the published URLs (or the given URLs)
+    and print the number of database queries and the SQL time of each, then
+    check them against the query budgets declared in legal_tools/urls.py.
+    """
+
+    def add_arguments(self, parser: ArgumentParser):
+        # Python defaults to lowercase starting character for the first
+        # character of help text, but Djano appears to use uppercase and so
+        # shall we
+        parser.description = self.__doc__
+        parser._optionals.title = "Django optional arguments"
+        parser.add_argument(
+            "urls",
+            nargs="*",
+            metavar="URL",
+            help="URL paths to render (default: a sample of the published"
+            " URLs)",
+        )
+        parser.add_argument(
+            "--published",
+            action="store_true",
+            help="warm up like the publish command and check the budgets of"
+            " the publish tasks",
+        )
+
+    def handle(self, *args, **options):
+        LOG.setLevel(LOG_LEVELS[int(options["verbosity"])])
+        init_utils_logger(LOG)
+        urls = options["urls"] or get_sample_urls()
+        if options["published"]:
+            warm_up()
+        counts = count_queries(urls, published=options["published"])
+        width = max(len(count.url) for count in counts)
+        for count in counts:
+            limit = "-" if count.limit is None else count.limit
+            flag = " EXCEEDED" if count.exceeded else ""
+            self.stdout.write(
+                f"{count.url:<{width}} {count.status_code} {count.queries:>4}"
+                f"/{limit:<4} {count.seconds * 1000:8.2f} ms{flag}"
+            )
+        queries = sum(count.queries for count in counts)
+        seconds = sum(count.seconds for count in counts)
+        self.stdout.write(
+            f"{len(counts)} URLs: {queries} queries in {seconds:.3f} seconds"
+        )
+        exceeded = [count for count in counts if count.exceeded]
+        if exceeded:
+            raise CommandError(
+                f"{len(exceeded)} URLs exceeded their query budget"
+            )
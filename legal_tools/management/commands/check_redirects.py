@@ -0,0 +1,145 @@
+# Standard library
+import logging
+import os
+import time
+from argparse import ArgumentParser
+
+# Third-party
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+# First-party/Local
+from legal_tools.apache_utils import RedirectConfig, check_redirects
+from legal_tools.models import LegalCode
+from legal_tools.redirect_utils import (
+    RedirectMatchResolver,
+    get_known_paths,
+    get_language_redirect_pairs,
+    get_redirect_match_lines,
+)
+from legal_tools.utils import init_utils_logger
+
+LOG = logging.getLogger(__name__)
+LOG_LEVELS = {
+    0: logging.ERROR,
+    1: logging.WARNING,
+    2: logging.INFO,
+    3: logging.DEBUG,
+}
+CONFIG_DEFINE = "CC_LEGAL_TOOLS_CONFIG"
+
+
+class Command(BaseCommand):
+    """
+    Check the Apache2 redirects configuration written by the publish command
+    (config/language-redirects) without Apache2: the published deed and legal
+    code URLs, each language code alias, and the ccEngine bug URLs are
+    resolved with the configuration and compared to the redirects of the
+    legal tools.
+    """
+
+    def add_arguments(self, parser: ArgumentParser):
+        # Python defaults to lowercase starting character for the first
+        # character of help text, but Djano appears to use uppercase and so
+        # shall we
+        parser.description = self.__doc__
+        parser._optionals.title = "Django optional arguments"
+        parser.add_argument(
+            "--config",
+            help="Apache2 redirects configuration to check (default:"
+            " config/language-redirects of the data repository)",
+        )
+        parser.add_argument(
+            "--max-mismatches",
+            type=int,
+            default=20,
+            help="Maximum number of mismatches to list (default: 20)",
+        )
+
+    def get_expected(self):
+        """
+        Return the expected destination of each known URL path: the
+        destination of the language redirect that matches it, or None (no
+        redirect) if it was published.
+        """
+        redirect_pairs_data = []
+        published_paths = []
+        for queryset in LegalCode.objects.validgroups().values():
+            tools = set()
+            queryset = queryset.select_related("tool")
+            for legal_code in queryset.iterator():
+                tools.add(legal_code.tool)
+                redirect_pairs_data.append(legal_code.get_redirect_pairs())
+                published_paths += [
+                    legal_code.deed_url,
+                    legal_code.legal_code_url,
+                ]
+            for tool in tools:
+                for language_code in settings.LANGUAGES_MOSTLY_TRANSLATED:
+                    redirect_pairs_data.append(
+                        tool.get_redirect_pairs(language_code)
+                    )
+        _, ordered_pairs = get_redirect_match_lines(
+            get_language_redirect_pairs(redirect_pairs_data)
+        )
+        paths = set(
+            get_known_paths(
+                ordered_pairs, settings.LANGUAGES_MOSTLY_TRANSLATED
+            )
+        )
+        for path in published_paths:
+            paths.update([path, f"{path}.html"])
+        resolver = RedirectMatchResolver(ordered_pairs)
+        expected = {}
+        for path in sorted(paths):
+            destination = resolver.resolve(path)
+            if destination is not None:
+                expected[path] = destination
+            elif self.is_published(path):
+                expected[path] = None
+            # Other paths are only redirected by the fallbacks for absent
+            # deed translations (Steps 2 and 3)
+        return expected
+
+    def is_published(self, path):
+        filename = os.path.join(self.output_dir, path.lstrip("/"))
+        return os.path.isfile(filename) or os.path.isfile(f"{filename}.html")
+
+    def handle(self, *args, **options):
+        LOG.setLevel(LOG_LEVELS[int(options["verbosity"])])
+        init_utils_logger(LOG)
+        self.output_dir = os.path.abspath(settings.DISTILL_DIR)
+        config_dir = os.path.abspath(
+            os.path.join(self.output_dir, "..", "config")
+        )
+        config_path = options["config"] or os.path.join(
+            config_dir, "language-redirects"
+        )
+        try:
+            config = RedirectConfig.from_file(
+                config_path, self.output_dir, {CONFIG_DEFINE: config_dir}
+            )
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Unable to load {config_path}: {e}")
+        expected = self.get_expected()
+
+        start_time = time.perf_counter()
+        mismatches = check_redirects(config, expected)
+        elapsed = time.perf_counter() - start_time
+        rate = len(expected) / elapsed if elapsed else 0
+        LOG.info(
+            f"Checked {len(expected)} URLs in {elapsed:.2f} seconds"
+            f" ({rate:.0f} URLs per second)"
+        )
+        if mismatches:
+            for path, destination, actual in mismatches[
+                : options["max_mismatches"]
+            ]:
+                LOG.error(
+                    f"{path}: expected {destination or 'no redirect'}, got"
+                    f" {actual or 'no redirect'}"
+                )
+            raise CommandError(
+                f"{len(mismatches)} URLs are not redirected as expected by"
+                f" {config_path}"
+            )
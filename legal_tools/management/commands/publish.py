@@ -1,32 +1,101 @@
 # Standard library
+import gc
+import json
 import logging
+import multiprocessing
 import os
 import socket
+import subprocess
+import time
 from argparse import SUPPRESS, ArgumentParser
 from copy import copy
-from multiprocessing import Pool
-from pathlib import Path
+from importlib.util import find_spec
 from pprint import pprint
-from shutil import copyfile, copytree, rmtree
+from shutil import copytree, rmtree, which
 
 # Third-party
 from django.conf import settings
 from django.core.management import BaseCommand, CommandError, call_command
+from django.db import connections
 from django.urls import reverse
 
 # First-party/Local
 from i18n import DEFAULT_CSV_FILE
 from i18n.utils import (
     get_default_language_for_jurisdiction_deed,
+    get_default_language_for_jurisdiction_naive,
     write_transstats_csv,
 )
+from legal_tools.compress_utils import (
+    COMPRESS_MANIFEST_FILENAME,
+    COMPRESS_MIN_SIZE,
+    ENCODINGS,
+    CompressManifest,
+    CompressReport,
+    compress_file,
+    get_suffixes,
+    is_compressible,
+)
+from legal_tools.format_utils import (
+    get_format_cache_namespace,
+    get_html_formatter,
+    init_format_cache,
+    start_format_queue,
+    stop_format_queue,
+)
 from legal_tools.models import LegalCode, build_path
+from legal_tools.publish_utils import (
+    MANIFEST_FILENAME,
+    LinkPlan,
+    PublishManifest,
+    build_title_table,
+    combine_digests,
+    get_legal_code,
+    get_shard,
+    get_tool,
+    get_tool_digests,
+    load_shard_redirects,
+    parse_shard,
+    row_digest,
+    save_shard_redirects,
+    warm_up,
+)
+from legal_tools.publish_worker import init_worker
+from legal_tools.rdf_utils import (
+    generate_bulk_rdf,
+    get_rdf_tools,
+    init_rdf_cache,
+)
+from legal_tools.redirect_utils import (
+    REWRITE_MAP_NAME,
+    compact_redirect_pairs,
+    get_language_redirect_pairs,
+    get_redirect_match_lines,
+    get_rewrite_map,
+    get_rewrite_map_lines,
+    get_rewrite_rule_lines,
+    verify_compact_redirects,
+    verify_rewrite_map,
+)
+from legal_tools.registry import LegalToolsRegistry
+from legal_tools.timing_utils import (
+    get_timings,
+    start_timing,
+    stop_timing,
+    timed,
+)
 from legal_tools.utils import (
+    copy_file,
+    get_output_sync,
     init_utils_logger,
-    relative_symlink,
     save_bytes_to_file,
-    save_redirect,
+    save_redirects,
+    save_symlink,
     save_url_as_static_file,
+    start_file_writer,
+    start_output_sync,
+    stop_file_writer,
+    stop_output_sync,
     update_title,
 )
 from legal_tools.views import render_redirect
@@ -43,13 +112,14 @@ LOG_LEVELS = {
 # CNAME
 # https://docs.github.com/en/pages/configuring-a-custom-domain-for-your-github-pages-site
 DOCS_IGNORE = [".nojekyll", "CNAME"]
-
-
-def wrap_relative_symlink(output_dir, relpath, symlink):
-    try:
-        relative_symlink(output_dir, relpath, symlink)
-    except FileExistsError as e:
-        raise CommandError(f"[Errno {e.errno}] {e.strerror}: {relpath}")
+PRETTIER_BATCH_SIZE = 25
+WRITER_THREADS = 4
+# Each pool worker is sent about this many chunks of tasks (smaller chunks
+# balance the load better, larger chunks have less overhead)
+CHUNKS_PER_PROCESS = 4
+START_METHODS = multiprocessing.get_all_start_methods()
+# Forked workers share the state warmed up by the publish process
+DEFAULT_START_METHOD = "fork" if "fork" in START_METHODS else "spawn"
 
 
 def save_list(output_dir, category, language_code):
@@ -69,30 +139,30 @@ def save_list(output_dir, category, language_code):
     )
 
 
-def save_deed(output_dir, tool, language_code, opt_filter_apache_redirects):
+def save_deed(output_dir, tool_id, language_code, opt_filter_apache_redirects):
     # Function is at top level of module so that it can be pickled by
     # multiprocessing.
+    #
+    # The symlinks are created by the publish process (see plan_links).
+    tool = get_tool(tool_id)
     if not opt_filter_apache_redirects:
-        relpath, symlinks = tool.get_publish_files(language_code)
+        relpath, _ = tool.get_publish_files(language_code)
         save_url_as_static_file(
             output_dir,
             url=build_path(tool.base_url, "deed", language_code),
             relpath=relpath,
         )
-        for symlink in symlinks:
-            wrap_relative_symlink(output_dir, relpath, symlink)
     return tool.get_redirect_pairs(language_code)
 
 
-def save_legal_code(output_dir, legal_code, opt_filter_apache_redirects):
+def save_legal_code(output_dir, legal_code_id, opt_filter_apache_redirects):
     # Function is at top level of module so that it can be pickled by
     # multiprocessing.
+    #
+    # The symlinks are created by the publish process (see plan_links).
+    legal_code = get_legal_code(legal_code_id)
     if not opt_filter_apache_redirects:
-        (
-            relpath,
-            symlinks,
-            redirects_data,
-        ) = legal_code.get_publish_files()
+        relpath, _, redirects_data = legal_code.get_publish_files()
         if relpath:
             # Deed-only tools will not return a legal code relpath
             save_url_as_static_file(
@@ -100,28 +170,69 @@ def save_legal_code(output_dir, legal_code, opt_filter_apache_redirects):
                 url=legal_code.legal_code_url,
                 relpath=relpath,
             )
-        for symlink in symlinks:
-            wrap_relative_symlink(output_dir, relpath, symlink)
+        # Redirects with the same content are rendered once
+        redirect_files = {}
         for redirect_data in redirects_data:
-            redirect_content = render_redirect(
-                title=redirect_data["title"],
-                destination=redirect_data["destination"],
-                language_code=redirect_data["language_code"],
+            key = (
+                redirect_data["title"],
+                redirect_data["destination"],
+                redirect_data["language_code"],
             )
-            save_redirect(
-                output_dir, redirect_data["redirect_file"], redirect_content
+            redirect_files.setdefault(key, []).append(
+                redirect_data["redirect_file"]
             )
+        for (
+            title,
+            destination,
+            language_code,
+        ), files in redirect_files.items():
+            redirect_content, deferred = render_redirect(
+                title=title,
+                destination=destination,
+                language_code=language_code,
+                defer=True,
+            )
+            save_redirects(output_dir, files, redirect_content, deferred)
     return legal_code.get_redirect_pairs()
 
 
-def save_rdf(output_dir, tool):
+def save_chunk(task):
     # Function is at top level of module so that it can be pickled by
     # multiprocessing.
-    relpath = os.path.join(tool._get_save_path(), "rdf")
-    save_url_as_static_file(
-        output_dir,
-        url=build_path(tool.base_url, "rdf", None),
-        relpath=relpath,
+    #
+    # Unless the batch size is 0, pages rendered by func are queued and
+    # formatted by Prettier in batches (instead of one request per page). The
+    # queue is flushed before returning so that all of the files exist once
+    # the chunk is complete.
+    #
+    # Unless the number of writer threads is 0, files are written by I/O
+    # threads while the next pages are rendered. The threads are also stopped
+    # (once the queued files are written) before returning.
+    #
+    # If timing or output sync is enabled, the timings and the outputs of the
+    # chunk are returned with its results.
+    func, arguments, chunk_options = task
+    if chunk_options["timing"]:
+        start_timing()
+    if chunk_options["sync"]:
+        start_output_sync()
+    if chunk_options["writer_threads"] > 0:
+        start_file_writer(chunk_options["writer_threads"])
+    if chunk_options["batch_size"] > 0:
+        start_format_queue(chunk_options["batch_size"], save_bytes_to_file)
+    try:
+        results = [func(*args) for args in arguments]
+    finally:
+        try:
+            stop_format_queue()
+        finally:
+            stop_file_writer()
+    timings = stop_timing()
+    output_sync = stop_output_sync()
+    return (
+        results,
+        timings.get_data() if timings else None,
+        output_sync.get_data() if output_sync else None,
     )
 
 
@@ -166,6 +277,138 @@ class Command(BaseCommand):
             dest="filter_rdfxml",
         )
 
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only distill deeds, legal codes, lists, and RDF/XML whose"
+            " inputs changed since the last incremental publish (tracked in"
+            f" config/{MANIFEST_FILENAME}). The output directory is not"
+            " purged.",
+        )
+
+        shard_group = parser.add_argument_group(
+            title="Shard optional arguments (mutually exclusive)"
+        )
+        shard_args = shard_group.add_mutually_exclusive_group()
+        shard_args.add_argument(
+            "--shard",
+            action="store",
+            type=parse_shard,
+            metavar="K/N",
+            help="Only distill shard K of N (the lists and tools are"
+            " partitioned by hash). The language redirects data is saved to"
+            " config/shards/ for --merge-shards. Only shard 1 copies the"
+            " static files. The output directory is not purged.",
+        )
+        shard_args.add_argument(
+            "--merge-shards",
+            action="store_true",
+            help="Write the Apache2 language redirects configuration from the"
+            " data saved by each shard and distill the metadata CSV",
+        )
+
+        parser.add_argument(
+            "--sync",
+            action="store_true",
+            help="Instead of purging the output directory, only write files"
+            " whose content changed (atomically) and then remove the files"
+            " that were not published",
+        )
+
+        parser.add_argument(
+            "--link-plan",
+            action="store",
+            metavar="PATH",
+            help="Write the plan of the symlinks and redirects (one sorted"
+            " line per path, suitable for diffing releases)",
+        )
+
+        parser.add_argument(
+            "--plan-only",
+            action="store_true",
+            help="Only plan (and check) the symlinks and redirects, without"
+            " publishing (see --link-plan)",
+        )
+
+        parser.add_argument(
+            "--compress",
+            action="store_true",
+            help="Write pre-compressed gzip (and, if the brotli package is"
+            " installed, brotli) siblings of the HTML, RDF/XML and CSV files"
+            f" of at least {COMPRESS_MIN_SIZE} bytes (only recompressing"
+            " changed files)",
+        )
+
+        parser.add_argument(
+            "--compact-redirects",
+            action="store_true",
+            help="Merge the language redirects of each document and language"
+            " into a single RedirectMatch directive (with patterns built from"
+            " the tries of the paths and language code aliases)",
+        )
+
+        parser.add_argument(
+            "--rewrite-map",
+            action="store",
+            choices=["txt", "dbm"],
+            help="Write the language redirects as a RewriteMap (of the given"
+            " type) applied by a few rewrite rules, instead of one"
+            " RedirectMatch directive per redirect",
+        )
+
+        parser.add_argument(
+            "--prettier-batch-size",
+            action="store",
+            type=int,
+            default=PRETTIER_BATCH_SIZE,
+            help="Number of pages formatted by each Prettier batch request"
+            " (0 formats each page with its own request) (default:"
+            " %(default)s)",
+        )
+
+        parser.add_argument(
+            "--writer-threads",
+            action="store",
+            type=int,
+            default=WRITER_THREADS,
+            help="Number of I/O threads of each worker process that write the"
+            " rendered files (0 writes each file before rendering the next)"
+            " (default: %(default)s)",
+        )
+
+        parser.add_argument(
+            "--no-format-cache",
+            action="store_false",
+            help="Don't use (or update) the cache of formatted HTML",
+            dest="format_cache",
+        )
+        parser.add_argument(
+            "--no-rdf-cache",
+            action="store_false",
+            help="Don't use (or update) the cache of legal tool RDF/XML",
+            dest="rdf_cache",
+        )
+
+        parser.add_argument(
+            "--timing-report",
+            action="store",
+            metavar="PATH",
+            help="Write a JSON report of the duration of the publish stages"
+            " (totals and percentiles, including the pool workers) and of the"
+            " slowest URLs",
+        )
+
+        parser.add_argument(
+            "--start-method",
+            action="store",
+            choices=START_METHODS,
+            default=DEFAULT_START_METHOD,
+            help="Process pool start method. With fork, templates,"
+            " translations, and tools are loaded once before the workers are"
+            " started (otherwise each worker loads them) (default:"
+            " %(default)s)",
+        )
+
         # Hidden argparse troubleshooting option
         parser.add_argument(
             "--list-args",
@@ -230,7 +473,9 @@ class Command(BaseCommand):
             path,
         )
         destination = os.path.join(output_dir, path)
-        copytree(source, destination)
+        copytree(
+            source, destination, copy_function=copy_file, dirs_exist_ok=True
+        )
 
     def copy_static_cc_legal_tools_files(self):
         if not self.options["run"]["copy_static_cc_legal_tools_files"]:
@@ -247,7 +492,9 @@ class Command(BaseCommand):
             "cc-legal-tools",
         )
         destination = os.path.join(output_dir, path)
-        copytree(source, destination)
+        copytree(
+            source, destination, copy_function=copy_file, dirs_exist_ok=True
+        )
 
     def copy_static_rdf_files(self):
         if not self.options["run"]["copy_static_rdf_files"]:
@@ -264,7 +511,9 @@ class Command(BaseCommand):
             path,
         )
         destination = os.path.join(output_dir, path)
-        copytree(source, destination, dirs_exist_ok=True)
+        copytree(
+            source, destination, copy_function=copy_file, dirs_exist_ok=True
+        )
 
     def distill_and_symlink_rdf_meta(self):
         """
@@ -279,8 +528,10 @@ class Command(BaseCommand):
         LOG.debug(f"{hostname}:{output_dir}")
 
         # Distill RDF/XML meta files
-        for meta_file in ["index.rdf", "images.rdf", "ns.html"]:
-            # (schema.rdf is handled by the copy_static_rdf_files function)
+        for meta_file in ["images.rdf", "ns.html"]:
+            # (index.rdf is distilled with the RDF/XML of each tool by the
+            # distill_rdf function and schema.rdf is handled by the
+            # copy_static_rdf_files function)
             LOG.info(f"Distilling {meta_file}")
             save_url_as_static_file(
                 output_dir=dest_dir,
@@ -302,9 +553,7 @@ class Command(BaseCommand):
                 symlink = meta_file
                 symlink_dest = dest_relative
                 symlink_path = os.path.join(output_dir, symlink)
-            if os.path.islink(symlink_path):
-                os.remove(symlink_path)
-            Path(symlink_path).symlink_to(Path(symlink_dest))
+            save_symlink(symlink_dest, symlink_path)
             LOG.debug(f"   ^{symlink}")
 
     def copy_legal_code_plaintext(self):
@@ -337,7 +586,7 @@ class Command(BaseCommand):
             )
             dest_file = os.path.join(output_dir, relative_name)
             os.makedirs(os.path.dirname(dest_file), exist_ok=True)
-            copyfile(os.path.join(plaintext_dir, text), dest_file)
+            copy_file(os.path.join(plaintext_dir, text), dest_file)
             LOG.debug(f"    {relative_name}")
 
     def distill_dev_index(self):
@@ -354,6 +603,373 @@ class Command(BaseCommand):
             relpath="index.html",
         )
 
+    def prepare_manifest(self):
+        """
+        Load the publish manifest and compute the digests shared by the
+        fingerprints of the outputs.
+        """
+        if not self.options["incremental"]:
+            self.manifest = None
+            return
+        LOG.info("Loading publish manifest")
+        self.manifest = PublishManifest(
+            os.path.join(self.config_dir, MANIFEST_FILENAME),
+            self.output_dir,
+        )
+        # The HTML formatter backend and version (ex. a Prettier upgrade)
+        # change the published pages without any change to the sources
+        self.source_digest = combine_digests(
+            self.manifest.source_digest(),
+            get_format_cache_namespace(),
+            *settings.LANGUAGES_MOSTLY_TRANSLATED,
+        )
+        tools_registry = LegalToolsRegistry.from_database()
+        self.tool_digests = get_tool_digests(tools_registry)
+        # The sorted tool digests of each category (see fingerprint_list)
+        self.category_digests = {}
+        for tool in tools_registry.tools.values():
+            self.category_digests.setdefault(tool.category, []).append(
+                self.tool_digests[tool.id]
+            )
+        for digests in self.category_digests.values():
+            digests.sort()
+        self.locale_digests = {}
+
+    def locale_digest(self, *language_codes):
+        """
+        Return a digest of the Deeds & UX translations for the language codes.
+        """
+        digests = []
+        for language_code in sorted(set(language_codes)):
+            if language_code not in self.locale_digests:
+                self.locale_digests[language_code] = (
+                    self.manifest.translation_digest(
+                        "locale", language_code, "django"
+                    )
+                )
+            digests.append(self.locale_digests[language_code])
+        return combine_digests(*digests)
+
+    def fingerprint_list(self, category, language_code):
+        return combine_digests(
+            self.source_digest,
+            self.locale_digest(language_code),
+            *self.category_digests.get(category, []),
+        )
+
+    def fingerprint_deed(self, tool, language_code):
+        return combine_digests(
+            self.source_digest,
+            self.locale_digest(
+                language_code,
+                get_default_language_for_jurisdiction_naive(
+                    tool.jurisdiction_code
+                ),
+                settings.LANGUAGE_CODE,
+            ),
+            self.tool_digests[tool.id],
+        )
+
+    def fingerprint_legal_code(self, legal_code):
+        tool = legal_code.tool
+        return combine_digests(
+            self.source_digest,
+            self.locale_digest(
+                legal_code.language_code,
+                get_default_language_for_jurisdiction_naive(
+                    tool.jurisdiction_code
+                ),
+                settings.LANGUAGE_CODE,
+            ),
+            self.manifest.translation_digest(
+                "legalcode", legal_code.language_code, tool.resource_slug
+            ),
+            self.tool_digests[tool.id],
+            row_digest(legal_code),
+        )
+
+    def fingerprint_rdf(self, tool):
+        return combine_digests(self.source_digest, self.tool_digests[tool.id])
+
+    def prepare_format_cache(self):
+        if self.options["format_cache"]:
+            # Each formatter has its own cache (and the keys include the
+            # formatter version)
+            self.format_cache_args = (
+                os.path.join(settings.FORMAT_CACHE_DIR, get_html_formatter()),
+                settings.FORMAT_CACHE_MAX_SIZE,
+                get_format_cache_namespace(),
+            )
+        else:
+            self.format_cache_args = (None, None, None)
+        # Pool workers are initialized with the same arguments
+        self.format_cache = init_format_cache(*self.format_cache_args)
+
+    def prune_format_cache(self):
+        if not self.format_cache:
+            return
+        removed = self.format_cache.prune()
+        if removed:
+            LOG.info(
+                f"Removed {removed} least recently used format cache entries"
+            )
+        init_format_cache(None, None)
+
+    def start_pool(self):
+        """
+        Warm up the publish process before forking the pool workers (so they
+        share the loaded state copy-on-write), or have each worker warm up
+        when it starts. The title table is built once, by the publish
+        process, and sent to the workers that are not forked.
+        """
+        start_method = self.options["start_method"]
+        fork = start_method == "fork"
+        if fork:
+            LOG.info("Warming up before starting pool workers")
+            warm_up()
+            titles = None
+        else:
+            LOG.info("Building the title table before starting pool workers")
+            titles = build_title_table(LegalToolsRegistry.from_database())
+        # Workers must not share the database connection
+        connections.close_all()
+        if fork:
+            # Keep the garbage collector from touching (and so copying) the
+            # pages of the warmed up objects in the workers
+            gc.freeze()
+        context = multiprocessing.get_context(start_method)
+        self.processes = os.cpu_count() or 1
+        return context.Pool(
+            processes=self.processes,
+            initializer=init_worker,
+            initargs=(*self.format_cache_args, not fork, titles),
+        )
+
+    def get_chunk_size(self, count):
+        """
+        Return the number of tasks per chunk. With Prettier batching, a chunk
+        is formatted by a single batch request.
+        """
+        batch_size = self.options["prettier_batch_size"]
+        if batch_size > 0:
+            return batch_size
+        chunk_size, extra = divmod(count, self.processes * CHUNKS_PER_PROCESS)
+        if extra:
+            chunk_size += 1
+        return max(chunk_size, 1)
+
+    def get_chunks(self, arguments, affinity):
+        """
+        Group the arguments by their affinity key (ex. the language code) so
+        that each group is handled by one worker, which keeps its translation
+        catalogs and title cache entries hot. Groups are ordered largest first
+        and a group larger than a worker's share of the tasks is split.
+        """
+        if affinity is None:
+            chunk_size = self.get_chunk_size(len(arguments))
+            groups = [arguments]
+        else:
+            share, extra = divmod(len(arguments), self.processes)
+            chunk_size = share + 1 if extra else max(share, 1)
+            by_key = {}
+            for key, args in zip(affinity, arguments):
+                by_key.setdefault(key, []).append(args)
+            groups = sorted(by_key.values(), key=len, reverse=True)
+        chunks = []
+        for group in groups:
+            for start in range(0, len(group), chunk_size):
+                end = start + chunk_size
+                chunks.append(group[start:end])
+        return chunks
+
+    def pool_starmap(self, func, arguments, affinity=None):
+        """
+        Like Pool.starmap, except that the results are returned in completion
+        order and each chunk of tasks formats the pages it renders using
+        Prettier batch requests (unless the batch size is 0).
+
+        Arguments must be compact (ex. primary keys instead of model instances)
+        as they are pickled for the workers. If affinity is given, it is a list
+        of keys (one per arguments tuple) and tasks with the same key are sent
+        to the same worker.
+        """
+        timings = get_timings()
+        output_sync = get_output_sync()
+        chunk_options = {
+            "batch_size": self.options["prettier_batch_size"],
+            "writer_threads": self.options["writer_threads"],
+            "timing": timings is not None,
+            "sync": output_sync is not None,
+        }
+        chunks = [
+            (func, chunk, chunk_options)
+            for chunk in self.get_chunks(arguments, affinity)
+        ]
+        results = []
+        for (
+            chunk_results,
+            chunk_timings,
+            chunk_outputs,
+        ) in self.pool.imap_unordered(save_chunk, chunks):
+            results += chunk_results
+            if chunk_timings:
+                timings.merge(chunk_timings)
+            if chunk_outputs:
+                output_sync.merge(chunk_outputs)
+        return results
+
+    def include_group(self, group):
+        """
+        Return True unless the legal code group is excluded by
+        --filter-license-html.
+        """
+        filter_license_html = self.options["filter_license_html"]
+        return (
+            not filter_license_html
+            or group == f"Licenses {filter_license_html}"
+        )
+
+    def plan_links(self):
+        """
+        Plan the symlinks of the lists, deeds, and legal codes and check them
+        (and the redirect files) for conflicts before anything is published.
+        The symlinks are created once the pages are published (see
+        apply_link_plan).
+        """
+        options = self.options
+        plan = LinkPlan()
+        self.link_plan = plan
+        distill_lists = options["run"]["pool_distill_lists"]
+        distill_html = options["run"]["pool_distill_legal_tools"] and not (
+            options["filter_apache_redirects"] or options["filter_rdfxml"]
+        )
+        if distill_lists or distill_html:
+            LOG.info("Planning symlinks and redirects")
+        if distill_lists:
+            for category in ["licenses", "publicdomain"]:
+                for language_code in settings.LANGUAGES_MOSTLY_TRANSLATED:
+                    if self.in_shard(f"{category}/list.{language_code}"):
+                        plan.add_file(f"{category}/list.{language_code}.html")
+                if self.in_shard(f"{category}/list.{settings.LANGUAGE_CODE}"):
+                    relpath = f"{category}/list.{settings.LANGUAGE_CODE}.html"
+                    plan.add_symlink(relpath, "index.html")
+                    plan.add_symlink(relpath, "list.html")
+        if distill_html:
+            legal_codes = LegalCode.objects.validgroups()
+            for group in legal_codes.keys():
+                if not self.include_group(group):
+                    continue
+                tools = set()
+                queryset = legal_codes[group].select_related("tool")
+                for legal_code in queryset.iterator():
+                    if not self.in_shard(legal_code.tool.base_url):
+                        continue
+                    tools.add(legal_code.tool)
+                    (
+                        relpath,
+                        symlinks,
+                        redirects_data,
+                    ) = legal_code.get_publish_files()
+                    if relpath:
+                        plan.add_file(relpath)
+                    for symlink in symlinks:
+                        plan.add_symlink(relpath, symlink)
+                    for redirect_data in redirects_data:
+                        plan.add_redirect(
+                            redirect_data["redirect_file"],
+                            redirect_data["destination"],
+                        )
+                for tool in tools:
+                    for language_code in settings.LANGUAGES_MOSTLY_TRANSLATED:
+                        relpath, symlinks = tool.get_publish_files(
+                            language_code
+                        )
+                        plan.add_file(relpath)
+                        for symlink in symlinks:
+                            plan.add_symlink(relpath, symlink)
+
+        conflicts = plan.get_conflicts()
+        if options["link_plan"]:
+            path = os.path.abspath(options["link_plan"])
+            save_bytes_to_file(plan.get_listing().encode("utf-8"), path)
+            LOG.info(f"Wrote symlink and redirect plan: {path}")
+        if conflicts:
+            raise CommandError(
+                "Conflicting symlinks and redirects:\n" + "\n".join(conflicts)
+            )
+
+    def pool_compress_outputs(self):
+        """
+        Write gzip (and brotli) siblings of the compressible outputs, add
+        sibling symlinks for the symlinks to them, and remove stale siblings.
+        """
+        if not self.options["run"]["pool_compress_outputs"]:
+            return
+        LOG.info("Compressing outputs")
+        output_dir = self.output_dir
+        manifest = CompressManifest(
+            os.path.join(self.config_dir, COMPRESS_MANIFEST_FILENAME)
+        )
+        arguments = []
+        symlinks = []
+        siblings = []
+        for dirpath, dirnames, filenames in os.walk(output_dir):
+            if dirpath == output_dir:
+                dirnames[:] = [d for d in dirnames if d not in DOCS_IGNORE]
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                relpath = os.path.relpath(path, output_dir)
+                if filename.endswith(tuple(ENCODINGS)):
+                    siblings.append(relpath)
+                elif not is_compressible(filename):
+                    continue
+                elif os.path.islink(path):
+                    symlinks.append(relpath)
+                elif os.path.getsize(path) >= COMPRESS_MIN_SIZE:
+                    arguments.append(
+                        (output_dir, relpath, manifest.digests.get(relpath))
+                    )
+
+        report = CompressReport()
+        manifest.digests = {}
+        for relpath, digest, size, sizes, written in self.pool_starmap(
+            compress_file, arguments
+        ):
+            manifest.digests[relpath] = digest
+            report.add(size, sizes, written)
+        expected = set()
+        for relpath in manifest.digests:
+            expected.update(f"{relpath}{suffix}" for suffix in get_suffixes())
+        for relpath in symlinks:
+            path = os.path.join(output_dir, relpath)
+            target = os.readlink(path)
+            target_relpath = os.path.normpath(
+                os.path.join(os.path.dirname(relpath), target)
+            )
+            if target_relpath not in manifest.digests:
+                continue
+            for suffix in get_suffixes():
+                save_symlink(f"{target}{suffix}", f"{path}{suffix}")
+                expected.add(f"{relpath}{suffix}")
+        for relpath in siblings:
+            if relpath not in expected:
+                LOG.debug(f"    removing stale sibling: {relpath}")
+                os.remove(os.path.join(output_dir, relpath))
+        manifest.save()
+        for line in report.get_lines():
+            LOG.info(line)
+
+    def apply_link_plan(self):
+        if not self.link_plan.symlinks:
+            return
+        LOG.info("Creating symlinks")
+        try:
+            with timed("symlink"):
+                created = self.link_plan.apply(self.output_dir)
+        except FileExistsError as e:
+            raise CommandError(f"[Errno {e.errno}] {e.strerror}: {e.filename}")
+        LOG.debug(f"Created {created} symlinks")
+
     def pool_distill_lists(self):
         if not self.options["run"]["pool_distill_lists"]:
             return
@@ -364,17 +980,25 @@ class Command(BaseCommand):
         LOG.info("Distilling lists")
 
         arguments = []
+        affinity = []
+        manifest_records = []
         for category in ["licenses", "publicdomain"]:
             for language_code in settings.LANGUAGES_MOSTLY_TRANSLATED:
+                if not self.in_shard(f"{category}/list.{language_code}"):
+                    continue
+                if self.manifest:
+                    relpath = f"{category}/list.{language_code}.html"
+                    fingerprint = self.fingerprint_list(
+                        category, language_code
+                    )
+                    if self.manifest.is_current(relpath, fingerprint):
+                        continue
+                    manifest_records.append((relpath, fingerprint, [relpath]))
                 arguments.append((output_dir, category, language_code))
-        self.pool.starmap(save_list, arguments)
-
-        for category in ["licenses", "publicdomain"]:
-            relpath = f"{category}/list.{settings.LANGUAGE_CODE}.html"
-            symlink = "index.html"
-            wrap_relative_symlink(output_dir, relpath, symlink)
-            symlink = "list.html"
-            wrap_relative_symlink(output_dir, relpath, symlink)
+                affinity.append(language_code)
+        self.pool_starmap(save_list, arguments, affinity)
+        for record in manifest_records:
+            self.manifest.record(*record)
 
     def pool_distill_legal_tools(self):
         options = self.options
@@ -385,11 +1009,12 @@ class Command(BaseCommand):
         legal_codes = LegalCode.objects.validgroups()
         redirect_pairs_data = []
         default_languages_deeds = {}
+        rdf_tool_ids = set()
         for group in legal_codes.keys():
             tools = set()
             LOG.debug(f"{hostname}:{output_dir}")
             if options["filter_license_html"]:
-                if group != f"Licenses {options['filter_license_html']}":
+                if not self.include_group(group):
                     continue
                 LOG.info(f"Distilling {group} deed/legal code HTML")
             elif options["filter_rdfxml"]:
@@ -400,28 +1025,81 @@ class Command(BaseCommand):
                     " RDF/XML"
                 )
             legal_code_arguments = []
+            legal_code_affinity = []
             deed_arguments = []
-            rdf_arguments = []
-            for legal_code in legal_codes[group]:
+            deed_affinity = []
+            manifest_records = []
+            queryset = legal_codes[group].select_related("tool")
+            if self.manifest:
+                # The incremental fingerprints include the legal code HTML
+                queryset = queryset.with_html()
+            for legal_code in queryset.iterator():
+                if not self.in_shard(legal_code.tool.base_url):
+                    continue
                 tools.add(legal_code.tool)
+                if self.manifest:
+                    relpath, _, redirects_data = legal_code.get_publish_files()
+                    if relpath:
+                        relpaths = [relpath]
+                    else:
+                        # Deed-only tools only have legal code redirects
+                        relpaths = [
+                            redirect_data["redirect_file"]
+                            for redirect_data in redirects_data
+                        ]
+                    fingerprint = self.fingerprint_legal_code(legal_code)
+                    if self.manifest.is_current(relpaths[0], fingerprint):
+                        redirect_pairs_data.append(
+                            legal_code.get_redirect_pairs()
+                        )
+                        continue
+                    manifest_records.append(
+                        (relpaths[0], fingerprint, relpaths)
+                    )
                 legal_code_arguments.append(
                     (
                         output_dir,
-                        legal_code,
+                        legal_code.id,
                         options["filter_apache_redirects"],
                     )
                 )
+                legal_code_affinity.append(
+                    (legal_code.language_code, legal_code.tool.resource_slug)
+                )
             for tool in tools:
                 for language_code in settings.LANGUAGES_MOSTLY_TRANSLATED:
+                    if self.manifest:
+                        relpath, _ = tool.get_publish_files(language_code)
+                        fingerprint = self.fingerprint_deed(
+                            tool, language_code
+                        )
+                        if self.manifest.is_current(relpath, fingerprint):
+                            redirect_pairs_data.append(
+                                tool.get_redirect_pairs(language_code)
+                            )
+                            continue
+                        manifest_records.append(
+                            (relpath, fingerprint, [relpath])
+                        )
                     deed_arguments.append(
                         (
                             output_dir,
-                            tool,
+                            tool.id,
                             language_code,
                             options["filter_apache_redirects"],
                         )
                     )
-                rdf_arguments.append((output_dir, tool))
+                    deed_affinity.append(language_code)
+                if self.manifest:
+                    relpath = os.path.join(tool._get_save_path(), "rdf")
+                    fingerprint = self.fingerprint_rdf(tool)
+                    if not self.manifest.is_current(relpath, fingerprint):
+                        manifest_records.append(
+                            (relpath, fingerprint, [relpath])
+                        )
+                        rdf_tool_ids.add(tool.id)
+                else:
+                    rdf_tool_ids.add(tool.id)
                 if (
                     tool.jurisdiction_code
                     and tool.jurisdiction_code not in default_languages_deeds
@@ -435,21 +1113,113 @@ class Command(BaseCommand):
                     )
 
             if not options["filter_rdfxml"]:
-                redirect_pairs_data += self.pool.starmap(
-                    save_deed, deed_arguments
+                redirect_pairs_data += self.pool_starmap(
+                    save_deed, deed_arguments, deed_affinity
                 )
-                redirect_pairs_data += self.pool.starmap(
-                    save_legal_code, legal_code_arguments
+                redirect_pairs_data += self.pool_starmap(
+                    save_legal_code, legal_code_arguments, legal_code_affinity
                 )
-            if (
-                not options["filter_apache_redirects"]
-                and not options["filter_license_html"]
-            ):
-                self.pool.starmap(save_rdf, rdf_arguments)
+            for record in manifest_records:
+                self.manifest.record(*record)
+            if self.manifest:
+                count = len(manifest_records)
+                LOG.info(f"Distilled {count} changed {group} outputs")
 
+        if (
+            not options["filter_apache_redirects"]
+            and not options["filter_license_html"]
+        ):
+            self.distill_rdf(rdf_tool_ids)
+        if self.options["shard"]:
+            self.save_shard_redirects(
+                default_languages_deeds, redirect_pairs_data
+            )
+        else:
+            self.distill_language_redirects(
+                default_languages_deeds, redirect_pairs_data
+            )
+
+    def distill_rdf(self, tool_ids):
+        """
+        Distill the RDF/XML of the tools and the index.rdf of all tools in a
+        single pass (see generate_bulk_rdf), from a few queries and the RDF
+        cache (unless --no-rdf-cache).
+        """
+        index = self.options["run"]["distill_and_symlink_rdf_meta"]
+        LOG.info(
+            f"Distilling RDF/XML of {len(tool_ids)} legal tools"
+            f"{' and index.rdf' if index else ''}"
+        )
+        output_dir = self.output_dir
+        if self.options["rdf_cache"]:
+            cache = init_rdf_cache(
+                settings.RDF_CACHE_DIR, settings.RDF_CACHE_MAX_SIZE
+            )
+        else:
+            cache = None
+        with timed("rdf"):
+            documents, index_content = generate_bulk_rdf(
+                get_rdf_tools(), tool_ids, index, cache
+            )
+        if cache:
+            LOG.info(f"RDF cache: {cache.hits} hits, {cache.misses} misses")
+            removed = cache.prune()
+            if removed:
+                LOG.info(
+                    f"Removed {removed} least recently used RDF cache entries"
+                )
+        for tool, content in documents.items():
+            relpath = os.path.join(tool._get_save_path(), "rdf")
+            LOG.debug(f"    {relpath}")
+            save_bytes_to_file(
+                content.encode("utf-8"), os.path.join(output_dir, relpath)
+            )
+        if index_content is not None:
+            save_bytes_to_file(
+                index_content.encode("utf-8"),
+                os.path.join(output_dir, "rdf", "index.rdf"),
+            )
+
+    def in_shard(self, key):
+        shard = self.options["shard"]
+        return not shard or get_shard(key, shard[1]) == shard[0]
+
+    def save_shard_redirects(
+        self, default_languages_deeds, redirect_pairs_data
+    ):
+        if not self.options["run"]["distill_language_redirects"]:
+            return
+        shard, count = self.options["shard"]
+        path = save_shard_redirects(
+            self.config_dir,
+            shard,
+            count,
+            default_languages_deeds,
+            redirect_pairs_data,
+        )
+        LOG.info(
+            f"Saved shard {shard}/{count} language redirects data: {path}"
+        )
+
+    def merge_shards(self):
+        LOG.info("Merging shards")
+        try:
+            (
+                default_languages_deeds,
+                redirect_pairs_data,
+                paths,
+            ) = load_shard_redirects(self.config_dir)
+        except ValueError as e:
+            raise CommandError(str(e))
         self.distill_language_redirects(
             default_languages_deeds, redirect_pairs_data
         )
+        self.distill_metadata_csv()
+        for path in paths:
+            os.remove(path)
+        shards_dir = os.path.dirname(paths[0])
+        if not os.listdir(shards_dir):
+            os.rmdir(shards_dir)
 
     def distill_language_redirects(
         self, default_languages_deeds, redirect_pairs_data
@@ -478,39 +1248,18 @@ class Command(BaseCommand):
             "#       - Redirect legacy bug URLs to valid URLs",
             "",
         ]
-        redirect_pairs = []
-        for pair_list in redirect_pairs_data:
-            redirect_pairs += pair_list
+        redirect_pairs = get_language_redirect_pairs(redirect_pairs_data)
         del redirect_pairs_data
-        # Add RedirectMatch for ccEngine bug URLs. Entries are added for each
-        # of the 4.0 licenses (versus only two regex) to increase readability.
-        # https://github.com/creativecommons/cc-legal-tools-app/issues/438
-        for unit in ("by", "by-nc", "by-nc-nd", "by-nc-sa", "by-nd", "by-sa"):
-            # deed
-            redirect_pairs.append(
-                [
-                    f"/licenses/{unit}/4[.]0/([^/]+)/(deed|deed[.]html)?",
-                    f"/licenses/{unit}/4.0/deed.$1",
-                ]
-            )
-            # legalcode
-            redirect_pairs.append(
-                [
-                    f"/licenses/{unit}/4[.]0/([^/]+)/legalcode(?:[.]html)?",
-                    f"/licenses/{unit}/4.0/legalcode.$1",
-                ]
-            )
-        widths = [max(map(len, map(str, col))) for col in zip(*redirect_pairs)]
-        pad = widths[0] + 2
-        redirect_lines = []
-        for pair in redirect_pairs:
-            pcre_match = f'"^{pair[0]}$"'
-            redirect_lines.append(
-                f'RedirectMatch  301  {pcre_match.ljust(pad)}  "{pair[1]}"'
-            )
+        redirect_lines, ordered_pairs = get_redirect_match_lines(
+            redirect_pairs
+        )
         del redirect_pairs
-        redirect_lines.sort(reverse=True)
-        include_lines += redirect_lines
+        if self.options["compact_redirects"]:
+            redirect_lines = self.compact_redirects(ordered_pairs)
+        if self.options["rewrite_map"]:
+            include_lines += self.save_rewrite_map(ordered_pairs)
+        else:
+            include_lines += redirect_lines
         del redirect_lines
 
         # Step 2: Redirect absent deed translations for ported licenses
@@ -573,11 +1322,105 @@ class Command(BaseCommand):
         include_filename = os.path.join(self.config_dir, "language-redirects")
         save_bytes_to_file(include_lines, include_filename)
 
+    def compact_redirects(self, ordered_pairs):
+        """
+        Merge the language redirects into trie-built rules and check that
+        they resolve every known path like the original RedirectMatch
+        directives. Returns the RedirectMatch directives of the rules.
+        """
+        compact_pairs = compact_redirect_pairs(ordered_pairs)
+        self.check_redirect_mismatches(
+            "Compacted redirects",
+            verify_compact_redirects(
+                ordered_pairs,
+                compact_pairs,
+                samples=settings.LANGUAGES_MOSTLY_TRANSLATED,
+            ),
+        )
+        LOG.info(
+            f"Compacted {len(ordered_pairs)} language redirects into"
+            f" {len(compact_pairs)} rules"
+        )
+        return get_redirect_match_lines(compact_pairs)[0]
+
+    def check_redirect_mismatches(self, name, mismatches):
+        if not mismatches:
+            return
+        details = "\n".join(
+            f"    {path}: {expected} != {actual}"
+            for path, expected, actual in mismatches[:20]
+        )
+        raise CommandError(
+            f"{name} resolve {len(mismatches)} paths differently than the"
+            f" RedirectMatch directives:\n{details}"
+        )
+
+    def save_rewrite_map(self, ordered_pairs):
+        """
+        Compile the language redirects into a RewriteMap, check that it
+        resolves every known path like the RedirectMatch directives, and save
+        it. Returns the directives that apply it.
+        """
+        rewrite_map, rules = get_rewrite_map(ordered_pairs)
+        self.check_redirect_mismatches(
+            "RewriteMap and rewrite rules",
+            verify_rewrite_map(
+                ordered_pairs,
+                rewrite_map,
+                rules,
+                samples=settings.LANGUAGES_MOSTLY_TRANSLATED,
+            ),
+        )
+        LOG.info(
+            f"Writing RewriteMap of {len(rewrite_map)} paths (and"
+            f" {len(rules)} rewrite rules)"
+        )
+        map_lines = [
+            "# DO NOT EDIT MANUALLY",
+            "#",
+            "# This file was generated by the publish command.",
+            "",
+        ] + get_rewrite_map_lines(rewrite_map)
+        txt_filename = os.path.join(self.config_dir, f"{REWRITE_MAP_NAME}.txt")
+        save_bytes_to_file(
+            "".join(f"{line}\n" for line in map_lines).encode("utf-8"),
+            txt_filename,
+        )
+        map_type = self.options["rewrite_map"]
+        if map_type == "dbm":
+            map_type = self.save_rewrite_map_dbm(txt_filename, rewrite_map)
+        return get_rewrite_rule_lines(rules, map_type)
+
+    def save_rewrite_map_dbm(self, txt_filename, rewrite_map):
+        """
+        Save the RewriteMap as a DBM file using Apache2's httxt2dbm (or, if it
+        isn't installed, the GNU dbm module). Returns the RewriteMap type.
+        """
+        dbm_filename = os.path.join(self.config_dir, f"{REWRITE_MAP_NAME}.dbm")
+        httxt2dbm = which("httxt2dbm")
+        if httxt2dbm:
+            subprocess.run(
+                [httxt2dbm, "-i", txt_filename, "-o", dbm_filename],
+                check=True,
+                capture_output=True,
+            )
+            return "dbm"
+        # Standard library
+        import dbm.gnu
+
+        with dbm.gnu.open(dbm_filename, "n") as db:
+            for path, destination in rewrite_map.items():
+                db[path] = destination
+        return "dbm=gdbm"
+
     def distill_transstats_csv(self):
         LOG.info("Generating translations statistics CSV")
         write_transstats_csv(DEFAULT_CSV_FILE)
 
     def distill_metadata_csv(self):
+        if self.options["shard"]:
+            # Distilled by --merge-shards
+            return
         hostname = socket.gethostname()
         output_dir = self.output_dir
 
@@ -590,6 +1433,64 @@ class Command(BaseCommand):
             relpath="../config/cc-legal-tools.csv",
         )
 
+    def save_manifest(self):
+        if not self.manifest:
+            return
+        removed = self.manifest.remove_orphans()
+        if removed:
+            LOG.info(f"Removed {removed} orphaned outputs")
+        LOG.info("Writing publish manifest")
+        self.manifest.save()
+
+    def remove_orphans(self):
+        output_sync = stop_output_sync()
+        if not output_sync:
+            return
+        LOG.info(
+            f"Wrote {output_sync.written} changed files (skipped"
+            f" {output_sync.skipped} unchanged files)"
+        )
+        removed = output_sync.remove_orphans(self.output_dir, DOCS_IGNORE)
+        if removed:
+            LOG.info(f"Removed {removed} orphaned files")
+
+    def start_timing(self):
+        self.command_stages = []
+        self.started = time.perf_counter()
+        if self.options["timing_report"]:
+            start_timing()
+
+    def run_stages(self, *stages):
+        """
+        Run the stages (Command methods), recording their durations. Returns
+        the result of the last stage.
+        """
+        result = None
+        for stage in stages:
+            start = time.perf_counter()
+            result = stage()
+            self.command_stages.append(
+                (stage.__name__, time.perf_counter() - start)
+            )
+        return result
+
+    def write_timing_report(self):
+        timings = stop_timing()
+        if not timings:
+            return
+        path = self.options["timing_report"]
+        LOG.info(f"Writing timing report: {path}")
+        report = {
+            "total_seconds": round(time.perf_counter() - self.started, 6),
+            "command_stages": {
+                name: round(seconds, 6)
+                for name, seconds in self.command_stages
+            },
+        }
+        report.update(timings.get_report())
+        content = json.dumps(report, indent=2)
+        save_bytes_to_file(f"{content}\n".encode("utf-8"), path)
+
     def parse_filters(self):
         options = self.options
         # Set default run values (all True)
@@ -606,6 +1507,7 @@ class Command(BaseCommand):
             "pool_distill_lists": False,
             "pool_distill_legal_tools": False,
             "distill_language_redirects": False,
+            "pool_compress_outputs": False,
         }
         # Filter Apache2 config
         if options["filter_apache_redirects"]:
@@ -621,6 +1523,82 @@ class Command(BaseCommand):
         # Unfiltered/default
         else:
             options["run"] = dict.fromkeys(options["run"], True)
+        # Compression is opt-in
+        options["run"]["pool_compress_outputs"] &= options["compress"]
+        # Incremental publishing relies on the previously published files
+        if options["incremental"]:
+            if any(
+                [
+                    options["filter_apache_redirects"],
+                    options["filter_license_html"],
+                    options["filter_rdfxml"],
+                ]
+            ):
+                raise CommandError(
+                    "--incremental can't be combined with filter arguments"
+                )
+            options["run"]["purge_output_dir"] = False
+        if options["sync"]:
+            if any(
+                [
+                    options["incremental"],
+                    options["shard"],
+                    options["merge_shards"],
+                    options["filter_apache_redirects"],
+                    options["filter_license_html"],
+                    options["filter_rdfxml"],
+                ]
+            ):
+                raise CommandError(
+                    "--sync can't be combined with --incremental, shard or"
+                    " filter arguments"
+                )
+            options["run"]["purge_output_dir"] = False
+        if options["shard"] or options["merge_shards"]:
+            if options["incremental"] or any(
+                [
+                    options["filter_apache_redirects"],
+                    options["filter_license_html"],
+                    options["filter_rdfxml"],
+                ]
+            ):
+                raise CommandError(
+                    "--shard and --merge-shards can't be combined with"
+                    " --incremental or filter arguments"
+                )
+            if options["compress"]:
+                raise CommandError(
+                    "--compress can't be combined with --shard or"
+                    " --merge-shards"
+                )
+            # Shards may share the output directory
+            options["run"]["purge_output_dir"] = False
+        if options["compact_redirects"] and options["rewrite_map"]:
+            raise CommandError(
+                "--compact-redirects can't be combined with --rewrite-map"
+            )
+        if (
+            options["rewrite_map"] == "dbm"
+            and not which("httxt2dbm")
+            and not find_spec("_gdbm")
+        ):
+            raise CommandError(
+                "--rewrite-map=dbm requires Apache2's httxt2dbm or Python's"
+                " dbm.gnu module"
+            )
+        if options["shard"] and options["shard"][0] != 1:
+            # Only the first shard distills the files that aren't partitioned
+            for stage in [
+                "call_collectstatic",
+                "write_robots_txt",
+                "copy_static_wp_content_files",
+                "copy_static_cc_legal_tools_files",
+                "copy_static_rdf_files",
+                "distill_and_symlink_rdf_meta",
+                "copy_legal_code_plaintext",
+                "distill_dev_index",
+            ]:
+                options["run"][stage] = False
 
     def handle(self, *args, **options):
         LOG.setLevel(LOG_LEVELS[int(options["verbosity"])])
@@ -632,7 +1610,7 @@ class Command(BaseCommand):
             pprint(options)
             return
 
-        if settings.PRETTIER_SLOW:
+        if settings.PRETTIER_SLOW and get_html_formatter() == "prettier":
             raise CommandError(
                 "PRETTIER_SLOW mustn't be enabled during publish"
             )
@@ -651,18 +1629,45 @@ class Command(BaseCommand):
             )
         self.relpath = os.path.relpath(self.output_dir, git_dir)
 
-        self.check_titles()
-        self.purge_output_dir()
-        self.call_collectstatic()
-        self.write_robots_txt()
-        self.copy_static_wp_content_files()
-        self.copy_static_cc_legal_tools_files()
-        self.copy_static_rdf_files()
-        self.distill_and_symlink_rdf_meta()
-        self.copy_legal_code_plaintext()
-        self.distill_dev_index()
-        with Pool() as self.pool:
-            self.pool_distill_lists()
-            self.pool_distill_legal_tools()
-        self.distill_metadata_csv()
-        # DISABLED # self.distill_transstats_csv()
+        if options["merge_shards"]:
+            self.merge_shards()
+            return
+
+        if options["plan_only"]:
+            self.plan_links()
+            return
+
+        self.start_timing()
+        if options["sync"]:
+            start_output_sync()
+        self.run_stages(
+            self.check_titles,
+            self.plan_links,
+            self.prepare_manifest,
+            self.prepare_format_cache,
+            self.purge_output_dir,
+            self.call_collectstatic,
+            self.write_robots_txt,
+            self.copy_static_wp_content_files,
+            self.copy_static_cc_legal_tools_files,
+            self.copy_static_rdf_files,
+            self.distill_and_symlink_rdf_meta,
+            self.copy_legal_code_plaintext,
+            self.distill_dev_index,
+        )
+        with self.run_stages(self.start_pool) as self.pool:
+            self.run_stages(
+                self.pool_distill_lists,
+                self.pool_distill_legal_tools,
+                self.apply_link_plan,
+                self.pool_compress_outputs,
+            )
+        gc.unfreeze()
+        self.run_stages(
+            self.distill_metadata_csv,
+            # DISABLED # self.distill_transstats_csv,
+            self.save_manifest,
+            self.prune_format_cache,
+            self.remove_orphans,
+        )
+        self.write_timing_report()
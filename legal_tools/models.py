@@ -6,10 +6,11 @@ import posixpath
 import polib
 from django.conf import settings
 from django.db import models
-from django.db.models import Q
+from django.db.models import Prefetch, Q
 from django.utils import translation
 
 # First-party/Local
+import legal_tools.registry
 from i18n import LANGMAP_DJANGO_TO_PCRE
 from i18n.utils import (
     get_default_language_for_jurisdiction_deed,
@@ -114,6 +115,14 @@ class LegalCodeQuerySet(models.QuerySet):
 
     PUBLIC_DOMAIN_ZERO_QUERY = Q(tool__unit="zero")
 
+    def with_html(self):
+        """
+        Return a queryset of the LegalCode objects with their HTML loaded. The
+        HTML is deferred by default (see LegalCodeManager) as only the legal
+        code view renders it. This also clears any other deferred fields.
+        """
+        return self.defer(None)
+
     def translated(self):
         """
         Return a queryset of the LegalCode objects that we are doing the
@@ -168,6 +177,15 @@ class LegalCodeQuerySet(models.QuerySet):
         }
 
 
+class LegalCodeManager(models.Manager.from_queryset(LegalCodeQuerySet)):
+    def get_queryset(self):
+        """
+        Defer the legal code HTML (the legacy legal code markup), which is
+        only rendered by the legal code view (see LegalCodeQuerySet.with_html).
+        """
+        return super().get_queryset().defer("html")
+
+
 class LegalCode(models.Model):
     tool = models.ForeignKey(
         "legal_tools.Tool",
@@ -209,7 +227,7 @@ class LegalCode(models.Model):
         default="",
     )
 
-    objects = LegalCodeQuerySet.as_manager()
+    objects = LegalCodeManager()
 
     class Meta:
         ordering = ["tool", "language_code"]
@@ -386,6 +404,25 @@ class LegalCode(models.Model):
         return pofile_path
 
 
+class ToolQuerySet(models.QuerySet):
+    def with_metadata(self):
+        """
+        Return a queryset of the Tool objects with their legal codes
+        prefetched (ordered by language code and limited to the fields used by
+        get_metadata()) so that the metadata of all of them is computed from
+        two queries.
+        """
+        return self.prefetch_related(
+            Prefetch(
+                "legal_codes",
+                queryset=LegalCode.objects.order_by("language_code").only(
+                    "tool_id", "language_code", "title"
+                ),
+                to_attr="metadata_legal_codes",
+            )
+        )
+
+
 class Tool(models.Model):
     base_url = models.URLField(
         "Base URL",
@@ -480,6 +517,8 @@ class Tool(models.Model):
     prohibits_commercial_use = models.BooleanField(default=None)
     prohibits_high_income_nation_use = models.BooleanField(default=None)
 
+    objects = ToolQuerySet.as_manager()
+
     def __lt__(self, other):
         """Magic method to support sorting"""
         return (
@@ -560,7 +599,7 @@ class Tool(models.Model):
         if not language_code:
             language_code = translation.get_language()
         try:
-            return self.legal_codes.get(language_code=language_code)
+            return legal_tools.registry.find_legal_code(self, language_code)
         except LegalCode.DoesNotExist as e:
             e.args = (f"{e.args[0]} language_code={language_code}",)
             raise
@@ -572,13 +611,18 @@ class Tool(models.Model):
         language_default = get_default_language_for_jurisdiction_deed(
             self.jurisdiction_code
         )
+        # Prefetched by ToolQuerySet.with_metadata()
+        legal_codes = getattr(self, "metadata_legal_codes", None)
+        if legal_codes is None:
+            legal_codes = self.legal_codes.order_by("language_code").only(
+                "language_code", "title"
+            )
+        default_lc = False
+        for lc in legal_codes:
+            if lc.language_code == language_default:
+                default_lc = lc
+                break
         data = {}
-        try:
-            default_lc = self.legal_codes.filter(
-                language_code=language_default
-            )[0]
-        except IndexError:
-            default_lc = False
         data["base_url"] = self.base_url
         data["category"] = self.category
         data["deed_only"] = self.deed_only
@@ -599,7 +643,7 @@ class Tool(models.Model):
         data["language_default"] = language_default
         if not self.deed_only:
             data["legal_code_languages"] = {}
-            for lc in self.legal_codes.order_by("language_code"):
+            for lc in legal_codes:
                 lang_code = lc.language_code
                 language_info = translation.get_language_info(lang_code)
                 data["legal_code_languages"][lang_code] = language_info["name"]
@@ -623,6 +667,7 @@ class Tool(models.Model):
                 self.category,
                 self.jurisdiction_code,
                 language_default,
+                legal_code_title="",
             )
         data["unit"] = self.unit
         data["version"] = self.version
@@ -0,0 +1,597 @@
+# Standard library
+import argparse
+import errno
+import glob
+import hashlib
+import json
+import logging
+import os
+
+# Third-party
+from django.conf import settings
+from django.template.loader import get_template
+from django.utils import translation
+
+# First-party/Local
+from i18n.utils import (
+    get_default_language_for_jurisdiction_naive,
+    get_pofile_path,
+    preload_translation_objects,
+)
+from legal_tools.models import LegalCode, Tool
+from legal_tools.registry import LegalToolsRegistry, activate_registry
+from legal_tools.utils import (
+    get_output_sync,
+    get_replaced_titles,
+    get_tool_title,
+    init_title_table,
+    save_bytes_to_file,
+)
+
+LOG = logging.getLogger(__name__)
+MANIFEST_FILENAME = "publish-manifest.json"
+MANIFEST_VERSION = 1
+# Directories whose contents affect every published file. Tests do not.
+SOURCE_DIRS = [
+    os.path.join("cc_legal_tools", "settings"),
+    "i18n",
+    "legal_tools",
+    "templates",
+]
+SOURCE_EXTENSIONS = (".html", ".py", ".txt")
+SHARDS_DIRNAME = "shards"
+# Read-only snapshot of the tools and legal codes loaded by warm_up()
+_snapshot = None
+# Tools and legal codes that are not in the snapshot, cached by each process
+_objects = {}
+
+
+def hash_bytes(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path):
+    """
+    Return the SHA-256 hex digest of the file at path (or None if the file does
+    not exist).
+    """
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def combine_digests(*parts):
+    """
+    Combine digests (or any strings) into a single fingerprint.
+    """
+    return hash_bytes("\0".join(str(part) for part in parts))
+
+
+def row_digest(instance, exclude=None):
+    """
+    Return a digest of the concrete field values of a model instance. (The
+    database does not track row versions, so the row content is the version.)
+    """
+    exclude = exclude or []
+    values = {}
+    for field in instance._meta.concrete_fields:
+        if field.name in exclude:
+            continue
+        values[field.attname] = getattr(instance, field.attname)
+    return hash_bytes(json.dumps(values, sort_keys=True, default=str))
+
+
+class PublishManifest:
+    """
+    Track the input fingerprint and the output hashes of each published file so
+    that an incremental publish only re-distills outputs whose inputs changed.
+
+    Structure:
+        files:   input file path -> mtime, size, and SHA-256 (allows hashes
+                 of unchanged PO/MO files and templates to be reused)
+        outputs: output key (relpath) -> input fingerprint and the SHA-256 of
+                 each file written for it
+    """
+
+    def __init__(self, path, output_dir):
+        self.path = path
+        self.output_dir = output_dir
+        self.files = {}
+        self.outputs = {}
+        self.seen = set()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "rb") as f:
+                data = json.loads(f.read().decode("utf-8"))
+        except FileNotFoundError:
+            return
+        except ValueError:
+            LOG.warning(f"Ignoring invalid publish manifest: {self.path}")
+            return
+        if data.get("version") != MANIFEST_VERSION:
+            LOG.warning(f"Ignoring outdated publish manifest: {self.path}")
+            return
+        self.files = data.get("files", {})
+        self.outputs = data.get("outputs", {})
+
+    def save(self):
+        data = {
+            "version": MANIFEST_VERSION,
+            "files": self.files,
+            "outputs": self.outputs,
+        }
+        content = json.dumps(data, indent=2, sort_keys=True)
+        save_bytes_to_file(f"{content}\n".encode("utf-8"), self.path)
+
+    def file_digest(self, path):
+        """
+        Return the SHA-256 of an input file, re-hashing it only if its
+        modification time or size changed since the last publish.
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.files.pop(path, None)
+            return ""
+        cached = self.files.get(path)
+        if (
+            cached
+            and cached["mtime_ns"] == stat.st_mtime_ns
+            and cached["size"] == stat.st_size
+        ):
+            return cached["sha256"]
+        sha256 = hash_file(path)
+        self.files[path] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": sha256,
+        }
+        return sha256
+
+    def files_digest(self, paths):
+        return combine_digests(
+            *[f"{path}:{self.file_digest(path)}" for path in sorted(paths)]
+        )
+
+    def source_digest(self):
+        """
+        Return a digest of the templates, application code and settings (a
+        change to any of them may change every output).
+        """
+        paths = []
+        for source_dir in SOURCE_DIRS:
+            top = os.path.join(settings.PROJECT_ROOT, source_dir)
+            for dirpath, dirnames, filenames in os.walk(top):
+                dirnames[:] = sorted(
+                    d for d in dirnames if d not in ("__pycache__", "tests")
+                )
+                for filename in filenames:
+                    if filename.endswith(SOURCE_EXTENSIONS):
+                        paths.append(os.path.join(dirpath, filename))
+        return self.files_digest(paths)
+
+    def translation_digest(self, locale_or_legalcode, language_code, domain):
+        """
+        Return a digest of the PO and MO files of a translation domain.
+        """
+        pofile_path = get_pofile_path(
+            locale_or_legalcode=locale_or_legalcode,
+            language_code=language_code,
+            translation_domain=domain,
+        )
+        mofile_path = f"{pofile_path[:-3]}.mo"
+        return self.files_digest([pofile_path, mofile_path])
+
+    def is_current(self, key, fingerprint):
+        """
+        Return True if the output(s) for key were published from inputs with
+        the same fingerprint and have not changed on disk since.
+        """
+        self.seen.add(key)
+        entry = self.outputs.get(key)
+        if not entry or entry["input"] != fingerprint:
+            return False
+        for relpath, sha256 in entry["outputs"].items():
+            if hash_file(os.path.join(self.output_dir, relpath)) != sha256:
+                return False
+        return True
+
+    def record(self, key, fingerprint, relpaths):
+        """
+        Record the fingerprint and the hashes of the files written for key.
+        """
+        self.seen.add(key)
+        self.outputs[key] = {
+            "input": fingerprint,
+            "outputs": {
+                relpath: hash_file(os.path.join(self.output_dir, relpath))
+                for relpath in relpaths
+            },
+        }
+
+    def remove_orphans(self):
+        """
+        Remove outputs recorded by a previous publish that were neither checked
+        nor recorded by this one (ex. the tool or translation was removed).
+        """
+        removed = 0
+        for key in sorted(set(self.outputs.keys()) - self.seen):
+            for relpath in self.outputs[key]["outputs"]:
+                path = os.path.join(self.output_dir, relpath)
+                if os.path.isfile(path) or os.path.islink(path):
+                    LOG.debug(f"    removing orphan: {relpath}")
+                    os.remove(path)
+                    removed += 1
+            del self.outputs[key]
+        return removed
+
+
+class LinkPlan:
+    """
+    Plan of the symlinks of a publish run (and of the pages and redirect files
+    they may conflict with). The plan is validated before anything is
+    published and the symlinks are then created one directory at a time.
+
+    Paths are relative to the output directory and symlink targets are
+    relative to the directory of the symlink.
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.symlinks = {}
+        self.conflicts = []
+
+    def add_file(self, relpath, description="page"):
+        relpath = os.path.normpath(relpath)
+        planned = self.files.get(relpath)
+        if planned is not None and planned != description:
+            self.conflicts.append(
+                f"{relpath}: planned as {planned} and as {description}"
+            )
+        self.files[relpath] = description
+
+    def add_redirect(self, redirect_file, destination):
+        self.add_file(redirect_file, f"redirect to {destination}")
+
+    def add_symlink(self, relpath, symlink):
+        """
+        Plan a symlink to relpath. Like utils.relative_symlink, the symlink
+        name is relative to the directory of relpath (ex. "deed.html" or
+        "../index.html").
+        """
+        link = os.path.normpath(
+            os.path.join(os.path.dirname(relpath), symlink)
+        )
+        target = os.path.relpath(relpath, os.path.dirname(link))
+        planned = self.symlinks.get(link)
+        if planned is not None and planned != target:
+            self.conflicts.append(
+                f"{link}: symlink planned to {planned} and to {target}"
+            )
+        self.symlinks[link] = target
+
+    def get_conflicts(self):
+        """
+        Return the descriptions of the conflicts: paths planned twice,
+        symlinks that would replace a file, and symlinks to paths that are not
+        planned.
+        """
+        conflicts = list(self.conflicts)
+        for link, target in sorted(self.symlinks.items()):
+            if link in self.files:
+                conflicts.append(
+                    f"{link}: symlink to {target} would replace"
+                    f" {self.files[link]}"
+                )
+            target_path = os.path.normpath(
+                os.path.join(os.path.dirname(link), target)
+            )
+            if target_path not in self.files:
+                conflicts.append(
+                    f"{link}: symlink to {target} which is not published"
+                )
+        return conflicts
+
+    def get_listing(self):
+        """
+        Return the plan as sorted lines (suitable for diffing the plans of two
+        releases).
+        """
+        lines = [
+            f"{relpath} {description}"
+            for relpath, description in self.files.items()
+        ]
+        lines += [
+            f"{link} -> {target}" for link, target in self.symlinks.items()
+        ]
+        return "".join(f"{line}\n" for line in sorted(lines))
+
+    def apply(self, output_dir):
+        """
+        Create the planned symlinks (replacing different symlinks) using one
+        directory file descriptor per directory. Returns the number of created
+        symlinks.
+
+        Raises FileExistsError if a path is not a symlink.
+        """
+        output_sync = get_output_sync()
+        by_dir = {}
+        for link, target in self.symlinks.items():
+            dir_path, name = os.path.split(os.path.join(output_dir, link))
+            by_dir.setdefault(dir_path, []).append((name, target))
+        created = 0
+        for dir_path, links in sorted(by_dir.items()):
+            dir_fd = os.open(dir_path, os.O_RDONLY)
+            try:
+                for name, target in sorted(links):
+                    if output_sync:
+                        output_sync.record(os.path.join(dir_path, name))
+                    try:
+                        if os.readlink(name, dir_fd=dir_fd) == target:
+                            continue
+                    except FileNotFoundError:
+                        pass
+                    except OSError:
+                        # Not a symlink
+                        raise FileExistsError(
+                            errno.EEXIST,
+                            os.strerror(errno.EEXIST),
+                            os.path.join(dir_path, name),
+                        )
+                    else:
+                        os.remove(name, dir_fd=dir_fd)
+                    os.symlink(target, name, dir_fd=dir_fd)
+                    created += 1
+            finally:
+                os.close(dir_fd)
+        return created
+
+
+def get_tool_digests(tools_registry=None):
+    """
+    Return a dictionary of digests by Tool id, from the rows of the legal tools
+    registry (loaded from the database if tools_registry is None). Each digest
+    covers the tool, its legal codes (excluding the legal code HTML) and the
+    tools it is derived from and replaced by (their titles and paths are used
+    by deeds and legal codes).
+    """
+    if tools_registry is None:
+        tools_registry = LegalToolsRegistry.from_database()
+    own_digests = {
+        tool_id: combine_digests(
+            row_digest(record.tool),
+            *[
+                row_digest(legal_code, exclude=["html"])
+                for legal_code in record.legal_codes
+            ],
+        )
+        for tool_id, record in tools_registry.records.items()
+    }
+    digests = {}
+    for tool in tools_registry.tools.values():
+        digests[tool.id] = combine_digests(
+            own_digests[tool.id],
+            own_digests.get(tool.is_replaced_by_id, ""),
+            own_digests.get(tool.source_id, ""),
+        )
+    return digests
+
+
+class PublishSnapshot:
+    """
+    Read-only snapshot of the Tool and valid LegalCode rows, from the legal
+    tools registry (see LegalToolsRegistry). Related tools are resolved from
+    the snapshot, so accessing them does not query the database.
+    """
+
+    def __init__(self):
+        self.registry = LegalToolsRegistry.from_database()
+        self.tools = self.registry.tools
+        self.legal_codes = self.registry.valid_legal_codes
+
+    def translation_keys(self):
+        """
+        Return the get_translation_object() arguments of the legal codes.
+        """
+        keys = set()
+        for legal_code in self.legal_codes.values():
+            tool = legal_code.tool
+            keys.add(
+                (
+                    tool.resource_slug,
+                    legal_code.language_code,
+                    get_default_language_for_jurisdiction_naive(
+                        tool.jurisdiction_code
+                    ),
+                )
+            )
+        return sorted(keys)
+
+
+def get_snapshot():
+    return _snapshot
+
+
+def get_tool(tool_id):
+    """
+    Return the Tool from the snapshot (or the process cache, loading it from
+    the database if needed).
+    """
+    if _snapshot and tool_id in _snapshot.tools:
+        return _snapshot.tools[tool_id]
+    key = ("tool", tool_id)
+    if key not in _objects:
+        _objects[key] = Tool.objects.get(pk=tool_id)
+    return _objects[key]
+
+
+def get_legal_code(legal_code_id):
+    """
+    Return the LegalCode from the snapshot (or the process cache, loading it
+    from the database if needed).
+    """
+    if _snapshot and legal_code_id in _snapshot.legal_codes:
+        return _snapshot.legal_codes[legal_code_id]
+    key = ("legal_code", legal_code_id)
+    if key not in _objects:
+        _objects[key] = LegalCode.objects.select_related("tool").get(
+            pk=legal_code_id
+        )
+    return _objects[key]
+
+
+def get_template_names():
+    names = []
+    for template_dir in settings.TEMPLATES[0]["DIRS"]:
+        for dirpath, dirnames, filenames in os.walk(template_dir):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.endswith(".html"):
+                    path = os.path.join(dirpath, filename)
+                    names.append(os.path.relpath(path, template_dir))
+    return names
+
+
+def build_title_table(tools_registry):
+    """
+    Return the title table (see init_title_table) of each tool of the
+    registry in the Deeds & UX languages and the languages of its legal codes.
+    The legal code titles are taken from the registry, so no queries are run.
+    """
+    init_title_table(None)
+    table = {}
+    for record in tools_registry.records.values():
+        tool = record.tool
+        language_codes = set(settings.LANGUAGES_MOSTLY_TRANSLATED)
+        language_codes.update(record.by_language)
+        for language_code in sorted(language_codes):
+            legal_code = record.by_language.get(language_code)
+            title = get_tool_title(
+                tool.unit,
+                tool.version,
+                tool.category,
+                tool.jurisdiction_code,
+                language_code,
+                legal_code_title=legal_code.title if legal_code else "",
+            )
+            key = (tool.unit, tool.version, tool.jurisdiction_code)
+            table[(*key, language_code)] = (
+                title,
+                *get_replaced_titles(title, language_code),
+            )
+    return table
+
+
+def warm_up(titles=None):
+    """
+    Load the state used to render every published page: the compiled
+    templates, the Deeds & UX translation catalogs, the legal code translation
+    objects, a snapshot of the tools and legal codes (whose registry is then
+    used by the views, see legal_tools.registry) and the title table (titles,
+    unless it is None).
+    """
+    global _snapshot
+    for name in get_template_names():
+        get_template(name)
+    for language_code in settings.LANGUAGES_MOSTLY_TRANSLATED:
+        translation.trans_real.translation(language_code)
+    _snapshot = PublishSnapshot()
+    activate_registry(_snapshot.registry)
+    preload_translation_objects(_snapshot.translation_keys())
+    if titles is None:
+        titles = build_title_table(_snapshot.registry)
+    init_title_table(titles)
+    return _snapshot
+
+
+def parse_shard(value):
+    """
+    Parse a "K/N" shard argument (shard K of N, starting at 1).
+    """
+    try:
+        shard, count = [int(part) for part in value.split("/")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid shard: {value!r}")
+    if count < 1 or not 1 <= shard <= count:
+        raise argparse.ArgumentTypeError(f"invalid shard: {value!r}")
+    return shard, count
+
+
+def get_shard(key, count):
+    """
+    Return the shard (1 to count) of the key. The partition only depends on
+    the key, so every shard of a publish agrees on it.
+    """
+    digest = hashlib.sha256(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def get_shard_path(config_dir, shard, count):
+    return os.path.join(
+        config_dir,
+        SHARDS_DIRNAME,
+        f"language-redirects.{shard}-of-{count}.json",
+    )
+
+
+def save_shard_redirects(
+    config_dir, shard, count, default_languages_deeds, redirect_pairs_data
+):
+    """
+    Save the language redirects data of a shard for --merge-shards.
+    """
+    data = {
+        "shard": shard,
+        "count": count,
+        "default_languages_deeds": default_languages_deeds,
+        "redirect_pairs_data": redirect_pairs_data,
+    }
+    content = json.dumps(data, sort_keys=True)
+    path = get_shard_path(config_dir, shard, count)
+    save_bytes_to_file(f"{content}\n".encode("utf-8"), path)
+    return path
+
+
+def load_shard_redirects(config_dir):
+    """
+    Load and combine the language redirects data saved by each shard. Returns
+    the combined data and the paths of the shard files.
+
+    Raises ValueError unless there is exactly one file for each shard.
+    """
+    pattern = os.path.join(
+        config_dir, SHARDS_DIRNAME, "language-redirects.*-of-*.json"
+    )
+    paths = sorted(glob.glob(pattern))
+    if not paths:
+        raise ValueError(f"No shard files found: {pattern}")
+    default_languages_deeds = {}
+    redirect_pairs_data = []
+    shards = set()
+    counts = set()
+    for path in paths:
+        with open(path, "rb") as f:
+            data = json.loads(f.read().decode("utf-8"))
+        shards.add(data["shard"])
+        counts.add(data["count"])
+        for version, jurisdictions in data["default_languages_deeds"].items():
+            default_languages_deeds.setdefault(version, {}).update(
+                jurisdictions
+            )
+        redirect_pairs_data += data["redirect_pairs_data"]
+    if len(counts) != 1:
+        raise ValueError(f"Shard files of different publishes: {paths}")
+    count = counts.pop()
+    missing = sorted(set(range(1, count + 1)) - shards)
+    if missing:
+        raise ValueError(f"Missing shard files (of {count}): {missing}")
+    return default_languages_deeds, redirect_pairs_data, paths
@@ -0,0 +1,36 @@
+"""
+Process pool worker initialization for the publish command.
+
+This module must not import the models (or modules that import them): with
+the "spawn" and "forkserver" start methods, the initializer is imported by the
+worker before Django is set up.
+"""
+
+# Third-party
+import django
+from django.apps import apps
+
+# First-party/Local
+from legal_tools.format_utils import init_format_cache
+
+
+def init_worker(
+    format_cache_dir,
+    format_cache_max_size,
+    format_cache_namespace,
+    warm_up,
+    titles,
+):
+    if not apps.ready:
+        django.setup()
+    init_format_cache(
+        format_cache_dir, format_cache_max_size, format_cache_namespace
+    )
+    if warm_up:
+        # Workers that were not forked from the warmed up publish process load
+        # the shared state themselves (except for the title table, which is
+        # built once by the publish process)
+        # First-party/Local
+        from legal_tools.publish_utils import warm_up as warm_up_worker
+
+        warm_up_worker(titles)
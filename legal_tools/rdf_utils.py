@@ -1,20 +1,31 @@
 # Standard library
+import json
 import os.path
 from urllib.parse import urlparse, urlunparse
 
 # Third-party
+from django.db.models import Prefetch
+from django.db.models.signals import post_delete, post_save
 from lxml import etree
 from rdflib import Graph, Literal, Namespace, URIRef
 from rdflib.namespace import DCTERMS, FOAF, OWL, RDF, XSD
 
 # First-party/Local
+from legal_tools.cache_utils import DiskCache
 from legal_tools.models import LegalCode, Tool
+from legal_tools.publish_utils import combine_digests, row_digest
 
+# Version of the elements written by get_tool_rdf_element (it is part of the
+# fingerprints of the cached elements, see RdfCache)
+RDF_ELEMENT_VERSION = "1"
 # FOAF logo data
 FOAF_LOGO_URL = "http://licensebuttons.net/l/"
 SMALL_LOGO = "80x15.png"
 LARGE_LOGO = "88x31.png"
 
+# RDF cache of this process (see get_rdf_cache)
+_rdf_cache = None
+
 
 def convert_https_to_http(url):
     parsed_url = urlparse(url)
@@ -62,7 +73,206 @@ def generate_images_rdf():
     return image_graph
 
 
-def generate_legal_code_rdf(
+# The relevant namespaces for RDF elements
+CC = Namespace("http://creativecommons.org/ns#")
+# Prefixes of the namespaces (by namespace)
+RDF_PREFIXES = {
+    str(CC): "cc",
+    str(DCTERMS): "dcterms",
+    str(FOAF): "foaf",
+    str(OWL): "owl",
+    str(RDF): "rdf",
+    str(XSD): "xsd",
+}
+
+
+def get_rdf_tools(queryset=None):
+    """
+    Return the tools (by default, all of them) with the objects that their
+    RDF refers to: the tools they are replaced by and sourced from are joined
+    and their legal codes are prefetched, so that the RDF of any number of
+    tools is generated from two queries.
+    """
+    if queryset is None:
+        queryset = Tool.objects.all()
+    return queryset.select_related(
+        "is_replaced_by", "source"
+    ).prefetch_related(
+        Prefetch(
+            "legal_codes",
+            queryset=LegalCode.objects.only(
+                "tool_id", "language_code", "legal_code_url", "title"
+            ),
+        )
+    )
+
+
+def new_rdf_graph():
+    g = Graph()
+
+    # Bind namespaces
+    g.bind("cc", CC)
+    g.bind("dcterms", DCTERMS)
+    g.bind("foaf", FOAF)
+    g.bind("owl", OWL)
+    g.bind("rdf", RDF)
+    g.bind("xsd", XSD)
+
+    return g
+
+
+def get_tool_triples(tool):
+    """
+    Return the RDF triples of the tool (each predicate that is set, instead
+    of added, has a single object).
+    """
+    # Legal codes are iterated with all() so that prefetched legal codes are
+    # used (see get_rdf_tools)
+    legal_codes = list(tool.legal_codes.all())
+    license_uri = URIRef(convert_https_to_http(tool.base_url))
+    triples = []
+
+    # set cc:License (parent)
+    triples.append((license_uri, RDF.type, CC.License))
+
+    # set cc:deprecatedOn, if applicable
+    if tool.deprecated_on:
+        deprecated_on = Literal(tool.deprecated_on, datatype=XSD.date)
+        triples.append((license_uri, CC.deprecatedOn, deprecated_on))
+
+    # set cc:jurisdiction, if applicable
+    if tool.jurisdiction_code:
+        jurisdiction_uri = URIRef(
+            convert_https_to_http(
+                os.path.join(
+                    tool.creator_url,
+                    "international",
+                    tool.jurisdiction_code,
+                    "",  # legacy rdf has a trailing slash
+                )
+            )
+        )
+        triples.append((license_uri, CC.jurisdiction, jurisdiction_uri))
+
+    # add cc:legalcode
+    # (utilize LegalCode object(s) assciated with the current Tool object)
+    for lc_object in legal_codes:
+        legal_code_uri = URIRef(
+            convert_https_to_http(
+                f"{tool.creator_url}{lc_object.legal_code_url}"
+            )
+        )
+        data = Literal(legal_code_uri, lang=lc_object.language_code)
+        triples.append((license_uri, CC.legalcode, data))
+
+    # set cc:licenseClass
+    # (trailing "" creates a trailing slash to match legacy rdf)
+    license_class_uriref = convert_https_to_http(tool.creator_url)
+    if tool.category == "publicdomain":
+        license_class_uriref = os.path.join(
+            license_class_uriref, "choose", "publicdomain", ""
+        )
+    elif "sampling" in tool.unit:
+        license_class_uriref = os.path.join(
+            license_class_uriref, "license", "sampling", ""
+        )
+    else:
+        license_class_uriref = os.path.join(
+            license_class_uriref, "license", ""
+        )
+    triples.append(
+        (license_uri, CC.licenseClass, URIRef(license_class_uriref))
+    )
+
+    # add cc:permits, as applicable
+    if tool.permits_derivative_works:
+        triples.append((license_uri, CC.permits, CC.DerivativeWorks))
+    if tool.permits_distribution:
+        triples.append((license_uri, CC.permits, CC.Distribution))
+    if tool.permits_reproduction:
+        triples.append((license_uri, CC.permits, CC.Reproduction))
+    if tool.permits_sharing:
+        triples.append((license_uri, CC.permits, CC.Sharing))
+
+    # add cc:prohibits, as applicable
+    if tool.prohibits_commercial_use:
+        triples.append((license_uri, CC.prohibits, CC.CommercialUse))
+    if tool.prohibits_high_income_nation_use:
+        triples.append((license_uri, CC.prohibits, CC.HighIncomeNationUse))
+
+    # add cc:requires, as applicable
+    if tool.requires_attribution:
+        triples.append((license_uri, CC.requires, CC.Attribution))
+    if tool.requires_notice:
+        triples.append((license_uri, CC.requires, CC.Notice))
+    if tool.requires_share_alike:
+        triples.append((license_uri, CC.requires, CC.ShareAlike))
+
+    # set dcterms:creator
+    creator = URIRef(convert_https_to_http(tool.creator_url))
+    triples.append((license_uri, DCTERMS.creator, creator))
+
+    # set dcterms:Jurisdiction
+    if tool.jurisdiction_code and tool.jurisdiction_code != "scotland":
+        if tool.jurisdiction_code == "igo":
+            jurisdiction_code = "un"
+        else:
+            jurisdiction_code = tool.jurisdiction_code
+        data = Literal(jurisdiction_code, datatype=DCTERMS.ISO3166)
+        triples.append((license_uri, DCTERMS.Jurisdiction, data))
+
+    # set dcterms:hasVersion
+    version = Literal(f"{tool.version}")
+    triples.append((license_uri, DCTERMS.hasVersion, version))
+
+    # set dcterms:identifier
+    triples.append((license_uri, DCTERMS.identifier, Literal(f"{tool.unit}")))
+
+    # set dcterms:isReplacedBy, if applicable
+    if tool.is_replaced_by:
+        # Convert to Literal so that the URL string is stored instead of
+        # the object referenced
+        replaced_by = Literal(
+            URIRef(convert_https_to_http(tool.is_replaced_by.base_url))
+        )
+        triples.append((license_uri, DCTERMS.isReplacedBy, replaced_by))
+
+    # add dcterms:LicenseDocument
+    # (utilize LegalCode object(s) assciated with the current Tool object)
+    for lc_object in legal_codes:
+        legal_code_uri = URIRef(
+            f"{tool.creator_url}{lc_object.legal_code_url}"
+        )
+        data = Literal(legal_code_uri, lang=lc_object.language_code)
+        triples.append((license_uri, DCTERMS.LicenseDocument, data))
+
+    # set dcterms:source, if applicable
+    if tool.source:
+        # Convert to Literal so that the URL string is stored instead of
+        # the object referenced
+        source = Literal(URIRef(convert_https_to_http(tool.source.base_url)))
+        triples.append((license_uri, DCTERMS.source, source))
+
+    # add dcterms:title
+    # (utilize LegalCode object(s) assciated with the current Tool object)
+    for lc_object in legal_codes:
+        data = Literal(lc_object.title, lang=lc_object.language_code)
+        triples.append((license_uri, DCTERMS.title, data))
+
+    # add foaf:logo
+    logo_uris = generate_foaf_logo_uris(
+        tool.unit, tool.version, tool.jurisdiction_code
+    )
+    triples.append((license_uri, FOAF.logo, logo_uris["large"]))
+    triples.append((license_uri, FOAF.logo, logo_uris["small"]))
+
+    # set owl:sameAs (alias HTTPS)
+    triples.append((license_uri, OWL.sameAs, URIRef(tool.base_url)))
+
+    return triples
+
+
+def get_legal_code_rdf_tools(
     category=None,
     unit=None,
     version=None,
@@ -71,180 +281,331 @@ def generate_legal_code_rdf(
 ):
     # Retrieving license data from the database based on the arguments.
     if generate_all_licenses is True:
-        retrieved_tools = Tool.objects.all()
-    else:
-        if jurisdiction:
-            retrieved_tool = Tool.objects.filter(
+        return get_rdf_tools()
+    if jurisdiction:
+        retrieved_tool = get_rdf_tools(
+            Tool.objects.filter(
                 category=category,
                 unit=unit,
                 version=version,
                 jurisdiction_code=jurisdiction,
-            ).first()
+            )
+        ).first()
+    else:
+        retrieved_tool = get_rdf_tools(
+            Tool.objects.filter(category=category, unit=unit, version=version)
+        ).first()
+    retrieved_tools = []
+    retrieved_tools.append(retrieved_tool)
+    return retrieved_tools
+
+
+def generate_legal_code_rdf(*args, **kwargs):
+    """
+    Return the RDF graph of the tools (see get_legal_code_rdf_tools).
+    """
+    g = new_rdf_graph()
+    for tool in get_legal_code_rdf_tools(*args, **kwargs):
+        for triple in get_tool_triples(tool):
+            g.add(triple)
+
+    return g
+
+
+def generate_legal_code_rdf_xml(*args, **kwargs):
+    """
+    Return the RDF/XML of the tools (see get_legal_code_rdf_tools), written
+    directly by serialize_rdf_elements from the cached elements of the tools
+    (see get_rdf_cache).
+    """
+    cache = get_rdf_cache()
+    return serialize_rdf_elements(
+        [
+            cache.get_element(tool)
+            for tool in get_legal_code_rdf_tools(*args, **kwargs)
+        ]
+    )
+
+
+def generate_bulk_rdf(tools, tool_ids=None, index=True, cache=None):
+    """
+    Generate the RDF/XML of each of the tools (see get_rdf_tools) and of all
+    of them (index.rdf) in a single pass: the RDF/XML element of each tool is
+    written once and included in both its document and the index.
+
+    Returns the serialized RDF/XML of each tool (by tool, only for the tools
+    whose id is in tool_ids, if it isn't None) and of the index (None, unless
+    index is True). The elements are taken from the cache, if any (see
+    RdfCache).
+    """
+    documents = {}
+    index_elements = []
+    for tool in tools:
+        if cache:
+            element = cache.get_element(tool)
         else:
-            retrieved_tool = Tool.objects.filter(
-                category=category, unit=unit, version=version
-            ).first()
-        retrieved_tools = []
-        retrieved_tools.append(retrieved_tool)
+            element = get_tool_rdf_element(tool)
+        if tool_ids is None or tool.id in tool_ids:
+            documents[tool] = serialize_rdf_elements([element])
+        if index:
+            index_elements.append(element)
+    index_content = serialize_rdf_elements(index_elements) if index else None
+    return documents, index_content
+
+
+def serialize_rdf(g):
+    """
+    Return the deterministic RDF/XML of the graph (see order_rdf_xml).
+    """
+    return order_rdf_xml(g.serialize(format="pretty-xml"))
+
+
+def escape_xml_text(text):
+    # Escaped like lxml (libxml2) escapes text
+    return (
+        text.replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+        .replace("\r", "&#13;")
+    )
 
-    # The relevant namespaces for RDF elements
-    CC = Namespace("http://creativecommons.org/ns#")
 
-    g = Graph()
+def escape_xml_attribute(value):
+    # Escaped like lxml (libxml2) escapes attribute values
+    return (
+        escape_xml_text(value)
+        .replace('"', "&quot;")
+        .replace("\n", "&#10;")
+        .replace("\t", "&#9;")
+    )
 
-    # Bind namespaces
-    g.bind("cc", CC)
-    g.bind("dcterms", DCTERMS)
-    g.bind("foaf", FOAF)
-    g.bind("owl", OWL)
-    g.bind("rdf", RDF)
-    g.bind("xsd", XSD)
 
-    for tool in retrieved_tools:
-        legal_code_ids = tool.legal_codes.values_list("id", flat=True)
-        license_uri = URIRef(convert_https_to_http(tool.base_url))
-
-        # set cc:License (parent)
-        g.set((license_uri, RDF.type, CC.License))
-
-        # set cc:deprecatedOn, if applicable
-        if tool.deprecated_on:
-            deprecated_on = Literal(tool.deprecated_on, datatype=XSD.date)
-            g.set((license_uri, CC.deprecatedOn, deprecated_on))
-
-        # set cc:jurisdiction, if applicable
-        if tool.jurisdiction_code:
-            jurisdiction_uri = URIRef(
-                convert_https_to_http(
-                    os.path.join(
-                        tool.creator_url,
-                        "international",
-                        tool.jurisdiction_code,
-                        "",  # legacy rdf has a trailing slash
-                    )
-                )
-            )
-            g.set((license_uri, CC.jurisdiction, jurisdiction_uri))
-
-        # add cc:legalcode
-        # (utilize LegalCode object(s) assciated with the current Tool object)
-        for legal_code_id in legal_code_ids:
-            lc_object = LegalCode.objects.get(id=legal_code_id)
-            legal_code_uri = URIRef(
-                convert_https_to_http(
-                    f"{tool.creator_url}{lc_object.legal_code_url}"
-                )
-            )
-            data = Literal(legal_code_uri, lang=lc_object.language_code)
-            g.add((license_uri, CC.legalcode, data))
-
-        # set cc:licenseClass
-        # (trailing "" creates a trailing slash to match legacy rdf)
-        license_class_uriref = convert_https_to_http(tool.creator_url)
-        if tool.category == "publicdomain":
-            license_class_uriref = os.path.join(
-                license_class_uriref, "choose", "publicdomain", ""
-            )
-        elif "sampling" in tool.unit:
-            license_class_uriref = os.path.join(
-                license_class_uriref, "license", "sampling", ""
+def get_qname(uri):
+    """
+    Return the prefixed name of the URI and its prefix (see RDF_PREFIXES).
+    """
+    for namespace, prefix in RDF_PREFIXES.items():
+        if uri.startswith(namespace):
+            return f"{prefix}:{uri.removeprefix(namespace)}", prefix
+    raise ValueError(f"Unknown RDF namespace: {uri}")
+
+
+def get_tool_rdf_element(tool):
+    """
+    Return the RDF/XML element of the tool (see serialize_rdf_elements): its
+    sort key, the prefixes of the namespaces it uses, and its lines.
+
+    The element is written directly from the triples of the tool, as
+    serialize_rdf writes it: a typed node whose property elements are sorted
+    by tag and attribute.
+    """
+    triples = get_tool_triples(tool)
+    subject = str(triples[0][0])
+    node_tag = "rdf:Description"
+    prefixes = {"rdf"}
+    properties = set()
+    for _, predicate, value in triples:
+        if predicate == RDF.type:
+            node_tag, prefix = get_qname(value)
+            prefixes.add(prefix)
+            continue
+        tag, prefix = get_qname(predicate)
+        prefixes.add(prefix)
+        if isinstance(value, URIRef):
+            properties.add((tag, "rdf:resource", str(value), None))
+        elif value.language:
+            properties.add((tag, "xml:lang", value.language, str(value)))
+        elif value.datatype:
+            properties.add(
+                (tag, "rdf:datatype", str(value.datatype), str(value))
             )
         else:
-            license_class_uriref = os.path.join(
-                license_class_uriref, "license", ""
-            )
-        g.set((license_uri, CC.licenseClass, URIRef(license_class_uriref)))
-
-        # add cc:permits, as applicable
-        if tool.permits_derivative_works:
-            g.add((license_uri, CC.permits, CC.DerivativeWorks))
-        if tool.permits_distribution:
-            g.add((license_uri, CC.permits, CC.Distribution))
-        if tool.permits_reproduction:
-            g.add((license_uri, CC.permits, CC.Reproduction))
-        if tool.permits_sharing:
-            g.add((license_uri, CC.permits, CC.Sharing))
-
-        # add cc:prohibits, as applicable
-        if tool.prohibits_commercial_use:
-            g.add((license_uri, CC.prohibits, CC.CommercialUse))
-        if tool.prohibits_high_income_nation_use:
-            g.add((license_uri, CC.prohibits, CC.HighIncomeNationUse))
-
-        # add cc:requires, as applicable
-        if tool.requires_attribution:
-            g.add((license_uri, CC.requires, CC.Attribution))
-        if tool.requires_notice:
-            g.add((license_uri, CC.requires, CC.Notice))
-        if tool.requires_share_alike:
-            g.add((license_uri, CC.requires, CC.ShareAlike))
-
-        # set dcterms:creator
-        creator = URIRef(convert_https_to_http(tool.creator_url))
-        g.set((license_uri, DCTERMS.creator, creator))
-
-        # set dcterms:Jurisdiction
-        if tool.jurisdiction_code and tool.jurisdiction_code != "scotland":
-            if tool.jurisdiction_code == "igo":
-                jurisdiction_code = "un"
-            else:
-                jurisdiction_code = tool.jurisdiction_code
-            data = Literal(jurisdiction_code, datatype=DCTERMS.ISO3166)
-            g.set((license_uri, DCTERMS.Jurisdiction, data))
-
-        # set dcterms:hasVersion
-        version = Literal(f"{tool.version}")
-        g.set((license_uri, DCTERMS.hasVersion, version))
-
-        # set dcterms:identifier
-        g.set((license_uri, DCTERMS.identifier, Literal(f"{tool.unit}")))
-
-        # set dcterms:isReplacedBy, if applicable
-        if tool.is_replaced_by:
-            # Convert to Literal so that the URL string is stored instead of
-            # the object referenced
-            replaced_by = Literal(
-                URIRef(convert_https_to_http(tool.is_replaced_by.base_url))
+            properties.add((tag, None, None, str(value)))
+    lines = []
+    for tag, attribute, attribute_value, text in sorted(
+        properties,
+        key=lambda prop: (get_element_key(*prop[:3]), prop[3] or ""),
+    ):
+        if attribute:
+            start = (
+                f'<{tag} {attribute}="{escape_xml_attribute(attribute_value)}"'
             )
-            g.set((license_uri, DCTERMS.isReplacedBy, replaced_by))
+        else:
+            start = f"<{tag}"
+        if text:
+            lines.append(f"    {start}>{escape_xml_text(text)}</{tag}>")
+        else:
+            lines.append(f"    {start}/>")
+    node_start = f'<{node_tag} rdf:about="{escape_xml_attribute(subject)}"'
+    if lines:
+        lines = [f"  {node_start}>"] + lines + [f"  </{node_tag}>"]
+    else:
+        lines = [f"  {node_start}/>"]
+    return get_element_key(node_tag, "rdf:about", subject), prefixes, lines
+
+
+def get_element_key(tag, attribute, value):
+    # Same key as order_rdf_xml's get_node_key
+    if attribute:
+        return f"{tag} {attribute}:{value}"
+    return f"{tag} "
+
+
+def serialize_rdf_elements(elements):
+    """
+    Return the RDF/XML document of the elements (see get_tool_rdf_element),
+    identical to the output of serialize_rdf for the graph of the same
+    triples, without building the graph or parsing its serialization.
+    """
+    prefixes = {"rdf"}
+    for _, element_prefixes, _ in elements:
+        prefixes |= element_prefixes
+    namespaces = " ".join(
+        sorted(
+            f'xmlns:{prefix}="{namespace}"'
+            for namespace, prefix in RDF_PREFIXES.items()
+            if prefix in prefixes
+        )
+    )
+    lines = ["<?xml version='1.0' encoding='utf-8'?>"]
+    if not elements:
+        lines.append(f"<rdf:RDF {namespaces}/>")
+    else:
+        lines.append(f"<rdf:RDF {namespaces}>")
+        for _, _, element_lines in sorted(
+            elements, key=lambda element: element[0]
+        ):
+            lines += element_lines
+        lines.append("</rdf:RDF>")
+    lines.append("")
+    return "\n".join(lines)
+
+
+def get_tool_rdf_fingerprint(tool):
+    """
+    Return the fingerprint of the data that the RDF of the tool depends on:
+    the tool, its legal codes (language code, URL and title) and the URLs of
+    the tools it is replaced by and derived from.
+    """
+    legal_codes = sorted(
+        (legal_code.language_code, legal_code.legal_code_url, legal_code.title)
+        for legal_code in tool.legal_codes.all()
+    )
+    return combine_digests(
+        RDF_ELEMENT_VERSION,
+        row_digest(tool),
+        tool.is_replaced_by.base_url if tool.is_replaced_by else "",
+        tool.source.base_url if tool.source else "",
+        json.dumps(legal_codes),
+    )
 
-        # add dcterms:LicenseDocument
-        # (utilize LegalCode object(s) assciated with the current Tool object)
-        for legal_code_id in legal_code_ids:
-            lc_object = LegalCode.objects.get(id=legal_code_id)
-            legal_code_uri = URIRef(
-                f"{tool.creator_url}{lc_object.legal_code_url}"
-            )
-            data = Literal(legal_code_uri, lang=lc_object.language_code)
-            g.add((license_uri, DCTERMS.LicenseDocument, data))
-
-        # set dcterms:source, if applicable
-        if tool.source:
-            # Convert to Literal so that the URL string is stored instead of
-            # the object referenced
-            source = Literal(
-                URIRef(convert_https_to_http(tool.source.base_url))
-            )
-            g.set((license_uri, DCTERMS.source, source))
 
-        # add dcterms:title
-        # (utilize LegalCode object(s) assciated with the current Tool object)
-        for legal_code_id in legal_code_ids:
-            lc_object = LegalCode.objects.get(id=legal_code_id)
-            data = Literal(lc_object.title, lang=lc_object.language_code)
-            g.add((license_uri, DCTERMS.title, data))
+class RdfCache:
+    """
+    Cache of the RDF/XML element of each tool (see get_tool_rdf_element),
+    keyed by the fingerprint of its data (see get_tool_rdf_fingerprint).
+
+    Elements are memoized by tool and, if directory isn't None, stored on
+    disk (see DiskCache) so that later processes (ex. repeated publishes)
+    reuse them. The save and delete signals of the tools and legal codes
+    evict the memoized elements of the tools they change (see
+    connect_rdf_cache_signals) and the fingerprints keep the cache correct
+    when the data is changed without signals (ex. by QuerySet.update() or
+    another process).
+    """
+
+    def __init__(self, directory=None, max_size=None):
+        # tool id -> fingerprint, element and the ids of the related tools
+        self.elements = {}
+        self.disk = DiskCache(directory, max_size) if directory else None
+        self.hits = 0
+        self.misses = 0
+
+    def get_element(self, tool):
+        fingerprint = get_tool_rdf_fingerprint(tool)
+        memoized = self.elements.get(tool.id)
+        if memoized and memoized[0] == fingerprint:
+            self.hits += 1
+            return memoized[1]
+        element = None
+        if self.disk:
+            data = self.disk.get(fingerprint)
+            if data is not None:
+                key, prefixes, lines = json.loads(data.decode("utf-8"))
+                element = (key, set(prefixes), lines)
+        if element is None:
+            self.misses += 1
+            element = get_tool_rdf_element(tool)
+            if self.disk:
+                key, prefixes, lines = element
+                data = json.dumps([key, sorted(prefixes), lines])
+                self.disk.put(fingerprint, data.encode("utf-8"))
+        else:
+            self.hits += 1
+        related_ids = {tool.is_replaced_by_id, tool.source_id}
+        self.elements[tool.id] = (fingerprint, element, related_ids)
+        return element
 
-        # add foaf:logo
-        logo_uris = generate_foaf_logo_uris(
-            tool.unit, tool.version, tool.jurisdiction_code
-        )
-        g.add((license_uri, FOAF.logo, logo_uris["large"]))
-        g.add((license_uri, FOAF.logo, logo_uris["small"]))
+    def evict(self, tool_id):
+        """
+        Evict the memoized elements of the tool and of the tools that refer
+        to it (their RDF includes its URL).
+        """
+        for memoized_id, (_, _, related_ids) in list(self.elements.items()):
+            if memoized_id == tool_id or tool_id in related_ids:
+                del self.elements[memoized_id]
+
+    def prune(self):
+        """
+        Prune the on-disk cache (see DiskCache.prune). Returns the number of
+        removed entries.
+        """
+        if not self.disk:
+            return 0
+        return self.disk.prune()
 
-        # set owl:sameAs (alias HTTPS)
-        g.set((license_uri, OWL.sameAs, URIRef(tool.base_url)))
 
-    return g
+def get_rdf_cache():
+    """
+    Return the RDF cache of this process (memory only, unless it was
+    initialized by init_rdf_cache).
+    """
+    global _rdf_cache
+    if _rdf_cache is None:
+        _rdf_cache = RdfCache()
+    return _rdf_cache
+
+
+def init_rdf_cache(directory, max_size):
+    """
+    Replace the RDF cache of this process by one that is also stored in the
+    directory (or, if directory is None, only in memory).
+    """
+    global _rdf_cache
+    _rdf_cache = RdfCache(directory, max_size)
+    return _rdf_cache
+
+
+def evict_tool_rdf(sender, instance, **kwargs):
+    if _rdf_cache:
+        _rdf_cache.evict(instance.id)
+
+
+def evict_legal_code_rdf(sender, instance, **kwargs):
+    if _rdf_cache:
+        _rdf_cache.evict(instance.tool_id)
+
+
+def connect_rdf_cache_signals():
+    for signal in (post_save, post_delete):
+        signal.connect(
+            evict_tool_rdf, sender=Tool, dispatch_uid="evict_tool_rdf"
+        )
+        signal.connect(
+            evict_legal_code_rdf,
+            sender=LegalCode,
+            dispatch_uid="evict_legal_code_rdf",
+        )
 
 
 def order_rdf_xml(serialized_rdf_content):
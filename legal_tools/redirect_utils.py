@@ -0,0 +1,549 @@
+"""
+Language redirects (Step 1 of the Apache2 redirects configuration written by
+the publish command).
+
+The redirects are either written as RedirectMatch directives (one regex per
+legal code and language code alias, evaluated in order) or compiled into a
+RewriteMap keyed by path, with a small fixed set of rewrite rules for the
+redirects that can't be expanded into paths (they capture part of the path).
+
+The resolvers emulate how Apache2 applies each form so that the forms can be
+verified to be equivalent.
+"""
+
+# Standard library
+import re
+
+# Redirects that are compiled into the RewriteMap match these paths, with an
+# optional .html suffix
+HTML_SUFFIX = "(?:[.]html)?"
+REWRITE_MAP_NAME = "language-redirects"
+REWRITE_MAP_NOT_FOUND = "NOT_FOUND"
+RE_MAP_KEY = re.compile(r"^(/.+?)(?:[.]html)?$")
+RE_BACKREFERENCE = re.compile(r"\$([0-9])")
+# The language redirects of Tool.get_redirect_pairs() and
+# LegalCode.get_redirect_pairs()
+RE_LANGUAGE_REDIRECT = re.compile(
+    r"^/(.+)/(deed|legalcode)\[\.\](.+)\(\?:\[\.\]html\)\?$"
+)
+RE_LANGUAGE_DESTINATION = re.compile(r"^/(.+)/(deed|legalcode)\.([^/]+)$")
+RE_LITERAL_PREFIX = re.compile(r"[^][(){}?*+|.^$\\]*")
+# Paths that only contain characters that are literal in a PCRE (once "." is
+# escaped)
+RE_PLAIN_PATH = re.compile(r"^[A-Za-z0-9/._@-]+$")
+
+
+def get_language_redirect_pairs(redirect_pairs_data):
+    """
+    Return the [PCRE, destination] pairs of the language redirects of the
+    tools (redirect_pairs_data is a list of lists of pairs) and of the
+    ccEngine bug URLs.
+    """
+    redirect_pairs = []
+    for pair_list in redirect_pairs_data:
+        redirect_pairs += pair_list
+    # Add RedirectMatch for ccEngine bug URLs. Entries are added for each of
+    # the 4.0 licenses (versus only two regex) to increase readability.
+    # https://github.com/creativecommons/cc-legal-tools-app/issues/438
+    for unit in ("by", "by-nc", "by-nc-nd", "by-nc-sa", "by-nd", "by-sa"):
+        # deed
+        redirect_pairs.append(
+            [
+                f"/licenses/{unit}/4[.]0/([^/]+)/(deed|deed[.]html)?",
+                f"/licenses/{unit}/4.0/deed.$1",
+            ]
+        )
+        # legalcode
+        redirect_pairs.append(
+            [
+                f"/licenses/{unit}/4[.]0/([^/]+)/legalcode(?:[.]html)?",
+                f"/licenses/{unit}/4.0/legalcode.$1",
+            ]
+        )
+    return redirect_pairs
+
+
+def get_redirect_match_lines(redirect_pairs):
+    """
+    Return the RedirectMatch directives of the pairs, in the order Apache2
+    evaluates them, and the pairs in the same order.
+    """
+    widths = [max(map(len, map(str, col))) for col in zip(*redirect_pairs)]
+    pad = widths[0] + 2
+    lines = []
+    for pair in redirect_pairs:
+        pcre_match = f'"^{pair[0]}$"'
+        line = f'RedirectMatch  301  {pcre_match.ljust(pad)}  "{pair[1]}"'
+        lines.append((line, pair))
+    lines.sort(reverse=True)
+    return [line for line, _ in lines], [pair for _, pair in lines]
+
+
+def parse_pattern(pattern):
+    """
+    Parse the subset of PCRE used by the redirects: literal characters,
+    character classes, groups with alternatives, and the ? and + quantifiers.
+
+    Returns the alternatives of the pattern, each a sequence of (item,
+    quantifier) pairs. Quantifiers are None, "?", or "+" and items are
+    ("literal", char), ("class", chars, negated), or ("group", alternatives).
+
+    Raises ValueError for other syntax.
+    """
+    alternatives, end = _parse_sequence(pattern, 0)
+    if end != len(pattern):
+        raise ValueError(f"Unbalanced parenthesis in pattern: {pattern}")
+    return alternatives
+
+
+def _parse_sequence(pattern, index):
+    """
+    Parse alternatives until the end of the pattern or a closing parenthesis.
+    Returns the alternatives and the index of the end.
+    """
+    alternatives = [[]]
+    while index < len(pattern) and pattern[index] != ")":
+        char = pattern[index]
+        if char == "|":
+            alternatives.append([])
+            index += 1
+            continue
+        if char == "(":
+            start = index + 1
+            if pattern.startswith("?:", start):
+                start += 2
+            group, index = _parse_sequence(pattern, start)
+            if index >= len(pattern):
+                raise ValueError(f"Unclosed group in pattern: {pattern}")
+            item = ("group", group)
+            index += 1
+        elif char == "[":
+            end = pattern.find("]", index + 2)
+            if end < 0:
+                raise ValueError(f"Unclosed class in pattern: {pattern}")
+            start = index + 1
+            chars = pattern[start:end]
+            negated = chars.startswith("^")
+            if negated:
+                chars = chars[1:]
+            if "\\" in chars or "-" in chars.strip("-"):
+                raise ValueError(f"Unsupported class in pattern: {pattern}")
+            item = ("class", chars, negated)
+            index = end + 1
+        elif char == "\\":
+            item = ("literal", pattern[index + 1])
+            index += 2
+        elif char in ".*{}^$":
+            raise ValueError(f"Unsupported syntax in pattern: {pattern}")
+        else:
+            item = ("literal", char)
+            index += 1
+        quantifier = None
+        if index < len(pattern) and pattern[index] in "?+":
+            quantifier = pattern[index]
+            index += 1
+        alternatives[-1].append((item, quantifier))
+    return alternatives, index
+
+
+def expand_pattern(pattern, samples=None):
+    """
+    Return the paths matched by the pattern. Negated character classes match
+    each of the samples (or nothing, if there are no samples) and repeated
+    items are expanded once.
+    """
+    return sorted(set(_expand_alternatives(parse_pattern(pattern), samples)))
+
+
+def _expand_alternatives(alternatives, samples):
+    results = []
+    for sequence in alternatives:
+        results += _expand_sequence(sequence, samples)
+    return results
+
+
+def _expand_sequence(sequence, samples):
+    results = [""]
+    for item, quantifier in sequence:
+        if item[0] == "class" and item[2]:
+            options = list(samples or [])
+        elif item[0] == "literal":
+            options = [item[1]]
+        elif item[0] == "class":
+            options = list(item[1])
+        else:
+            options = _expand_alternatives(item[1], samples)
+        if quantifier == "?":
+            options = [""] + options
+        results = [prefix + option for prefix in results for option in options]
+    return results
+
+
+def is_map_pattern(pattern, destination):
+    """
+    Return True if the redirect can be compiled into the RewriteMap: the
+    destination doesn't use captured text and the pattern only matches a
+    fixed set of paths (with an optional .html suffix).
+    """
+    if "$" in destination or not pattern.endswith(HTML_SUFFIX):
+        return False
+    try:
+        alternatives = parse_pattern(pattern[: -len(HTML_SUFFIX)])
+    except ValueError:
+        return False
+    for alternative in alternatives:
+        for item, quantifier in alternative:
+            if quantifier is not None or item[0] == "group":
+                return False
+            if item[0] == "class" and item[2]:
+                return False
+    return True
+
+
+def get_rewrite_map(ordered_pairs):
+    """
+    Compile the pairs (in the order Apache2 evaluates them) into a RewriteMap
+    (path -> destination) and the remaining [PCRE, destination] pairs.
+    """
+    rewrite_map = {}
+    rules = []
+    for pattern, destination in ordered_pairs:
+        if not is_map_pattern(pattern, destination):
+            rules.append([pattern, destination])
+            continue
+        for path in expand_pattern(pattern[: -len(HTML_SUFFIX)]):
+            # The first matching RedirectMatch wins
+            rewrite_map.setdefault(path, destination)
+    return rewrite_map, rules
+
+
+def get_rewrite_map_lines(rewrite_map):
+    """
+    Return the lines of the RewriteMap text file (txt: map type).
+    """
+    return [f"{path} {rewrite_map[path]}" for path in sorted(rewrite_map)]
+
+
+def get_rewrite_rule_lines(rules, map_type):
+    """
+    Return the directives that declare the RewriteMap and apply it (and the
+    rules that aren't compiled into it).
+
+    The map file path is relative to the CC_LEGAL_TOOLS_CONFIG variable, which
+    must be defined (Define directive) before this configuration is included
+    (in server or virtual host context, as required by RewriteMap).
+    """
+    extension = "txt" if map_type == "txt" else "dbm"
+    map_path = f"${{CC_LEGAL_TOOLS_CONFIG}}/{REWRITE_MAP_NAME}.{extension}"
+    lines = [
+        f'RewriteMap  {REWRITE_MAP_NAME}  "{map_type}:{map_path}"',
+        "",
+        "RewriteCond %{REQUEST_URI} ^(/.+?)(?:[.]html)?$",
+        f"RewriteCond ${{{REWRITE_MAP_NAME}:%1|{REWRITE_MAP_NOT_FOUND}}}"
+        " ^(/.*)$",
+        "RewriteRule ^ %1 [R=301,L]",
+    ]
+    if rules:
+        lines.append("")
+    for pattern, destination in rules:
+        lines.append(f'RewriteRule  "^{pattern}$"  "{destination}"  [R=301,L]')
+    return lines
+
+
+def escape_char(char):
+    if char == ".":
+        return "[.]"
+    if char.isalnum() or char in "/-@_":
+        return char
+    raise ValueError(f"Unsupported character: {char}")
+
+
+def get_trie_pattern(strings):
+    """
+    Return a pattern that matches exactly the strings, built from their trie.
+    Common prefixes are factored out and alternatives that are followed by
+    the same pattern are merged into a character class (ex. "en[@_-]us").
+    """
+    trie = {}
+    for string in strings:
+        node = trie
+        for char in string:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return _get_node_pattern(trie)
+
+
+def _get_node_pattern(node):
+    # Characters by the pattern of their subtree (in sorted order)
+    by_pattern = {}
+    for char in sorted(node):
+        if char:
+            by_pattern.setdefault(_get_node_pattern(node[char]), []).append(
+                char
+            )
+    alternatives = []
+    for pattern, chars in by_pattern.items():
+        if len(chars) == 1:
+            prefix = escape_char(chars[0])
+        else:
+            # "-" must be last in a character class
+            chars.sort(key=lambda char: (char == "-", char))
+            prefix = f"[{''.join(chars)}]"
+        alternatives.append(f"{prefix}{pattern}")
+    if not alternatives:
+        return ""
+    if "" in node:
+        # The string may end at this node
+        if list(by_pattern) == [""]:
+            # A single character (or character class)
+            return f"{alternatives[0]}?"
+        return f"(?:{'|'.join(alternatives)})?"
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return f"(?:{'|'.join(alternatives)})"
+
+
+def compact_redirect_pairs(ordered_pairs):
+    """
+    Merge the redirects into fewer, equivalent rules:
+
+    1. The language redirects of each document (deed or legal code) and
+       destination language code are combined into a single rule whose
+       pattern matches the trie of the language code aliases.
+    2. Rules that only differ by the path of their tool (ex. the ccEngine bug
+       URLs of each 4.0 license) are combined into a single rule that
+       captures the trie of the paths as $1.
+
+    Paths that contain characters with a special meaning in a PCRE other than
+    "." (ex. "sampling+") are not merged. The order of the returned pairs is
+    the order Apache2 evaluates them (see get_redirect_match_lines).
+    """
+    merged = {}
+    for pattern, destination in ordered_pairs:
+        aliases = get_language_aliases(pattern, destination)
+        if aliases is None:
+            merged.setdefault((pattern, destination), None)
+        else:
+            # The destination of a language redirect identifies its path,
+            # document, and language code
+            merged.setdefault((None, destination), set()).update(aliases)
+    pairs = []
+    for (pattern, destination), aliases in merged.items():
+        if aliases is not None:
+            path, document, _ = RE_LANGUAGE_DESTINATION.match(
+                destination
+            ).groups()
+            pattern = (
+                f"/{escape_path(path)}/{document}[.]"
+                f"{get_trie_pattern(aliases)}{HTML_SUFFIX}"
+            )
+        pairs.append([pattern, destination])
+    return get_redirect_match_lines(factor_paths(pairs))[1]
+
+
+def get_language_aliases(pattern, destination):
+    """
+    Return the language code aliases matched by the pattern of a language
+    redirect (see RE_LANGUAGE_REDIRECT), or None if the redirect is not a
+    language redirect of a plain path.
+    """
+    match = RE_LANGUAGE_REDIRECT.match(pattern)
+    destination_match = RE_LANGUAGE_DESTINATION.match(destination)
+    if (
+        not match
+        or not destination_match
+        or match.group(2) != destination_match.group(2)
+        or not RE_PLAIN_PATH.match(destination_match.group(1))
+        or match.group(1) != escape_path(destination_match.group(1))
+    ):
+        return None
+    try:
+        return expand_pattern(match.group(3))
+    except ValueError:
+        return None
+
+
+def escape_path(path):
+    return path.replace(".", "[.]")
+
+
+def factor_paths(pairs):
+    """
+    Combine the redirects whose pattern and destination only differ by the
+    path of their tool (the directory of the destination) into a single
+    redirect that captures the trie of the paths as $1 (the other
+    backreferences of the destination are shifted).
+    """
+    factored = []
+    by_rest = {}
+    for pattern, destination in pairs:
+        directory = destination.split("$", 1)[0].rsplit("/", 1)[0]
+        path = directory.removeprefix("/")
+        prefix = f"/{escape_path(path)}/"
+        backreferences = [
+            int(number) for number in RE_BACKREFERENCE.findall(destination)
+        ]
+        if (
+            not path
+            or not RE_PLAIN_PATH.match(path)
+            or not pattern.startswith(prefix)
+            or max(backreferences, default=0) >= 9
+        ):
+            factored.append([pattern, destination])
+            continue
+        rest = (
+            pattern.removeprefix(prefix),
+            destination.removeprefix(f"{directory}/"),
+        )
+        by_rest.setdefault(rest, []).append([pattern, destination, path])
+    for (pattern, destination), grouped in by_rest.items():
+        if len(grouped) == 1:
+            factored.append(grouped[0][:2])
+            continue
+        paths = [path for _, _, path in grouped]
+        destination = RE_BACKREFERENCE.sub(
+            lambda backreference: f"${int(backreference.group(1)) + 1}",
+            destination,
+        )
+        factored.append(
+            [f"/({get_trie_pattern(paths)})/{pattern}", f"/$1/{destination}"]
+        )
+    return factored
+
+
+def substitute(destination, match):
+    """
+    Replace the $N backreferences of the destination with the groups of the
+    match (unmatched groups are empty, as with Apache2).
+    """
+    return RE_BACKREFERENCE.sub(
+        lambda backreference: match.group(int(backreference.group(1))) or "",
+        destination,
+    )
+
+
+def get_literal_prefix(pattern):
+    """
+    Return the literal text that every path matched by the pattern starts
+    with.
+    """
+    depth = 0
+    for char in pattern:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return ""
+    prefix = RE_LITERAL_PREFIX.match(pattern).group(0)
+    if pattern.startswith(("?", "*", "{"), len(prefix)):
+        # The last character is optional
+        prefix = prefix[:-1]
+    return prefix
+
+
+class RedirectMatchResolver:
+    """
+    Resolve paths like the RedirectMatch directives of the pairs (in the order
+    Apache2 evaluates them).
+
+    Rules are indexed by their literal prefix so that only the rules whose
+    prefix starts the path are evaluated.
+    """
+
+    def __init__(self, ordered_pairs):
+        self.rules = {}
+        for index, (pattern, destination) in enumerate(ordered_pairs):
+            self.rules.setdefault(get_literal_prefix(pattern), []).append(
+                (index, re.compile(f"^{pattern}$"), destination)
+            )
+
+    def resolve(self, path):
+        """
+        Return the redirect destination of the path (or None).
+        """
+        candidates = []
+        for end in range(len(path) + 1):
+            candidates += self.rules.get(path[:end], [])
+        for _, regex, destination in sorted(
+            candidates, key=lambda rule: rule[0]
+        ):
+            match = regex.match(path)
+            if match:
+                return substitute(destination, match)
+        return None
+
+
+class RewriteMapResolver(RedirectMatchResolver):
+    """
+    Resolve paths like the RewriteMap and the rewrite rules (see
+    get_rewrite_rule_lines).
+    """
+
+    def __init__(self, rewrite_map, rules):
+        super().__init__(rules)
+        self.rewrite_map = rewrite_map
+
+    def resolve(self, path):
+        match = RE_MAP_KEY.match(path)
+        if match:
+            destination = self.rewrite_map.get(match.group(1))
+            if destination is not None:
+                return destination
+        return super().resolve(path)
+
+
+def get_known_paths(ordered_pairs, samples):
+    """
+    Return the paths matched by the redirects (captured text is each of the
+    samples), with and without a .html suffix, and their destinations.
+    """
+    paths = set()
+    for pattern, destination in ordered_pairs:
+        for path in expand_pattern(pattern, samples):
+            paths.add(path)
+            paths.add(f"{path}.html")
+        if "$" not in destination:
+            paths.add(destination)
+    return sorted(paths)
+
+
+def verify_resolver(ordered_pairs, resolver, samples, paths=None):
+    """
+    Return the paths (by default, the known paths, see get_known_paths) that
+    the resolver resolves differently than the RedirectMatch directives of
+    the pairs, with both destinations.
+    """
+    redirect_match = RedirectMatchResolver(ordered_pairs)
+    if paths is None:
+        paths = get_known_paths(ordered_pairs, samples)
+    mismatches = []
+    for path in paths:
+        expected = redirect_match.resolve(path)
+        actual = resolver.resolve(path)
+        if actual != expected:
+            mismatches.append((path, expected, actual))
+    return mismatches
+
+
+def verify_rewrite_map(ordered_pairs, rewrite_map, rules, samples):
+    """
+    Return the known paths that the RewriteMap and rules resolve differently
+    than the RedirectMatch directives (see verify_resolver).
+    """
+    return verify_resolver(
+        ordered_pairs, RewriteMapResolver(rewrite_map, rules), samples
+    )
+
+
+def verify_compact_redirects(ordered_pairs, compact_pairs, samples):
+    """
+    Return the known paths of both forms that the compacted redirects resolve
+    differently than the RedirectMatch directives (see verify_resolver).
+    """
+    return verify_resolver(
+        ordered_pairs,
+        RedirectMatchResolver(compact_pairs),
+        samples,
+        get_known_paths(ordered_pairs + compact_pairs, samples),
+    )
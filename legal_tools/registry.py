@@ -0,0 +1,266 @@
+"""
+Immutable in-memory registry of the legal tools and their legal codes (without
+the legal code HTML). It is built once per process by the publish warm up (see
+publish_utils.warm_up) so that rendering the published pages looks up the
+tools and legal codes without querying the database: only the HTML of each
+rendered legal code is loaded (see find_legal_code_by_url).
+
+The find_* functions use the active registry, if any, and query the database
+otherwise.
+"""
+
+# Standard library
+import copy
+from operator import attrgetter
+from types import MappingProxyType
+
+# Third-party
+from django.http import Http404
+
+# First-party/Local
+import legal_tools.models
+
+# Registry of this process (None unless activated, see activate_registry)
+_registry = None
+
+
+class ToolRecord:
+    """
+    A tool with its legal codes (ordered by language code), indexed by
+    language code.
+    """
+
+    __slots__ = ("tool", "legal_codes", "by_language", "valid_by_language")
+
+    def __init__(self, tool, legal_codes, valid_ids):
+        self.tool = tool
+        self.legal_codes = tuple(legal_codes)
+        self.by_language = {
+            legal_code.language_code: legal_code
+            for legal_code in self.legal_codes
+        }
+        self.valid_by_language = {
+            legal_code.language_code: legal_code
+            for legal_code in self.legal_codes
+            if legal_code.id in valid_ids
+        }
+
+
+class LegalToolsRegistry:
+    """
+    Read-only Tool and LegalCode objects, indexed by id and by each key that
+    the views look them up by. Related tools are resolved from the registry,
+    so accessing them does not query the database.
+    """
+
+    __slots__ = (
+        "tools",
+        "legal_codes",
+        "valid_legal_codes",
+        "records",
+        "tools_by_key",
+        "legal_codes_by_url",
+    )
+
+    def __init__(self, tools, legal_codes, valid_ids):
+        tools = {tool.id: tool for tool in tools}
+        for tool in tools.values():
+            if tool.is_replaced_by_id:
+                tool.is_replaced_by = tools[tool.is_replaced_by_id]
+            if tool.source_id:
+                tool.source = tools[tool.source_id]
+        tool_legal_codes = {}
+        legal_codes_by_url = {}
+        legal_codes = sorted(legal_codes, key=attrgetter("language_code"))
+        for legal_code in legal_codes:
+            legal_code.tool = tools[legal_code.tool_id]
+            tool_legal_codes.setdefault(legal_code.tool_id, []).append(
+                legal_code
+            )
+            if legal_code.legal_code_url:
+                legal_codes_by_url.setdefault(
+                    legal_code.legal_code_url, legal_code
+                )
+        legal_codes = {legal_code.id: legal_code for legal_code in legal_codes}
+        records = {
+            tool.id: ToolRecord(
+                tool, tool_legal_codes.get(tool.id, []), valid_ids
+            )
+            for tool in tools.values()
+        }
+        set_attribute = super().__setattr__
+        set_attribute("tools", MappingProxyType(tools))
+        set_attribute("legal_codes", MappingProxyType(legal_codes))
+        set_attribute(
+            "valid_legal_codes",
+            MappingProxyType(
+                {
+                    legal_code_id: legal_code
+                    for legal_code_id, legal_code in legal_codes.items()
+                    if legal_code_id in valid_ids
+                }
+            ),
+        )
+        set_attribute("records", MappingProxyType(records))
+        set_attribute(
+            "tools_by_key",
+            MappingProxyType(
+                {
+                    (tool.unit, tool.version, tool.jurisdiction_code): tool
+                    for tool in tools.values()
+                }
+            ),
+        )
+        set_attribute(
+            "legal_codes_by_url", MappingProxyType(legal_codes_by_url)
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError("LegalToolsRegistry is immutable")
+
+    @classmethod
+    def from_database(cls):
+        """
+        Build the registry from the Tool and LegalCode rows (three queries).
+        """
+        LegalCode = legal_tools.models.LegalCode
+        return cls(
+            legal_tools.models.Tool.objects.all(),
+            LegalCode.objects.all(),
+            set(LegalCode.objects.valid().values_list("id", flat=True)),
+        )
+
+    def get_tool(self, unit, version, jurisdiction_code):
+        try:
+            return self.tools_by_key[(unit, version, jurisdiction_code)]
+        except KeyError:
+            raise legal_tools.models.Tool.DoesNotExist(
+                "Tool matching query does not exist."
+            )
+
+    def get_legal_code(self, tool, language_code, valid=False):
+        record = self.records[tool.id]
+        by_language = record.valid_by_language if valid else record.by_language
+        try:
+            return by_language[language_code]
+        except KeyError:
+            raise legal_tools.models.LegalCode.DoesNotExist(
+                "LegalCode matching query does not exist."
+            )
+
+    def get_legal_codes(self, tool):
+        return self.records[tool.id].legal_codes
+
+
+def get_registry():
+    return _registry
+
+
+def activate_registry(registry):
+    """
+    Use the registry (or the database, if registry is None) for the lookups of
+    this process.
+    """
+    global _registry
+    _registry = registry
+
+
+def find_tool(unit, version, jurisdiction_code):
+    """
+    Return the Tool with the unit, version and jurisdiction code (raises
+    Tool.DoesNotExist if there is none).
+    """
+    if _registry:
+        return _registry.get_tool(unit, version, jurisdiction_code)
+    return legal_tools.models.Tool.objects.get(
+        unit=unit, version=version, jurisdiction_code=jurisdiction_code
+    )
+
+
+def find_legal_code(tool, language_code, valid=False):
+    """
+    Return the LegalCode of the tool in the language, only if it is valid if
+    valid is True (raises LegalCode.DoesNotExist if there is none).
+    """
+    if _registry:
+        return _registry.get_legal_code(tool, language_code, valid)
+    if valid:
+        return legal_tools.models.LegalCode.objects.valid().get(
+            tool=tool, language_code=language_code
+        )
+    return tool.legal_codes.get(language_code=language_code)
+
+
+def find_legal_code_by_url(legal_code_url, with_html=False):
+    """
+    Return the LegalCode with the legal code URL, with its HTML loaded if
+    with_html is True (raises Http404 if there is none).
+
+    The HTML of a legal code of the registry is loaded into a copy, so that
+    the registry objects are not modified (and do not keep the HTML).
+    """
+    LegalCode = legal_tools.models.LegalCode
+    if _registry:
+        legal_code = _registry.legal_codes_by_url.get(legal_code_url)
+        if legal_code is None:
+            raise Http404("No LegalCode matches the given query.")
+        if with_html:
+            legal_code = copy.copy(legal_code)
+            legal_code.html = (
+                LegalCode.objects.with_html()
+                .values_list("html", flat=True)
+                .get(pk=legal_code.pk)
+            )
+        return legal_code
+    queryset = (
+        LegalCode.objects.with_html() if with_html else LegalCode.objects
+    )
+    try:
+        return queryset.get(legal_code_url=legal_code_url)
+    except LegalCode.DoesNotExist:
+        raise Http404("No LegalCode matches the given query.")
+
+
+def find_legal_codes(tool):
+    """
+    Return the legal codes of the tool (ordered by language code).
+    """
+    if _registry:
+        return _registry.get_legal_codes(tool)
+    return tool.legal_codes.all()
+
+
+def find_valid_legal_codes(category):
+    """
+    Return the valid legal codes of the tools of the category, ordered by
+    tool version (descending), tool jurisdiction code, language code and tool
+    unit.
+    """
+    if _registry:
+        legal_codes = sorted(
+            (
+                legal_code
+                for legal_code in _registry.valid_legal_codes.values()
+                if legal_code.tool.category == category
+            ),
+            key=lambda legal_code: (
+                legal_code.tool.jurisdiction_code,
+                legal_code.language_code,
+                legal_code.tool.unit,
+            ),
+        )
+        legal_codes.sort(
+            key=lambda legal_code: legal_code.tool.version, reverse=True
+        )
+        return legal_codes
+    return (
+        legal_tools.models.LegalCode.objects.valid()
+        .filter(tool__category=category)
+        .select_related("tool")
+        .order_by(
+            "-tool__version",
+            "tool__jurisdiction_code",
+            "language_code",
+            "tool__unit",
+        )
+    )
@@ -0,0 +1,107 @@
+# Standard library
+import os
+import tempfile
+
+# Third-party
+from django.test import TestCase
+
+# First-party/Local
+from legal_tools import apache_utils, redirect_utils
+
+FALLBACK_LINES = [
+    "RewriteCond %{REQUEST_FILENAME} !-f",
+    "RewriteCond %{REQUEST_FILENAME}.html !-f",
+    "RewriteRule licenses/([a-z+-]+)/([0-9.]+)/deed[.].*$"
+    " /licenses/$1/$2/deed.en [R=301,L]",
+]
+
+
+class RedirectConfigTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.document_root = os.path.join(self.tmpdir.name, "docs")
+        self.config_dir = os.path.join(self.tmpdir.name, "config")
+        os.makedirs(os.path.join(self.document_root, "licenses/by/4.0"))
+        os.makedirs(self.config_dir)
+        for filename in ["deed.en.html", "deed.nl.html"]:
+            path = os.path.join(
+                self.document_root, "licenses/by/4.0", filename
+            )
+            with open(path, "w") as f:
+                f.write("<html></html>")
+
+    def get_config(self, lines):
+        return apache_utils.RedirectConfig(
+            lines,
+            self.document_root,
+            {"CC_LEGAL_TOOLS_CONFIG": self.config_dir},
+        )
+
+    def test_split_arguments(self):
+        self.assertEqual(
+            ["RedirectMatch", "301", "^/a b$", "/c"],
+            apache_utils.split_arguments('RedirectMatch  301  "^/a b$"  "/c"'),
+        )
+
+    def test_redirect_match(self):
+        lines, _ = redirect_utils.get_redirect_match_lines(
+            [
+                ["/licenses/by/4[.]0/deed[.]en[@_-]us(?:[.]html)?", "/en"],
+                ["/licenses/by/4[.]0/([^/]+)/(deed|deed[.]html)?", "/d.$1"],
+            ]
+        )
+        config = self.get_config(["# Step 1", ""] + lines + FALLBACK_LINES)
+        self.assertEqual("/en", config.resolve("/licenses/by/4.0/deed.en_us"))
+        self.assertEqual("/d.nl", config.resolve("/licenses/by/4.0/nl/"))
+        # Published deeds are not redirected
+        self.assertIsNone(config.resolve("/licenses/by/4.0/deed.nl"))
+        self.assertIsNone(config.resolve("/licenses/by/4.0/deed.nl.html"))
+        # Absent deed translations are redirected by the fallback
+        self.assertEqual(
+            "/licenses/by/4.0/deed.en",
+            config.resolve("/licenses/by/4.0/deed.xx"),
+        )
+
+    def test_rewrite_map(self):
+        ordered_pairs = [
+            ["/licenses/by/4[.]0/deed[.]en[@_-]us(?:[.]html)?", "/en"],
+            ["/licenses/by/4[.]0/([^/]+)/legalcode", "/l.$1"],
+        ]
+        rewrite_map, rules = redirect_utils.get_rewrite_map(ordered_pairs)
+        map_path = os.path.join(
+            self.config_dir, f"{redirect_utils.REWRITE_MAP_NAME}.txt"
+        )
+        with open(map_path, "w") as f:
+            f.write(
+                "\n".join(redirect_utils.get_rewrite_map_lines(rewrite_map))
+            )
+        config = self.get_config(
+            redirect_utils.get_rewrite_rule_lines(rules, "txt")
+        )
+        self.assertEqual(
+            "/en", config.resolve("/licenses/by/4.0/deed.en@us.html")
+        )
+        self.assertEqual(
+            "/l.nl", config.resolve("/licenses/by/4.0/nl/legalcode")
+        )
+        self.assertIsNone(config.resolve("/licenses/by/4.0/deed.nl"))
+
+    def test_unsupported(self):
+        for line in [
+            "Redirect 301 /a /b",
+            'RedirectMatch 302 "^/a$" "/b"',
+            'RedirectMatch 301 "/a" "/b"',
+            "RewriteRule ^/a /b [PT]",
+        ]:
+            with self.assertRaises(ValueError):
+                self.get_config([line])
+
+    def test_check_redirects(self):
+        config = self.get_config(['RedirectMatch 301 "^/a$" "/b"'])
+        self.assertEqual(
+            [("/c", "/d", None)],
+            apache_utils.check_redirects(
+                config, {"/a": "/b", "/b": None, "/c": "/d"}
+            ),
+        )
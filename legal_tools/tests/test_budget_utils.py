@@ -0,0 +1,177 @@
+# Third-party
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import get_resolver, path
+from django.views.generic.base import RedirectView
+
+# First-party/Local
+from legal_tools import budget_utils, rdf_utils, registry
+from legal_tools.registry import LegalToolsRegistry
+from legal_tools.tests.factories import LegalCodeFactory, ToolFactory
+from legal_tools.tests.test_views import ToolsTestsMixin
+
+LANGUAGES = ["es", settings.LANGUAGE_CODE]
+UNITS_40 = ["by", "by-nc", "by-nc-nd", "by-nc-sa", "by-nd", "by-sa"]
+JURISDICTIONS_30 = ["de", "es", "fr", "it", "nl", "pl"]
+
+
+class QueryBudgetTest(TestCase):
+    def test_query_budget(self):
+        pattern = budget_utils.query_budget(
+            path("test", RedirectView.as_view(url="/")), queries=3
+        )
+        self.assertEqual(3, pattern.query_budget.get_limit())
+        self.assertEqual(3, pattern.query_budget.get_limit(published=True))
+        pattern = budget_utils.query_budget(
+            path("test", RedirectView.as_view(url="/")), queries=3, published=0
+        )
+        self.assertEqual(0, pattern.query_budget.get_limit(published=True))
+
+    def test_budgets_declared(self):
+        budgets = budget_utils.get_query_budgets()
+        for pattern in get_resolver("legal_tools.urls").url_patterns:
+            if pattern.name == "branch_status":
+                # Not published
+                continue
+            self.assertIn(pattern.name, budgets)
+
+    def test_exceeded(self):
+        count = budget_utils.QueryCount("/", "dev_index", 200, 2, 0.0, 1)
+        self.assertTrue(count.exceeded)
+        count.limit = None
+        self.assertFalse(count.exceeded)
+
+
+class QueryBudgetSampleTest(ToolsTestsMixin, TestCase):
+    """
+    Render the URL sample and fail when a query budget is exceeded.
+
+    The settings are overridden by each test as the dev index reloads the
+    mostly translated languages.
+    """
+
+    def tearDown(self):
+        registry.activate_registry(None)
+
+    def assertWithinBudgets(self, counts):
+        self.assertEqual(
+            [],
+            [
+                (count.url, count.status_code)
+                for count in counts
+                if count.status_code != 200
+            ],
+        )
+        self.assertEqual(
+            [],
+            [
+                f"{count.url}: {count.queries} > {count.limit}"
+                for count in counts
+                if count.exceeded
+            ],
+        )
+
+    @override_settings(LANGUAGES_MOSTLY_TRANSLATED=LANGUAGES)
+    def test_sample(self):
+        urls = budget_utils.get_sample_urls()
+        self.assertIn("/licenses/list.es", urls)
+        self.assertIn("/licenses/by/3.0/es/deed.en", urls)
+        self.assertIn("/licenses/by/3.0/es/legalcode.en", urls)
+        counts = budget_utils.count_queries(urls)
+        self.assertTrue(all(count.limit is not None for count in counts))
+        self.assertWithinBudgets(counts)
+
+    @override_settings(LANGUAGES_MOSTLY_TRANSLATED=LANGUAGES)
+    def test_sample_published(self):
+        urls = budget_utils.get_sample_urls()
+        registry.activate_registry(LegalToolsRegistry.from_database())
+        self.assertWithinBudgets(
+            budget_utils.count_queries(urls, published=True)
+        )
+
+
+class QueryBudgetScalingTest(TestCase):
+    """
+    Render the URL sample with 3 and then 6 tools in each group and fail when
+    the number of queries of a URL pattern grows with the number of tools.
+
+    The tools of a group have the same shape (relations and legal codes), as
+    the number of queries of a page depends on the related tools it links to.
+    """
+
+    def setUp(self):
+        self.by_40 = None
+
+    def tearDown(self):
+        registry.activate_registry(None)
+        rdf_utils.init_rdf_cache(None, None)
+
+    def create_tool(self, category, unit, version, jurisdiction_code=""):
+        path = "/".join(filter(None, [category, unit, version]))
+        if jurisdiction_code:
+            path = f"{path}/{jurisdiction_code}"
+        tool = ToolFactory(
+            base_url=f"https://creativecommons.org/{path}/",
+            creator_url="https://creativecommons.org",
+            category=category,
+            unit=unit,
+            version=version,
+            jurisdiction_code=jurisdiction_code,
+            is_replaced_by=self.by_40 if jurisdiction_code else None,
+        )
+        for language_code in LANGUAGES:
+            LegalCodeFactory(tool=tool, language_code=language_code)
+        return tool
+
+    def create_tools(self, start, stop):
+        for index in range(start, stop):
+            tool = self.create_tool("licenses", UNITS_40[index], "4.0")
+            self.by_40 = self.by_40 or tool
+            self.create_tool("licenses", "by", "3.0", JURISDICTIONS_30[index])
+
+    def get_max_queries(self, legal_codes, published):
+        """
+        Return the number of sample URLs and the maximum number of queries of
+        each URL pattern.
+        """
+        # Start from empty caches so that both samples are rendered alike
+        cache.clear()
+        rdf_utils.init_rdf_cache(None, None)
+        with override_settings(LANGUAGES_MOSTLY_TRANSLATED=LANGUAGES):
+            urls = budget_utils.get_sample_urls(legal_codes=legal_codes)
+            if published:
+                registry.activate_registry(LegalToolsRegistry.from_database())
+            counts = budget_utils.count_queries(urls, published=published)
+        registry.activate_registry(None)
+        self.assertEqual(
+            [], [count.url for count in counts if count.status_code != 200]
+        )
+        max_queries = {}
+        for count in counts:
+            max_queries[count.name] = max(
+                max_queries.get(count.name, 0), count.queries
+            )
+        return len(urls), max_queries
+
+    def assertQueriesDoNotGrow(self, published):
+        self.create_tools(0, 3)
+        small_urls, small = self.get_max_queries(3, published)
+        self.create_tools(3, 6)
+        large_urls, large = self.get_max_queries(6, published)
+        self.assertGreater(large_urls, small_urls)
+        self.assertEqual(small.keys(), large.keys())
+        self.assertEqual(
+            [],
+            [
+                f"{name}: {small[name]} -> {large[name]}"
+                for name in sorted(large)
+                if large[name] > small[name]
+            ],
+        )
+
+    def test_database(self):
+        self.assertQueriesDoNotGrow(published=False)
+
+    def test_published(self):
+        self.assertQueriesDoNotGrow(published=True)
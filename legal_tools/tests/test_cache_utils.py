@@ -0,0 +1,44 @@
+# Standard library
+import os
+import tempfile
+
+# Third-party
+from django.test import TestCase
+
+# First-party/Local
+from legal_tools.cache_utils import DiskCache
+
+
+class DiskCacheTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = DiskCache(self.tmpdir.name, 10)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_get_put(self):
+        self.assertIsNone(self.cache.get("aa01"))
+        self.cache.put("aa01", b"data")
+        self.assertEqual(b"data", self.cache.get("aa01"))
+        self.assertEqual(
+            os.path.join(self.tmpdir.name, "aa", "aa01"),
+            self.cache.get_path("aa01"),
+        )
+        self.cache.put("aa01", b"other")
+        self.assertEqual(b"other", self.cache.get("aa01"))
+        self.assertEqual(
+            ["aa01"], os.listdir(os.path.join(self.tmpdir.name, "aa"))
+        )
+
+    def test_prune(self):
+        for index, key in enumerate(["aa01", "bb02", "cc03"]):
+            self.cache.put(key, b"12345")
+            os.utime(self.cache.get_path(key), ns=(index, index))
+        # Using an entry makes it the most recently used
+        self.cache.get("aa01")
+        self.assertEqual(1, self.cache.prune())
+        self.assertIsNone(self.cache.get("bb02"))
+        self.assertIsNotNone(self.cache.get("aa01"))
+        self.assertIsNotNone(self.cache.get("cc03"))
+        self.assertEqual(0, self.cache.prune())
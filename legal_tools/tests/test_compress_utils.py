@@ -0,0 +1,80 @@
+# Standard library
+import gzip
+import os
+import tempfile
+from unittest import mock
+
+# Third-party
+from django.test import TestCase
+
+# First-party/Local
+from legal_tools import compress_utils, utils
+
+
+class CompressUtilsTest(TestCase):
+    def test_is_compressible(self):
+        self.assertTrue(compress_utils.is_compressible("deed.en.html"))
+        self.assertTrue(compress_utils.is_compressible("rdf"))
+        self.assertTrue(compress_utils.is_compressible("index.rdf"))
+        self.assertFalse(compress_utils.is_compressible("logo.svg"))
+        self.assertFalse(compress_utils.is_compressible("deed.en.html.gz"))
+
+    def test_compress_bytes(self):
+        data = b"<p>abc</p>" * 100
+        compressed = compress_utils.compress_bytes(data, ".gz")
+        self.assertEqual(data, gzip.decompress(compressed))
+        # Identical content is compressed identically
+        self.assertEqual(
+            compressed, compress_utils.compress_bytes(data, ".gz")
+        )
+        with self.assertRaises(ValueError):
+            compress_utils.compress_bytes(data, ".zip")
+
+    def test_compress_file(self):
+        data = b"<p>abc</p>" * 200
+        suffixes = compress_utils.get_suffixes()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            utils.save_bytes_to_file(data, os.path.join(tmpdir, "a.html"))
+            relpath, digest, size, sizes, written = (
+                compress_utils.compress_file(tmpdir, "a.html", None)
+            )
+            self.assertEqual("a.html", relpath)
+            self.assertEqual(len(data), size)
+            self.assertEqual(suffixes, list(sizes.keys()))
+            self.assertTrue(written)
+            with open(os.path.join(tmpdir, "a.html.gz"), "rb") as f:
+                self.assertEqual(data, gzip.decompress(f.read()))
+
+            with mock.patch.object(compress_utils, "compress_bytes") as mock_:
+                result = compress_utils.compress_file(tmpdir, "a.html", digest)
+            mock_.assert_not_called()
+            self.assertEqual((relpath, digest, size, sizes, False), result)
+
+            # Missing siblings are written again
+            os.remove(os.path.join(tmpdir, "a.html.gz"))
+            result = compress_utils.compress_file(tmpdir, "a.html", digest)
+            self.assertTrue(result[-1])
+
+    def test_manifest(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(
+                tmpdir, compress_utils.COMPRESS_MANIFEST_FILENAME
+            )
+            manifest = compress_utils.CompressManifest(path)
+            self.assertEqual({}, manifest.digests)
+            manifest.digests["a.html"] = "abcd"
+            manifest.save()
+            manifest = compress_utils.CompressManifest(path)
+            self.assertEqual({"a.html": "abcd"}, manifest.digests)
+
+    def test_report(self):
+        report = compress_utils.CompressReport()
+        report.add(1000, {".gz": 250}, True)
+        report.add(3000, {".gz": 750}, False)
+        self.assertEqual(
+            [
+                "Compressed 1 changed files (skipped 1 unchanged files)",
+                "gzip: 2 files, 4000 bytes to 1000 bytes (25.0%)",
+            ],
+            report.get_lines(),
+        )
@@ -0,0 +1,347 @@
+# Standard library
+import os
+import socket
+import tempfile
+from unittest import mock
+
+# Third-party
+import requests
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+
+# First-party/Local
+from legal_tools import format_utils
+from legal_tools.utils import MockRequest, save_bytes_to_file, save_redirect
+from legal_tools.view_utils import (
+    prepare_html_bytes,
+    pretty_html_bytes,
+    pretty_html_response,
+)
+
+
+class FramesTest(TestCase):
+    def test_encode_decode_frames(self):
+        documents = [b"<p>one</p>", b"", "<p>é</p>\n".encode("utf-8")]
+        data = format_utils.encode_frames(documents)
+        self.assertTrue(data.startswith(b"10\n<p>one</p>0\n"))
+        self.assertEqual(documents, format_utils.decode_frames(data))
+        self.assertEqual([], format_utils.decode_frames(b""))
+
+    def test_decode_frames_invalid(self):
+        with self.assertRaises(ValueError):
+            format_utils.decode_frames(b"10")
+        with self.assertRaises(ValueError):
+            format_utils.decode_frames(b"10\n<p></p>")
+
+    def test_clean_html_bytes(self):
+        self.assertEqual(
+            format_utils.clean_html_bytes(b"<p>one"),
+            format_utils.clean_html_bytes("<p>one"),
+        )
+
+
+class FormatQueueTest(TestCase):
+    def test_add_and_flush(self):
+        write = mock.MagicMock()
+        format_batch = mock.MagicMock(
+            side_effect=lambda documents: [d.upper() for d in documents]
+        )
+        queue = format_utils.FormatQueue(2, write, format_batch)
+        queue.add("a.html", b"a")
+        write.assert_not_called()
+        queue.add("b.html", b"b")
+        format_batch.assert_called_once_with([b"a", b"b"])
+        write.assert_has_calls(
+            [mock.call(b"A", "a.html"), mock.call(b"B", "b.html")]
+        )
+        queue.add("c.html", b"c")
+        queue.flush()
+        write.assert_called_with(b"C", "c.html")
+        queue.flush()
+        self.assertEqual(2, format_batch.call_count)
+
+    def test_identical_documents_are_formatted_once(self):
+        write = mock.MagicMock()
+        format_batch = mock.MagicMock(
+            side_effect=lambda documents: [d.upper() for d in documents]
+        )
+        queue = format_utils.FormatQueue(3, write, format_batch)
+        queue.add("a.html", b"a")
+        queue.add("b.html", b"b")
+        queue.add("c.html", b"a")
+        format_batch.assert_called_once_with([b"a", b"b"])
+        write.assert_has_calls(
+            [
+                mock.call(b"A", "a.html"),
+                mock.call(b"B", "b.html"),
+                mock.call(b"A", "c.html"),
+            ]
+        )
+
+    @override_settings(HTML_FORMATTER="prettier")
+    @mock.patch(
+        "legal_tools.view_utils.format_html_bytes",
+        return_value=b"not deferred",
+    )
+    def test_deferred_pages_are_queued(self, mock_format):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            queue = format_utils.start_format_queue(10, save_bytes_to_file)
+            queue.format_batch = lambda documents: [
+                b"formatted" for _ in documents
+            ]
+            try:
+                # Formatting is only deferred if the caller asks for it
+                self.assertEqual(
+                    (b"not deferred", None),
+                    prepare_html_bytes("<p>redirect</p>"),
+                )
+                response = HttpResponse("<p>page</p>")
+                pretty_html_response(MockRequest("/page"), response)
+                self.assertEqual(b"not deferred", response.content)
+                self.assertIsNone(response.deferred)
+                response = HttpResponse("<p>page</p>")
+                pretty_html_response(
+                    MockRequest("/page", defer_formatting=True), response
+                )
+                self.assertTrue(response.content.startswith(b"<html>"))
+                self.assertEqual({"cache_key": None}, response.deferred)
+
+                content, deferred = prepare_html_bytes(
+                    "<p>redirect</p>", defer=True
+                )
+                self.assertTrue(content.startswith(b"<html>"))
+                self.assertEqual({"cache_key": None}, deferred)
+                save_redirect(
+                    tmpdir, "by/1.0/legalcode.en.html", content, deferred
+                )
+                path = os.path.join(tmpdir, "by/1.0/legalcode.en.html")
+                # The directory is created immediately, the file once the
+                # queue is flushed
+                self.assertTrue(os.path.isdir(os.path.dirname(path)))
+                self.assertFalse(os.path.exists(path))
+                self.assertEqual(1, len(queue.pending))
+            finally:
+                format_utils.stop_format_queue()
+            self.assertIsNone(format_utils.get_format_queue())
+            with open(path, "rb") as f:
+                self.assertEqual(b"formatted", f.read())
+        # Without a format queue, nothing is deferred
+        self.assertEqual(
+            (b"not deferred", None),
+            prepare_html_bytes("<p>redirect</p>", defer=True),
+        )
+
+
+class FormatCacheTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = format_utils.FormatCache(self.tmpdir.name, 10)
+
+    def tearDown(self):
+        format_utils.init_format_cache(None, None)
+        self.tmpdir.cleanup()
+
+    def test_get_put(self):
+        key = self.cache.get_key("<p>one</p>")
+        self.assertEqual(key, self.cache.get_key(b"<p>one</p>"))
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, b"formatted")
+        self.assertEqual(b"formatted", self.cache.get(key))
+        self.assertTrue(self.cache.get_path(key).startswith(self.tmpdir.name))
+
+    def test_namespace(self):
+        other = format_utils.FormatCache(self.tmpdir.name, 10, "prettier 3.6")
+        self.assertNotEqual(
+            self.cache.get_key("<p>one</p>"), other.get_key("<p>one</p>")
+        )
+        self.cache.put(self.cache.get_key("<p>one</p>"), b"formatted")
+        self.assertIsNone(other.get(other.get_key("<p>one</p>")))
+
+    @override_settings(HTML_FORMATTER="python")
+    def test_get_format_cache_namespace_python(self):
+        self.assertEqual(
+            f"python {format_utils.HTML_FORMATTER_VERSION}",
+            format_utils.get_format_cache_namespace(),
+        )
+
+    @override_settings(HTML_FORMATTER="prettier", PRETTIER_SLOW=False)
+    def test_get_format_cache_namespace_prettier(self):
+        client = format_utils.PrettierClient(["http://a:3000"])
+        with (
+            mock.patch.object(
+                client.session,
+                "get",
+                return_value=mock_response(200, b"3.6.2\n"),
+            ) as mock_get,
+            mock.patch(
+                "legal_tools.format_utils.get_prettier_client",
+                return_value=client,
+            ),
+        ):
+            self.assertEqual(
+                "prettier 3.6.2", format_utils.get_format_cache_namespace()
+            )
+        self.assertEqual("http://a:3000/version", mock_get.call_args[0][0])
+
+    def test_init_format_cache(self):
+        cache = format_utils.init_format_cache(self.tmpdir.name, 100)
+        self.assertIs(cache, format_utils.get_format_cache())
+        self.assertIsNone(format_utils.init_format_cache(None, None))
+        self.assertIsNone(format_utils.get_format_cache())
+
+    def test_pretty_html_bytes_uses_cache(self):
+        cache = format_utils.init_format_cache(self.tmpdir.name, 100)
+        with mock.patch(
+            "legal_tools.view_utils.format_html_bytes",
+            return_value=b"formatted",
+        ) as mock_format:
+            self.assertEqual(b"formatted", pretty_html_bytes("path", "<p>"))
+            self.assertEqual(b"formatted", pretty_html_bytes("path", "<p>"))
+        mock_format.assert_called_once()
+        self.assertEqual(b"formatted", cache.get(cache.get_key("<p>")))
+
+    def test_queue_updates_cache(self):
+        cache = format_utils.init_format_cache(self.tmpdir.name, 100)
+        write = mock.MagicMock()
+        queue = format_utils.FormatQueue(
+            1, write, lambda documents: [b"formatted"]
+        )
+        queue.add("a.html", b"<p>", cache_key="abcd")
+        write.assert_called_once_with(b"formatted", "a.html")
+        self.assertEqual(b"formatted", cache.get("abcd"))
+
+
+def mock_response(status_code, content=b"formatted"):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    return response
+
+
+@mock.patch("legal_tools.format_utils.time.sleep")
+class PrettierClientTest(TestCase):
+    def setUp(self):
+        self.client = format_utils.PrettierClient(
+            ["http://a:3000", "http://b:3000"]
+        )
+        self.session_post = mock.patch.object(
+            self.client.session, "post"
+        ).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def posted_urls(self):
+        return [args[0] for args, _ in self.session_post.call_args_list]
+
+    def test_round_robin(self, mock_sleep):
+        self.session_post.return_value = mock_response(200)
+        for _ in range(3):
+            response = self.client.post("/batch", data=b"")
+            self.assertEqual(b"formatted", response.content)
+        self.assertEqual(
+            [
+                "http://a:3000/batch",
+                "http://b:3000/batch",
+                "http://a:3000/batch",
+            ],
+            self.posted_urls(),
+        )
+        self.assertEqual(
+            [0, 0], [e.outstanding for e in self.client.endpoints]
+        )
+        mock_sleep.assert_not_called()
+
+    def test_least_outstanding(self, mock_sleep):
+        self.client.endpoints[0].outstanding = 2
+        endpoint = self.client.acquire()
+        self.assertEqual("http://b:3000", endpoint.url)
+        self.assertEqual(1, endpoint.outstanding)
+
+    def test_retry_server_error(self, mock_sleep):
+        self.session_post.side_effect = [
+            mock_response(503),
+            requests.ConnectionError("refused"),
+            mock_response(200),
+        ]
+        with self.assertLogs(format_utils.LOG, "WARNING"):
+            self.client.post("/", data=b"")
+        self.assertEqual(
+            ["http://a:3000/", "http://b:3000/", "http://a:3000/"],
+            self.posted_urls(),
+        )
+        self.assertEqual(2, mock_sleep.call_count)
+        # A success resets the failure count
+        self.assertEqual(0, self.client.endpoints[0].failures)
+        self.assertEqual(1, self.client.endpoints[1].failures)
+
+    def test_retries_exhausted(self, mock_sleep):
+        self.session_post.return_value = mock_response(500)
+        with self.assertLogs(format_utils.LOG, "WARNING"):
+            with self.assertRaises(requests.HTTPError):
+                self.client.post("/", data=b"")
+        self.assertEqual(
+            format_utils.PRETTIER_ATTEMPTS, self.session_post.call_count
+        )
+        self.session_post.side_effect = requests.Timeout("timeout")
+        with self.assertLogs(format_utils.LOG, "WARNING"):
+            with self.assertRaises(requests.Timeout):
+                self.client.post("/", data=b"")
+
+    def test_client_error_not_retried(self, mock_sleep):
+        self.session_post.return_value = mock_response(422)
+        with self.assertRaises(requests.HTTPError):
+            self.client.post("/", data=b"")
+        self.assertEqual(1, self.session_post.call_count)
+        self.assertEqual(0, self.client.endpoints[0].failures)
+
+    def test_unhealthy_endpoint_skipped(self, mock_sleep):
+        a, b = self.client.endpoints
+        for _ in range(format_utils.PRETTIER_UNHEALTHY_FAILURES):
+            a.record_failure(0)
+        with mock.patch(
+            "legal_tools.format_utils.time.monotonic", return_value=1
+        ):
+            self.assertIs(b, self.client.acquire())
+            self.assertIs(b, self.client.acquire())
+            # If no endpoint is healthy, the one that recovers first is used
+            for _ in range(format_utils.PRETTIER_UNHEALTHY_FAILURES):
+                b.record_failure(1)
+            self.assertIs(a, self.client.acquire())
+
+    def test_get_prettier_client(self, mock_sleep):
+        with override_settings(PRETTIER_ENDPOINTS=["http://127.0.0.1:3000"]):
+            format_utils._client = None
+            client = format_utils.get_prettier_client()
+            self.assertIs(client, format_utils.get_prettier_client())
+            self.assertEqual(
+                ["http://127.0.0.1:3000"], [e.url for e in client.endpoints]
+            )
+            client.pid = -1
+            self.assertIsNot(client, format_utils.get_prettier_client())
+        format_utils._client = None
+
+
+class ExpandEndpointsTest(TestCase):
+    def test_expand_endpoints(self):
+        addresses = [
+            (socket.AF_INET, None, None, None, ("10.0.0.2", 3000)),
+            (socket.AF_INET, None, None, None, ("10.0.0.3", 3000)),
+            (socket.AF_INET, None, None, None, ("10.0.0.3", 3000)),
+            (socket.AF_INET6, None, None, None, ("fd00::4", 3000, 0, 0)),
+        ]
+        with mock.patch("socket.getaddrinfo", return_value=addresses):
+            self.assertEqual(
+                [
+                    "http://10.0.0.2:3000",
+                    "http://10.0.0.3:3000",
+                    "http://[fd00::4]:3000",
+                ],
+                format_utils.expand_endpoints(["http://prettier:3000/"]),
+            )
+
+    def test_expand_endpoints_unresolved(self):
+        with mock.patch("socket.getaddrinfo", side_effect=socket.gaierror):
+            with self.assertLogs(format_utils.LOG, "WARNING"):
+                self.assertEqual(
+                    ["https://prettier"],
+                    format_utils.expand_endpoints(["https://prettier"]),
+                )
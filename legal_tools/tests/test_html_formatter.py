@@ -0,0 +1,192 @@
+# Standard library
+import difflib
+import os
+import re
+import shutil
+import subprocess
+
+# Third-party
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+
+# First-party/Local
+from legal_tools import format_utils
+from legal_tools.html_formatter import (
+    LINE,
+    SOFTLINE,
+    Fill,
+    Group,
+    Indent,
+    format_html,
+    print_doc,
+)
+
+FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "html_formatter"
+)
+SCRIPT_RE = re.compile(r"(<(script|style)\b[^>]*>).*?(</\2>)", re.DOTALL)
+
+
+class PrintDocTest(TestCase):
+    def test_group(self):
+        doc = Group(["[", Indent([SOFTLINE, "a,", LINE, "b"]), SOFTLINE, "]"])
+        self.assertEqual("[a, b]", print_doc(doc))
+        self.assertEqual("[\n  a,\n  b\n]", print_doc(doc, width=4))
+
+    def test_fill(self):
+        doc = Fill(["aa", LINE, "bb", LINE, "cc"])
+        self.assertEqual("aa bb cc", print_doc(doc))
+        self.assertEqual("aa bb\ncc", print_doc(doc, width=5))
+
+
+class FormatHtmlTest(TestCase):
+    def test_document(self):
+        self.assertEqual(
+            "<!DOCTYPE html>\n"
+            "<html>\n"
+            "  <body>\n"
+            "    <p>one<br />two</p>\n"
+            "  </body>\n"
+            "</html>\n",
+            format_html(
+                "<!DOCTYPE html>\n<html><body><p>one<br/>two</p></body></html>"
+            ),
+        )
+
+    def test_class_and_style_attributes(self):
+        self.assertEqual(
+            '<div class="a b c" style="color: red; margin: 0">'
+            "<span>x</span></div>\n",
+            format_html(
+                '<div class="a  b   c" style="color:red;margin:0">'
+                "<span>x</span></div>"
+            ),
+        )
+
+    def test_inline_elements_borrow_tag_markers(self):
+        url = "https://creativecommons.org/licenses/by/4.0/legalcode.en"
+        self.assertEqual(
+            "<!-- c -->\n"
+            "<p>\n"
+            "  <strong\n"
+            f'    ><a href="{url}"\n'
+            "      >Learn more about this very long link text here now</a\n"
+            "    ></strong\n"
+            "  >\n"
+            "</p>\n",
+            format_html(
+                f'<!-- c --><p><strong><a href="{url}">Learn more about this'
+                " very long link text here now</a></strong></p>"
+            ),
+        )
+
+    def test_text_is_filled(self):
+        words = " ".join(["word"] * 20)
+        self.assertEqual(
+            f"<p>\n  {words[:74]}\n  {words[75:]}\n</p>\n",
+            format_html(f"<p>{words}</p>"),
+        )
+
+    def test_pre(self):
+        self.assertEqual(
+            "<pre>\n  a\n   b</pre\n>\n", format_html("<pre>  a\n   b</pre>")
+        )
+        self.assertEqual("<pre>ab</pre>\n", format_html("<pre>\nab</pre>"))
+
+    def test_script_is_reindented(self):
+        self.assertEqual(
+            "<script>\n  var a = 1;\n    b();\n</script>\n",
+            format_html("<script>\n      var a = 1;\n        b();\n</script>"),
+        )
+
+    def test_format_html_bytes(self):
+        with override_settings(HTML_FORMATTER="python"):
+            self.assertEqual(
+                b"<p>\xc3\xa9</p>\n",
+                format_utils.format_html_bytes("<p>é</p>".encode("utf-8")),
+            )
+        with override_settings(HTML_FORMATTER="tidy"):
+            with self.assertRaises(ImproperlyConfigured):
+                format_utils.get_html_formatter()
+
+
+class ConformanceTest(TestCase):
+    """
+    Compare the full output of the Python formatter with the output of
+    Prettier for a corpus of the published pages (each template type).
+
+    The corpus is in FIXTURES_DIR: each NAME.input.html is a rendered page
+    after the BeautifulSoup clean-up (see clean_html_bytes). Prettier is run
+    on the corpus by the test (the coverage workflow installs it), so this
+    test fails in CI if Prettier is missing instead of being skipped.
+    """
+
+    def get_corpus(self):
+        names = sorted(
+            filename[: -len(".input.html")]
+            for filename in os.listdir(FIXTURES_DIR)
+            if filename.endswith(".input.html")
+        )
+        self.assertTrue(names)
+        for name in names:
+            with open(os.path.join(FIXTURES_DIR, f"{name}.input.html")) as f:
+                yield name, f.read()
+
+    def prettier(self, data):
+        return subprocess.run(
+            ["prettier", "--parser", "html"],
+            input=data.encode("utf-8"),
+            capture_output=True,
+            check=True,
+        ).stdout.decode("utf-8")
+
+    def strip_scripts(self, html):
+        # The contents of <script> and <style> elements are the only known
+        # difference (see the module docstring of html_formatter)
+        return SCRIPT_RE.sub(r"\1\3", html)
+
+    def assertSameOutput(self, expected, actual):
+        if actual != expected:
+            diff = difflib.unified_diff(
+                expected.splitlines(keepends=True),
+                actual.splitlines(keepends=True),
+                "prettier",
+                "python",
+            )
+            self.fail("".join(diff))
+
+    def test_corpus_covers_templates(self):
+        names = [name for name, _ in self.get_corpus()]
+        for prefix in [
+            "deed_",
+            "dev_index",
+            "legalcode_",
+            "list_licenses",
+            "list_publicdomain",
+            "ns",
+            "redirect",
+        ]:
+            self.assertTrue(
+                any(name.startswith(prefix) for name in names), prefix
+            )
+
+    def test_conformance(self):
+        if not shutil.which("prettier"):
+            if os.getenv("CI"):
+                self.fail("Prettier is not installed")
+            self.skipTest("Prettier is not installed")
+        for name, data in self.get_corpus():
+            with self.subTest(name=name):
+                self.assertSameOutput(
+                    self.strip_scripts(self.prettier(data)),
+                    self.strip_scripts(format_html(data)),
+                )
+
+    def test_strip_scripts(self):
+        self.assertEqual(
+            "<head>\n  <script></script>\n  <style></style>\n</head>\n",
+            self.strip_scripts(
+                "<head>\n  <script>\n    a();\n  </script>\n"
+                "  <style>\n    td,\n    th {}\n  </style>\n</head>\n"
+            ),
+        )
@@ -4,10 +4,12 @@ from unittest import mock
 # Third-party
 import polib
 from django.conf import settings
+from django.db import connection
 from django.test import TestCase, override_settings
 from django.utils.translation import override
 
 # First-party/Local
+from legal_tools import publish_utils, rdf_utils, utils
 from legal_tools.models import (
     FREEDOM_LEVEL_MAX,
     FREEDOM_LEVEL_MID,
@@ -15,6 +17,7 @@ from legal_tools.models import (
     LegalCode,
     Tool,
 )
+from legal_tools.registry import LegalToolsRegistry
 from legal_tools.tests.factories import (
     LegalCodeFactory,
     ToolFactory,
@@ -119,6 +122,76 @@ class LegalCodeQuerySetTest(TestCase):
         )
 
 
+class LegalCodeHtmlDeferredTest(TestCase):
+    """
+    The legal code HTML is only loaded by the legal code view.
+    """
+
+    def setUp(self):
+        self.tool = ToolFactory(
+            category="licenses",
+            unit="by",
+            version="4.0",
+            jurisdiction_code="",
+            base_url="https://creativecommons.org/licenses/by/4.0/",
+        )
+        self.legal_code = LegalCodeFactory(
+            tool=self.tool, language_code="en", html="<p></p>"
+        )
+
+    def html_queries(self, function, *args, **kwargs):
+        """
+        Return the number of queries of the function that load the HTML.
+        """
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            if '"legal_tools_legalcode"."html"' in sql:
+                queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            function(*args, **kwargs)
+        return len(queries)
+
+    def test_html_deferred(self):
+        for function, args in [
+            (list, [LegalCode.objects.all()]),
+            (
+                lambda: [
+                    list(queryset)
+                    for queryset in LegalCode.objects.validgroups().values()
+                ],
+                [],
+            ),
+            (self.client.get, ["/licenses/list.en"]),
+            (self.client.get, ["/cc-legal-tools.csv"]),
+            (rdf_utils.generate_legal_code_rdf_xml, ["licenses", "by", "4.0"]),
+            (
+                rdf_utils.generate_bulk_rdf,
+                [rdf_utils.get_rdf_tools(), None, True, rdf_utils.RdfCache()],
+            ),
+            (
+                utils.get_tool_title,
+                ["by", "4.0", "licenses", "", "nl"],
+            ),
+            (utils.update_title, [{"dryrun": True}]),
+            (publish_utils.get_tool_digests, []),
+            (LegalToolsRegistry.from_database, []),
+        ]:
+            with self.subTest(function=function):
+                self.assertEqual(0, self.html_queries(function, *args))
+
+    def test_html_loaded(self):
+        self.assertEqual(
+            1,
+            self.html_queries(self.client.get, self.legal_code.legal_code_url),
+        )
+        legal_code = LegalCode.objects.with_html().get(pk=self.legal_code.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual("<p></p>", legal_code.html)
+
+
 class LegalCodeModelTest(TestCase):
     def test_str(self):
         LegalCodeFactory()
@@ -733,6 +806,40 @@ class ToolModelTest(TestCase):
         for key in expected_data.keys():
             self.assertEqual(expected_data[key], data[key])
 
+    def test_with_metadata(self):
+        tools = [
+            ToolFactory(category="licenses", unit="by", version="4.0"),
+            ToolFactory(
+                category="licenses",
+                unit="by-nc",
+                version="2.5",
+                jurisdiction_code="nl",
+            ),
+            ToolFactory(
+                category="licenses",
+                unit="by-sa",
+                version="3.0",
+                jurisdiction_code="es",
+            ),
+        ]
+        for language_code in ["nl", "en", "de"]:
+            LegalCodeFactory(tool=tools[0], language_code=language_code)
+        LegalCodeFactory(tool=tools[1], language_code="nl")
+        # No legal code in the default language (es): the title is translated
+        LegalCodeFactory(tool=tools[2], language_code="ca")
+        expected = {tool.id: tool.get_metadata() for tool in tools}
+
+        with self.assertNumQueries(2):
+            data = {
+                tool.id: tool.get_metadata()
+                for tool in Tool.objects.with_metadata()
+            }
+        self.assertEqual(expected, data)
+        self.assertEqual(
+            ["de", "en", "nl"],
+            list(data[tools[0].id]["legal_code_languages"]),
+        )
+
     # get_publish_files BY-NC-ND 4.0 deed ####################################
     # BY-NC-ND 4.0 is an international (unported) license with multiple
     # languages
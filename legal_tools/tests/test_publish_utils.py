@@ -0,0 +1,492 @@
+# Standard library
+import argparse
+import json
+import os
+import tempfile
+from unittest import mock
+
+# Third-party
+from django.test import TestCase, override_settings
+
+# First-party/Local
+from i18n import utils as i18n_utils
+from legal_tools import publish_utils, registry, utils
+from legal_tools.management.commands import publish
+from legal_tools.models import LegalCode
+from legal_tools.publish_utils import LinkPlan, PublishManifest
+from legal_tools.registry import LegalToolsRegistry
+from .factories import LegalCodeFactory, ToolFactory
+
+
+class HashTest(TestCase):
+    def test_hash_bytes(self):
+        self.assertEqual(
+            publish_utils.hash_bytes(b"abc"), publish_utils.hash_bytes("abc")
+        )
+
+    def test_hash_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "file.txt")
+            self.assertIsNone(publish_utils.hash_file(path))
+            with open(path, "wb") as f:
+                f.write(b"abc")
+            self.assertEqual(
+                publish_utils.hash_bytes(b"abc"),
+                publish_utils.hash_file(path),
+            )
+
+    def test_combine_digests(self):
+        self.assertNotEqual(
+            publish_utils.combine_digests("ab", "c"),
+            publish_utils.combine_digests("a", "bc"),
+        )
+
+    def test_row_digest(self):
+        legal_code = LegalCodeFactory(html="<p>one</p>")
+        digest = publish_utils.row_digest(legal_code)
+        digest_without_html = publish_utils.row_digest(
+            legal_code, exclude=["html"]
+        )
+        legal_code.html = "<p>two</p>"
+        self.assertNotEqual(digest, publish_utils.row_digest(legal_code))
+        self.assertEqual(
+            digest_without_html,
+            publish_utils.row_digest(legal_code, exclude=["html"]),
+        )
+
+    def test_get_tool_digests(self):
+        by_30 = ToolFactory(unit="by", version="3.0")
+        by_40 = ToolFactory(unit="by", version="4.0")
+        by_30.is_replaced_by = by_40
+        by_30.save()
+        legal_code = LegalCodeFactory(tool=by_40, language_code="en")
+        digests = publish_utils.get_tool_digests()
+        self.assertEqual({by_30.id, by_40.id}, set(digests.keys()))
+
+        legal_code.title = "Changed"
+        legal_code.save()
+        changed = publish_utils.get_tool_digests()
+        # Changing a legal code of the replacing tool changes both digests
+        self.assertNotEqual(digests[by_40.id], changed[by_40.id])
+        self.assertNotEqual(digests[by_30.id], changed[by_30.id])
+
+        legal_code.html = "<p>Changed</p>"
+        legal_code.save()
+        self.assertEqual(changed, publish_utils.get_tool_digests())
+
+        # The digests are computed from the rows of the registry
+        tools_registry = LegalToolsRegistry.from_database()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                changed, publish_utils.get_tool_digests(tools_registry)
+            )
+
+
+class PublishManifestTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.output_dir = os.path.join(self.tmpdir.name, "docs")
+        self.path = os.path.join(self.tmpdir.name, "config", "manifest.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_output(self, relpath, content):
+        path = os.path.join(self.output_dir, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+
+    def test_load_missing_invalid_and_outdated(self):
+        manifest = PublishManifest(self.path, self.output_dir)
+        self.assertEqual({}, manifest.outputs)
+
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as f:
+            f.write("not json")
+        with self.assertLogs(publish_utils.LOG, "WARNING"):
+            manifest = PublishManifest(self.path, self.output_dir)
+        self.assertEqual({}, manifest.outputs)
+
+        with open(self.path, "w") as f:
+            json.dump({"version": -1, "outputs": {"a": {}}}, f)
+        with self.assertLogs(publish_utils.LOG, "WARNING"):
+            manifest = PublishManifest(self.path, self.output_dir)
+        self.assertEqual({}, manifest.outputs)
+
+    def test_record_is_current_save_load(self):
+        self.write_output("licenses/by/4.0/deed.en.html", b"deed")
+        manifest = PublishManifest(self.path, self.output_dir)
+        key = "licenses/by/4.0/deed.en.html"
+        self.assertFalse(manifest.is_current(key, "fingerprint"))
+        manifest.record(key, "fingerprint", [key])
+        self.assertTrue(manifest.is_current(key, "fingerprint"))
+        self.assertFalse(manifest.is_current(key, "other fingerprint"))
+        manifest.save()
+
+        manifest = PublishManifest(self.path, self.output_dir)
+        self.assertTrue(manifest.is_current(key, "fingerprint"))
+        # An output modified outside of publishing is not current
+        self.write_output(key, b"modified deed")
+        self.assertFalse(manifest.is_current(key, "fingerprint"))
+
+    def test_remove_orphans(self):
+        self.write_output("licenses/by/4.0/deed.en.html", b"deed")
+        self.write_output("licenses/by/4.0/deed.nl.html", b"deed")
+        manifest = PublishManifest(self.path, self.output_dir)
+        for key in [
+            "licenses/by/4.0/deed.en.html",
+            "licenses/by/4.0/deed.nl.html",
+        ]:
+            manifest.record(key, "fingerprint", [key])
+        manifest.save()
+
+        manifest = PublishManifest(self.path, self.output_dir)
+        self.assertTrue(
+            manifest.is_current("licenses/by/4.0/deed.en.html", "fingerprint")
+        )
+        self.assertEqual(1, manifest.remove_orphans())
+        self.assertEqual(
+            ["licenses/by/4.0/deed.en.html"], list(manifest.outputs.keys())
+        )
+        self.assertFalse(
+            os.path.exists(
+                os.path.join(self.output_dir, "licenses/by/4.0/deed.nl.html")
+            )
+        )
+
+    def test_file_digest(self):
+        manifest = PublishManifest(self.path, self.output_dir)
+        path = os.path.join(self.tmpdir.name, "django.po")
+        self.assertEqual("", manifest.file_digest(path))
+        with open(path, "wb") as f:
+            f.write(b"msgid")
+        digest = manifest.file_digest(path)
+        self.assertEqual(publish_utils.hash_bytes(b"msgid"), digest)
+        self.assertIn(path, manifest.files)
+        # Cached value is used while the modification time and size match
+        manifest.files[path]["sha256"] = "cached"
+        self.assertEqual("cached", manifest.file_digest(path))
+        os.remove(path)
+        self.assertEqual("", manifest.file_digest(path))
+        self.assertNotIn(path, manifest.files)
+
+    def test_source_and_translation_digests(self):
+        manifest = PublishManifest(self.path, self.output_dir)
+        source_digest = manifest.source_digest()
+        self.assertEqual(source_digest, manifest.source_digest())
+        self.assertTrue(
+            any(path.endswith("deed.html") for path in manifest.files)
+        )
+        self.assertTrue(
+            any(
+                path.endswith(os.path.join("settings", "base.py"))
+                for path in manifest.files
+            )
+        )
+        self.assertFalse(
+            any(f"{os.sep}tests{os.sep}" in path for path in manifest.files)
+        )
+        self.assertNotEqual(
+            manifest.translation_digest("locale", "nl", "django"),
+            manifest.translation_digest("locale", "fr", "django"),
+        )
+
+
+class PublishFingerprintTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.command = publish.Command()
+        self.command.options = {"incremental": True}
+        self.command.config_dir = os.path.join(self.tmpdir.name, "config")
+        self.command.output_dir = os.path.join(self.tmpdir.name, "docs")
+        for _ in range(2):
+            LegalCodeFactory(tool=ToolFactory(), language_code="en")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def get_fingerprints(self, namespace):
+        with mock.patch.object(
+            publish, "get_format_cache_namespace", return_value=namespace
+        ):
+            self.command.prepare_manifest()
+        command = self.command
+        fingerprints = {}
+        for legal_code in LegalCode.objects.all():
+            tool = legal_code.tool
+            fingerprints[legal_code.deed_url] = command.fingerprint_deed(
+                tool, legal_code.language_code
+            )
+            fingerprints[legal_code.legal_code_url] = (
+                command.fingerprint_legal_code(legal_code)
+            )
+            fingerprints[tool.base_url] = command.fingerprint_rdf(tool)
+            fingerprints[tool.category] = command.fingerprint_list(
+                tool.category, "en"
+            )
+        return fingerprints
+
+    def test_formatter_namespace_change_makes_every_page_dirty(self):
+        fingerprints = self.get_fingerprints("prettier 3.3.3")
+        for key, fingerprint in fingerprints.items():
+            self.command.manifest.record(key, fingerprint, [])
+        self.command.manifest.save()
+
+        for namespace, is_current in [
+            ("prettier 3.3.3", True),
+            ("prettier 3.4.0", False),
+            ("python 1", False),
+        ]:
+            fingerprints = self.get_fingerprints(namespace)
+            for key, fingerprint in fingerprints.items():
+                with self.subTest(namespace=namespace, key=key):
+                    self.assertEqual(
+                        is_current,
+                        self.command.manifest.is_current(key, fingerprint),
+                    )
+
+
+class LinkPlanTest(TestCase):
+    def get_plan(self):
+        plan = LinkPlan()
+        plan.add_file("licenses/by/4.0/deed.en.html")
+        plan.add_symlink("licenses/by/4.0/deed.en.html", "deed.html")
+        plan.add_file("licenses/list.en.html")
+        plan.add_symlink("licenses/list.en.html", "../index.html")
+        plan.add_redirect("licenses/by/4.0/legalcode.html", "deed.en")
+        return plan
+
+    def test_listing(self):
+        plan = self.get_plan()
+        self.assertEqual([], plan.get_conflicts())
+        self.assertEqual(
+            "index.html -> licenses/list.en.html\n"
+            "licenses/by/4.0/deed.en.html page\n"
+            "licenses/by/4.0/deed.html -> deed.en.html\n"
+            "licenses/by/4.0/legalcode.html redirect to deed.en\n"
+            "licenses/list.en.html page\n",
+            plan.get_listing(),
+        )
+
+    def test_conflicts(self):
+        plan = self.get_plan()
+        plan.add_file("licenses/by/4.0/deed.fr.html")
+        plan.add_symlink("licenses/by/4.0/deed.fr.html", "deed.html")
+        plan.add_symlink("licenses/by/4.0/deed.en.html", "legalcode.html")
+        plan.add_symlink("licenses/by/4.0/deed.es.html", "index.html")
+        plan.add_file("licenses/by/4.0/legalcode.html")
+        self.assertEqual(
+            [
+                "licenses/by/4.0/deed.html: symlink planned to deed.en.html"
+                " and to deed.fr.html",
+                "licenses/by/4.0/legalcode.html: planned as redirect to"
+                " deed.en and as page",
+                "licenses/by/4.0/index.html: symlink to deed.es.html which is"
+                " not published",
+                "licenses/by/4.0/legalcode.html: symlink to deed.en.html would"
+                " replace page",
+            ],
+            plan.get_conflicts(),
+        )
+
+    def test_apply(self):
+        plan = self.get_plan()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.makedirs(os.path.join(tmpdir, "licenses", "by", "4.0"))
+            link = os.path.join(tmpdir, "licenses", "by", "4.0", "deed.html")
+            os.symlink("deed.fr.html", link)
+            self.assertEqual(2, plan.apply(tmpdir))
+            self.assertEqual("deed.en.html", os.readlink(link))
+            self.assertEqual(
+                "licenses/list.en.html",
+                os.readlink(os.path.join(tmpdir, "index.html")),
+            )
+            # Existing identical symlinks are kept
+            self.assertEqual(0, plan.apply(tmpdir))
+
+            os.remove(link)
+            with open(link, "wb"):
+                pass
+            with self.assertRaises(FileExistsError):
+                plan.apply(tmpdir)
+
+
+class WarmUpTest(TestCase):
+    def tearDown(self):
+        publish_utils._snapshot = None
+        publish_utils._objects.clear()
+        registry.activate_registry(None)
+        utils.init_title_table(None)
+        i18n_utils.PRELOADED_TRANSLATION_OBJECTS.clear()
+
+    def test_warm_up(self):
+        by_30 = ToolFactory(
+            category="licenses", unit="by", version="3.0", jurisdiction_code=""
+        )
+        by_40 = ToolFactory(
+            category="licenses", unit="by", version="4.0", jurisdiction_code=""
+        )
+        by_30.is_replaced_by = by_40
+        by_30.save()
+        legal_code = LegalCodeFactory(tool=by_30, language_code="nl")
+        self.assertIsNone(publish_utils.get_snapshot())
+
+        snapshot = publish_utils.warm_up()
+        self.assertIs(snapshot, publish_utils.get_snapshot())
+        self.assertEqual({by_30.id, by_40.id}, set(snapshot.tools.keys()))
+        self.assertEqual([legal_code.id], list(snapshot.legal_codes.keys()))
+        with self.assertNumQueries(0):
+            tool = snapshot.legal_codes[legal_code.id].tool
+            self.assertIs(snapshot.tools[by_30.id], tool)
+            self.assertIs(snapshot.tools[by_40.id], tool.is_replaced_by)
+
+        # The legal code translation object is loaded once
+        self.assertEqual([("by_30", "nl", "en")], snapshot.translation_keys())
+        translation_object = snapshot.legal_codes[
+            legal_code.id
+        ].get_translation_object()
+        self.assertIs(
+            translation_object,
+            i18n_utils.get_translation_object("by_30", "nl", "en"),
+        )
+
+    def test_get_tool_and_legal_code(self):
+        legal_code = LegalCodeFactory(
+            tool__category="licenses",
+            tool__unit="by",
+            tool__version="4.0",
+            tool__jurisdiction_code="",
+        )
+        tool = legal_code.tool
+        # Without a snapshot, each object is loaded once per process
+        with self.assertNumQueries(2):
+            self.assertEqual(tool, publish_utils.get_tool(tool.id))
+            self.assertEqual(
+                legal_code, publish_utils.get_legal_code(legal_code.id)
+            )
+            self.assertEqual(
+                tool, publish_utils.get_legal_code(legal_code.id).tool
+            )
+            publish_utils.get_tool(tool.id)
+        snapshot = publish_utils.warm_up()
+        with self.assertNumQueries(0):
+            self.assertIs(
+                snapshot.tools[tool.id], publish_utils.get_tool(tool.id)
+            )
+            self.assertIs(
+                snapshot.legal_codes[legal_code.id],
+                publish_utils.get_legal_code(legal_code.id),
+            )
+
+    @override_settings(LANGUAGES_MOSTLY_TRANSLATED=["en", "nl"])
+    def test_title_table(self):
+        by_40 = ToolFactory(
+            category="licenses", unit="by", version="4.0", jurisdiction_code=""
+        )
+        by_30 = ToolFactory(
+            category="licenses",
+            unit="by",
+            version="3.0",
+            jurisdiction_code="es",
+            is_replaced_by=by_40,
+        )
+        LegalCodeFactory(tool=by_30, language_code="ca", title="Títol")
+        tools_registry = registry.LegalToolsRegistry.from_database()
+        with self.assertNumQueries(0):
+            table = publish_utils.build_title_table(tools_registry)
+        self.assertEqual(
+            {
+                ("by", "4.0", "", "en"),
+                ("by", "4.0", "", "nl"),
+                ("by", "3.0", "es", "ca"),
+                ("by", "3.0", "es", "en"),
+                ("by", "3.0", "es", "nl"),
+            },
+            set(table),
+        )
+        self.assertEqual(
+            (
+                "Attribution 4.0 International",
+                "Deed - Attribution 4.0 International",
+                "Legal Code - Attribution 4.0 International",
+            ),
+            table[("by", "4.0", "", "en")],
+        )
+        self.assertEqual("Títol", table[("by", "3.0", "es", "ca")][0])
+
+        # Once warmed up, titles are taken from the table
+        publish_utils.warm_up(table)
+        with mock.patch.object(utils.translation, "override") as override:
+            with self.assertNumQueries(0):
+                for key, titles in table.items():
+                    unit, version, jurisdiction, language_code = key
+                    self.assertEqual(
+                        titles[0],
+                        utils.get_tool_title(
+                            unit,
+                            version,
+                            "licenses",
+                            jurisdiction,
+                            language_code,
+                        ),
+                    )
+        override.assert_not_called()
+
+    def test_get_template_names(self):
+        names = publish_utils.get_template_names()
+        self.assertIn("deed.html", names)
+        self.assertIn(os.path.join("includes", "footer.html"), names)
+
+
+class ShardTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.config_dir = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_parse_shard(self):
+        self.assertEqual((2, 4), publish_utils.parse_shard("2/4"))
+        for value in ["0/4", "5/4", "1/0", "1", "a/b", "1/2/3"]:
+            with self.assertRaises(argparse.ArgumentTypeError):
+                publish_utils.parse_shard(value)
+
+    def test_get_shard(self):
+        keys = [f"https://creativecommons.org/{i}/" for i in range(100)]
+        shards = [publish_utils.get_shard(key, 3) for key in keys]
+        self.assertEqual({1, 2, 3}, set(shards))
+        self.assertEqual(
+            shards, [publish_utils.get_shard(key, 3) for key in keys]
+        )
+        self.assertEqual(1, publish_utils.get_shard(keys[0], 1))
+
+    def test_save_and_load_shard_redirects(self):
+        publish_utils.save_shard_redirects(
+            self.config_dir, 1, 2, {"3.0": {"nl": "nl"}}, [[["a", "b"]]]
+        )
+        with self.assertRaisesRegex(ValueError, "Missing shard files"):
+            publish_utils.load_shard_redirects(self.config_dir)
+        publish_utils.save_shard_redirects(
+            self.config_dir, 2, 2, {"3.0": {"de": "de"}}, [[["c", "d"]]]
+        )
+        (
+            default_languages_deeds,
+            redirect_pairs_data,
+            paths,
+        ) = publish_utils.load_shard_redirects(self.config_dir)
+        self.assertEqual(
+            {"3.0": {"de": "de", "nl": "nl"}}, default_languages_deeds
+        )
+        self.assertEqual([[["a", "b"]], [["c", "d"]]], redirect_pairs_data)
+        self.assertEqual(2, len(paths))
+
+        # Files of a publish with a different number of shards
+        publish_utils.save_shard_redirects(self.config_dir, 1, 3, {}, [])
+        with self.assertRaisesRegex(ValueError, "different publishes"):
+            publish_utils.load_shard_redirects(self.config_dir)
+
+    def test_load_shard_redirects_none(self):
+        with self.assertRaisesRegex(ValueError, "No shard files"):
+            publish_utils.load_shard_redirects(self.config_dir)
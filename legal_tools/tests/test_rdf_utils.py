@@ -1,8 +1,36 @@
+# Standard library
+import datetime
+import os
+import tempfile
+
 # Third-party
 from django.test import TestCase
 
 # First-party/Local
-from legal_tools.rdf_utils import convert_https_to_http, order_rdf_xml
+from legal_tools.models import Tool
+from legal_tools.rdf_utils import (
+    RdfCache,
+    convert_https_to_http,
+    generate_bulk_rdf,
+    generate_legal_code_rdf,
+    generate_legal_code_rdf_xml,
+    get_rdf_cache,
+    get_rdf_tools,
+    order_rdf_xml,
+    serialize_rdf,
+)
+from legal_tools.tests.factories import LegalCodeFactory, ToolFactory
+
+CREATOR_URL = "https://creativecommons.org"
+GOLDEN_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "rdf"
+)
+# Titles of the legal codes of each tool (see create_tool)
+TITLES = {
+    "en": 'Attribution & <Share> "Alike"',
+    "nl": "",
+    "zh-hans": "x\r\ny\tz",
+}
 
 EXPECTED_RDF_XML = """\
 <?xml version='1.0' encoding='utf-8'?>
@@ -90,3 +118,256 @@ class TestRdfUtils(TestCase):
         expected_rdf = EXPECTED_RDF_XML
         ordered_rdf = order_rdf_xml(test_rdf)
         self.assertEqual(expected_rdf, ordered_rdf)
+
+
+class BulkRdfTest(TestCase):
+    def setUp(self):
+        self.source = ToolFactory(
+            category="licenses", unit="by-sa", version="3.0"
+        )
+        self.tool = ToolFactory(
+            category="licenses",
+            unit="by-sa",
+            version="4.0",
+            source=self.source,
+        )
+        for language_code in ["en", "nl"]:
+            LegalCodeFactory(tool=self.tool, language_code=language_code)
+        LegalCodeFactory(tool=self.source, language_code="en")
+
+    def test_generate_bulk_rdf(self):
+        with self.assertNumQueries(2):
+            documents, index_content = generate_bulk_rdf(get_rdf_tools())
+        for tool in [self.tool, self.source]:
+            self.assertEqual(
+                serialize_rdf(
+                    generate_legal_code_rdf(
+                        tool.category, tool.unit, tool.version
+                    )
+                ),
+                documents[tool],
+            )
+        self.assertEqual(
+            serialize_rdf(generate_legal_code_rdf(generate_all_licenses=True)),
+            index_content,
+        )
+
+    def test_generate_bulk_rdf_tool_ids(self):
+        documents, index_content = generate_bulk_rdf(
+            get_rdf_tools(), {self.tool.id}, index=False
+        )
+        self.assertEqual([self.tool], list(documents))
+        self.assertIsNone(index_content)
+
+
+def create_tool(category, unit, version, jurisdiction_code="", **kwargs):
+    path = "/".join(filter(None, [category, unit, version, jurisdiction_code]))
+    fields = {
+        "permits_derivative_works": True,
+        "permits_distribution": True,
+        "permits_reproduction": True,
+        "permits_sharing": True,
+        "prohibits_commercial_use": False,
+        "prohibits_high_income_nation_use": False,
+        "requires_attribution": True,
+        "requires_notice": True,
+        "requires_share_alike": False,
+    }
+    fields.update(kwargs)
+    tool = ToolFactory(
+        base_url=f"{CREATOR_URL}/{path}/",
+        creator_url=CREATOR_URL,
+        category=category,
+        unit=unit,
+        version=version,
+        jurisdiction_code=jurisdiction_code,
+        **fields,
+    )
+    for language_code, title in TITLES.items():
+        LegalCodeFactory(tool=tool, language_code=language_code, title=title)
+    return tool
+
+
+def create_rdf_tools():
+    """
+    Create tools of each kind: unported, ported, IGO, replaced, deprecated
+    and public domain.
+    """
+    by_30 = create_tool("licenses", "by", "3.0")
+    by_40 = create_tool("licenses", "by", "4.0", source=by_30)
+    create_tool(
+        "licenses",
+        "by-nc",
+        "3.0",
+        "nl",
+        prohibits_commercial_use=True,
+        is_replaced_by=by_40,
+        source=by_30,
+    )
+    create_tool(
+        "licenses", "by-nd", "3.0", "igo", permits_derivative_works=False
+    )
+    create_tool(
+        "licenses", "by-sa", "2.5", "scotland", requires_share_alike=True
+    )
+    create_tool(
+        "licenses",
+        "sampling+",
+        "1.0",
+        deprecated_on=datetime.date(2007, 6, 4),
+        permits_distribution=False,
+        permits_sharing=False,
+        is_replaced_by=by_40,
+    )
+    create_tool(
+        "licenses",
+        "devnations",
+        "2.0",
+        deprecated_on=datetime.date(2007, 6, 4),
+        prohibits_high_income_nation_use=True,
+    )
+    create_tool(
+        "publicdomain",
+        "zero",
+        "1.0",
+        requires_attribution=False,
+        requires_notice=False,
+    )
+    create_tool(
+        "publicdomain",
+        "mark",
+        "1.0",
+        requires_attribution=False,
+        requires_notice=False,
+    )
+
+
+def get_golden_name(tool):
+    parts = [tool.category, tool.unit, tool.version, tool.jurisdiction_code]
+    return "_".join(filter(None, parts)) + ".rdf"
+
+
+class RdfXmlSerializerTest(TestCase):
+    """
+    Compare the RDF/XML of the tools with GOLDEN_DIR: the documents published
+    before the direct serializer (rdflib's pretty-xml serializer and
+    order_rdf_xml, one database query per legal code) for the tools created
+    by create_rdf_tools. Each tool's document is GOLDEN_DIR/get_golden_name()
+    and index.rdf is GOLDEN_DIR/index.rdf.
+    """
+
+    def setUp(self):
+        create_rdf_tools()
+
+    def get_golden(self, name):
+        with open(os.path.join(GOLDEN_DIR, name), encoding="utf-8") as f:
+            return f.read()
+
+    def test_golden(self):
+        tools = Tool.objects.all()
+        self.assertEqual(
+            sorted(
+                name for name in os.listdir(GOLDEN_DIR) if name != "index.rdf"
+            ),
+            sorted(get_golden_name(tool) for tool in tools),
+        )
+        for tool in tools:
+            with self.subTest(tool=str(tool)):
+                self.assertEqual(
+                    self.get_golden(get_golden_name(tool)),
+                    generate_legal_code_rdf_xml(
+                        tool.category,
+                        tool.unit,
+                        tool.version,
+                        tool.jurisdiction_code,
+                    ),
+                )
+        self.assertEqual(
+            self.get_golden("index.rdf"),
+            generate_legal_code_rdf_xml(generate_all_licenses=True),
+        )
+
+    def test_golden_bulk(self):
+        documents, index_content = generate_bulk_rdf(get_rdf_tools())
+        for tool, content in documents.items():
+            with self.subTest(tool=str(tool)):
+                self.assertEqual(
+                    self.get_golden(get_golden_name(tool)), content
+                )
+        self.assertEqual(self.get_golden("index.rdf"), index_content)
+
+    def test_identical_to_graph_serialization(self):
+        for tool in Tool.objects.all():
+            arguments = (
+                tool.category,
+                tool.unit,
+                tool.version,
+                tool.jurisdiction_code,
+            )
+            self.assertEqual(
+                serialize_rdf(generate_legal_code_rdf(*arguments)),
+                generate_legal_code_rdf_xml(*arguments),
+            )
+        self.assertEqual(
+            serialize_rdf(generate_legal_code_rdf(generate_all_licenses=True)),
+            generate_legal_code_rdf_xml(generate_all_licenses=True),
+        )
+
+    def test_no_tools(self):
+        Tool.objects.all().delete()
+        self.assertEqual(
+            serialize_rdf(generate_legal_code_rdf(generate_all_licenses=True)),
+            generate_legal_code_rdf_xml(generate_all_licenses=True),
+        )
+
+
+class RdfCacheTest(TestCase):
+    def setUp(self):
+        self.tool = ToolFactory(category="licenses", unit="by", version="4.0")
+        self.legal_code = LegalCodeFactory(
+            tool=self.tool, language_code="en", title="Attribution 4.0"
+        )
+
+    def get_tool(self):
+        return get_rdf_tools(Tool.objects.filter(id=self.tool.id))[0]
+
+    def test_memoized(self):
+        cache = RdfCache()
+        element = cache.get_element(self.get_tool())
+        self.assertIs(element, cache.get_element(self.get_tool()))
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+        documents, _ = generate_bulk_rdf(
+            get_rdf_tools(), index=False, cache=cache
+        )
+        self.assertEqual(
+            serialize_rdf(generate_legal_code_rdf("licenses", "by", "4.0")),
+            documents[self.tool],
+        )
+        self.assertEqual((2, 1), (cache.hits, cache.misses))
+
+    def test_invalidated(self):
+        arguments = ("licenses", "by", "4.0")
+        self.assertIn(
+            "Attribution 4.0", generate_legal_code_rdf_xml(*arguments)
+        )
+        self.assertIn(self.tool.id, get_rdf_cache().elements)
+        # Saving the legal code evicts the element of its tool
+        self.legal_code.title = "Attribution 4.0 International"
+        self.legal_code.save()
+        self.assertNotIn(self.tool.id, get_rdf_cache().elements)
+        self.assertIn(
+            "Attribution 4.0 International",
+            generate_legal_code_rdf_xml(*arguments),
+        )
+        # Updates without signals change the fingerprint
+        Tool.objects.filter(id=self.tool.id).update(
+            deprecated_on=datetime.date(2020, 1, 1)
+        )
+        self.assertIn("2020-01-01", generate_legal_code_rdf_xml(*arguments))
+
+    def test_disk(self):
+        with tempfile.TemporaryDirectory() as directory:
+            element = RdfCache(directory).get_element(self.get_tool())
+            cache = RdfCache(directory)
+            self.assertEqual(element, cache.get_element(self.get_tool()))
+            self.assertEqual((1, 0), (cache.hits, cache.misses))
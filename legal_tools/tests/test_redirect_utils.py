@@ -0,0 +1,230 @@
+# Third-party
+from django.test import TestCase
+
+# First-party/Local
+from legal_tools import redirect_utils
+from .factories import LegalCodeFactory, ToolFactory
+
+
+def get_ordered_pairs():
+    tool = ToolFactory(
+        category="licenses",
+        unit="by",
+        version="4.0",
+        base_url="/licenses/by/4.0/",
+    )
+    legal_code = LegalCodeFactory(tool=tool, language_code="en")
+    redirect_pairs = redirect_utils.get_language_redirect_pairs(
+        [
+            tool.get_redirect_pairs("en"),
+            tool.get_redirect_pairs("zh-hans"),
+            legal_code.get_redirect_pairs(),
+        ]
+    )
+    _, ordered_pairs = redirect_utils.get_redirect_match_lines(redirect_pairs)
+    return ordered_pairs
+
+
+class ExpandPatternTest(TestCase):
+    def test_expand_pattern(self):
+        self.assertEqual(
+            ["deed.en-us", "deed.en@us", "deed.en_us"],
+            redirect_utils.expand_pattern("deed[.]en[@_-]us"),
+        )
+        self.assertEqual(
+            ["sr@", "sr_", "sra", "srl", "srn", "srt"],
+            redirect_utils.expand_pattern("sr[@_latn]"),
+        )
+        self.assertEqual(
+            ["/4.0/de/", "/4.0/de/deed", "/4.0/de/deed.html"],
+            redirect_utils.expand_pattern(
+                "/4[.]0/([^/]+)/(deed|deed[.]html)?", samples=["de"]
+            ),
+        )
+
+    def test_unsupported_syntax(self):
+        for pattern in ["a.*", "[a-z]", "(a", "a{2}"]:
+            with self.assertRaises(ValueError):
+                redirect_utils.parse_pattern(pattern)
+
+    def test_is_map_pattern(self):
+        self.assertTrue(
+            redirect_utils.is_map_pattern(
+                "/by/4[.]0/deed[.]en[@_-]us(?:[.]html)?", "/by/4.0/deed.en"
+            )
+        )
+        self.assertFalse(
+            redirect_utils.is_map_pattern(
+                "/by/4[.]0/([^/]+)/legalcode(?:[.]html)?",
+                "/by/4.0/legalcode.$1",
+            )
+        )
+        self.assertFalse(
+            redirect_utils.is_map_pattern("/by/4[.]0/deed", "/by/4.0/deed.en")
+        )
+
+
+class RewriteMapTest(TestCase):
+    def test_get_redirect_match_lines(self):
+        lines, ordered_pairs = redirect_utils.get_redirect_match_lines(
+            [["/a", "/b"], ["/c(?:[.]html)?", "/d"]]
+        )
+        self.assertEqual(
+            [
+                'RedirectMatch  301  "^/c(?:[.]html)?$"  "/d"',
+                'RedirectMatch  301  "^/a$"            "/b"',
+            ],
+            lines,
+        )
+        self.assertEqual(
+            [["/c(?:[.]html)?", "/d"], ["/a", "/b"]], ordered_pairs
+        )
+
+    def test_get_rewrite_map(self):
+        rewrite_map, rules = redirect_utils.get_rewrite_map(
+            get_ordered_pairs()
+        )
+        self.assertEqual(
+            "/licenses/by/4.0/deed.en",
+            rewrite_map["/licenses/by/4.0/deed.en_us"],
+        )
+        self.assertEqual(
+            "/licenses/by/4.0/deed.zh-hans",
+            rewrite_map["/licenses/by/4.0/deed.zh"],
+        )
+        self.assertEqual(
+            "/licenses/by/4.0/legalcode.en",
+            rewrite_map["/licenses/by/4.0/legalcode.en-gb"],
+        )
+        # The ccEngine bug URLs capture the language code
+        self.assertEqual(12, len(rules))
+        self.assertIn(
+            "/licenses/by/4.0/deed.zh-cn /licenses/by/4.0/deed.zh-hans",
+            redirect_utils.get_rewrite_map_lines(rewrite_map),
+        )
+
+    def test_first_redirect_match_wins(self):
+        rewrite_map, _ = redirect_utils.get_rewrite_map(
+            [["/a[bc](?:[.]html)?", "/1"], ["/a[cd](?:[.]html)?", "/2"]]
+        )
+        self.assertEqual({"/ab": "/1", "/ac": "/1", "/ad": "/2"}, rewrite_map)
+
+    def test_resolvers(self):
+        ordered_pairs = get_ordered_pairs()
+        rewrite_map, rules = redirect_utils.get_rewrite_map(ordered_pairs)
+        for resolver in [
+            redirect_utils.RedirectMatchResolver(ordered_pairs),
+            redirect_utils.RewriteMapResolver(rewrite_map, rules),
+        ]:
+            self.assertEqual(
+                "/licenses/by/4.0/deed.en",
+                resolver.resolve("/licenses/by/4.0/deed.en@us.html"),
+            )
+            self.assertEqual(
+                "/licenses/by/4.0/deed.nl",
+                resolver.resolve("/licenses/by/4.0/nl/"),
+            )
+            self.assertIsNone(resolver.resolve("/licenses/by/4.0/deed.en"))
+
+    def test_verify_rewrite_map(self):
+        ordered_pairs = get_ordered_pairs()
+        rewrite_map, rules = redirect_utils.get_rewrite_map(ordered_pairs)
+        samples = ["en", "nl"]
+        self.assertEqual(
+            [],
+            redirect_utils.verify_rewrite_map(
+                ordered_pairs, rewrite_map, rules, samples
+            ),
+        )
+        rewrite_map["/licenses/by/4.0/deed.zh"] = "/licenses/by/4.0/deed.en"
+        self.assertEqual(
+            [
+                (
+                    "/licenses/by/4.0/deed.zh",
+                    "/licenses/by/4.0/deed.zh-hans",
+                    "/licenses/by/4.0/deed.en",
+                ),
+                (
+                    "/licenses/by/4.0/deed.zh.html",
+                    "/licenses/by/4.0/deed.zh-hans",
+                    "/licenses/by/4.0/deed.en",
+                ),
+            ],
+            redirect_utils.verify_rewrite_map(
+                ordered_pairs, rewrite_map, rules, samples
+            ),
+        )
+
+
+class CompactRedirectsTest(TestCase):
+    def test_get_trie_pattern(self):
+        self.assertEqual(
+            "en[@_-](?:gb|us)",
+            redirect_utils.get_trie_pattern(
+                ["en-gb", "en@gb", "en_gb", "en-us", "en@us", "en_us"]
+            ),
+        )
+        self.assertEqual(
+            "a[bc]?", redirect_utils.get_trie_pattern(["a", "ab", "ac"])
+        )
+        self.assertEqual(
+            "a(?:bc)?", redirect_utils.get_trie_pattern(["a", "abc"])
+        )
+        self.assertEqual("by[.]4", redirect_utils.get_trie_pattern(["by.4"]))
+
+    def test_get_literal_prefix(self):
+        self.assertEqual(
+            "/licenses/by/4",
+            redirect_utils.get_literal_prefix(
+                "/licenses/by/4[.]0/deed[.]en(?:[.]html)?"
+            ),
+        )
+        self.assertEqual(
+            "/licenses/sampling",
+            redirect_utils.get_literal_prefix("/licenses/sampling+/1[.]0"),
+        )
+        self.assertEqual("/", redirect_utils.get_literal_prefix("/(a|b)"))
+
+    def test_compact_redirect_pairs(self):
+        ordered_pairs = get_ordered_pairs()
+        compact_pairs = redirect_utils.compact_redirect_pairs(ordered_pairs)
+        self.assertLess(len(compact_pairs), len(ordered_pairs))
+        self.assertIn(
+            [
+                "/licenses/by/4[.]0/deed[.]en[@_-](?:gb|us)(?:[.]html)?",
+                "/licenses/by/4.0/deed.en",
+            ],
+            compact_pairs,
+        )
+        # The ccEngine bug URLs of the 4.0 licenses are factored by path
+        self.assertIn(
+            [
+                "/(licenses/by(?:-(?:n(?:c(?:-(?:nd/4[.]0|sa/4[.]0)|/4[.]0)"
+                "|d/4[.]0)|sa/4[.]0)|/4[.]0))/([^/]+)/legalcode(?:[.]html)?",
+                "/$1/legalcode.$2",
+            ],
+            compact_pairs,
+        )
+        self.assertEqual(
+            [],
+            redirect_utils.verify_compact_redirects(
+                ordered_pairs, compact_pairs, ["en", "nl"]
+            ),
+        )
+
+    def test_factor_paths(self):
+        self.assertEqual(
+            [["/([ab]/1[.]0)/x(?:[.]html)?", "/$1/y"]],
+            redirect_utils.factor_paths(
+                [
+                    ["/a/1[.]0/x(?:[.]html)?", "/a/1.0/y"],
+                    ["/b/1[.]0/x(?:[.]html)?", "/b/1.0/y"],
+                ]
+            ),
+        )
+        # Paths with special characters are not factored
+        pairs = [
+            ["/a+/1[.]0/x", "/a+/1.0/y"],
+            ["/b+/1[.]0/x", "/b+/1.0/y"],
+        ]
+        self.assertEqual(pairs, redirect_utils.factor_paths(pairs))
@@ -0,0 +1,124 @@
+# Third-party
+from django.conf import settings
+from django.http import Http404
+from django.test import TestCase, override_settings
+
+# First-party/Local
+from legal_tools import registry
+from legal_tools.models import LegalCode, Tool
+from legal_tools.registry import LegalToolsRegistry
+from .factories import LegalCodeFactory, ToolFactory
+
+
+class LegalToolsRegistryTest(TestCase):
+    def setUp(self):
+        self.by_40 = ToolFactory(
+            category="licenses",
+            unit="by",
+            version="4.0",
+            jurisdiction_code="",
+            base_url="https://creativecommons.org/licenses/by/4.0/",
+        )
+        self.by_30 = ToolFactory(
+            category="licenses",
+            unit="by",
+            version="3.0",
+            jurisdiction_code="nl",
+            base_url="https://creativecommons.org/licenses/by/3.0/nl/",
+            is_replaced_by=self.by_40,
+        )
+        for language_code in ["nl", "en"]:
+            LegalCodeFactory(
+                tool=self.by_40, language_code=language_code, html="<p></p>"
+            )
+        LegalCodeFactory(tool=self.by_30, language_code="nl", html="<p></p>")
+        # Excluded language identifier (not valid)
+        self.invalid = LegalCodeFactory(
+            tool=self.by_40, language_code="x-i18n"
+        )
+
+    def tearDown(self):
+        registry.activate_registry(None)
+
+    def test_lookups(self):
+        with self.assertNumQueries(3):
+            tools_registry = LegalToolsRegistry.from_database()
+        with self.assertNumQueries(0):
+            tool = tools_registry.get_tool("by", "3.0", "nl")
+            self.assertEqual(self.by_30, tool)
+            self.assertIs(
+                tools_registry.tools[self.by_40.id], tool.is_replaced_by
+            )
+            self.assertEqual(
+                ["en", "nl", "x-i18n"],
+                [
+                    legal_code.language_code
+                    for legal_code in tools_registry.get_legal_codes(
+                        tool.is_replaced_by
+                    )
+                ],
+            )
+            self.assertEqual(
+                self.invalid,
+                tools_registry.get_legal_code(tool.is_replaced_by, "x-i18n"),
+            )
+            with self.assertRaises(LegalCode.DoesNotExist):
+                tools_registry.get_legal_code(
+                    tool.is_replaced_by, "x-i18n", valid=True
+                )
+            with self.assertRaises(Tool.DoesNotExist):
+                tools_registry.get_tool("by", "3.0", "")
+            self.assertNotIn(self.invalid.id, tools_registry.valid_legal_codes)
+        legal_code = tools_registry.get_legal_code(tool, "nl")
+        self.assertEqual(
+            legal_code,
+            tools_registry.legal_codes_by_url[legal_code.legal_code_url],
+        )
+        # The HTML is deferred
+        with self.assertNumQueries(1):
+            self.assertEqual("<p></p>", legal_code.html)
+
+    def test_immutable(self):
+        tools_registry = LegalToolsRegistry.from_database()
+        with self.assertRaises(AttributeError):
+            tools_registry.tools = {}
+        with self.assertRaises(TypeError):
+            tools_registry.tools[0] = self.by_40
+
+    def test_find(self):
+        # The database is used unless a registry is active
+        for active in [None, LegalToolsRegistry.from_database()]:
+            registry.activate_registry(active)
+            self.assertEqual(self.by_40, registry.find_tool("by", "4.0", ""))
+            self.assertEqual(
+                "en",
+                registry.find_legal_code(self.by_40, "en").language_code,
+            )
+            with self.assertRaises(LegalCode.DoesNotExist):
+                registry.find_legal_code(self.by_40, "x-i18n", valid=True)
+            with self.assertRaises(Http404):
+                registry.find_legal_code_by_url("/licenses/by/4.0/legalcode.x")
+            self.assertEqual(
+                [("4.0", "en"), ("4.0", "nl"), ("3.0", "nl")],
+                [
+                    (legal_code.tool.version, legal_code.language_code)
+                    for legal_code in registry.find_valid_legal_codes(
+                        "licenses"
+                    )
+                ],
+            )
+
+    @override_settings(
+        LANGUAGES_MOSTLY_TRANSLATED=["nl", settings.LANGUAGE_CODE]
+    )
+    def test_render_without_queries(self):
+        legal_code = LegalCode.objects.get(tool=self.by_30)
+        registry.activate_registry(LegalToolsRegistry.from_database())
+        with self.assertNumQueries(0):
+            rsp = self.client.get("/licenses/list.nl")
+        self.assertEqual(200, rsp.status_code)
+        # Only the legal code HTML is loaded
+        with self.assertNumQueries(1):
+            rsp = self.client.get(legal_code.legal_code_url)
+        self.assertEqual(200, rsp.status_code)
+        self.assertEqual(legal_code, rsp.context["legal_code"])
@@ -0,0 +1,61 @@
+# Third-party
+from django.test import TestCase
+
+# First-party/Local
+from legal_tools import timing_utils
+
+
+class TimingsTest(TestCase):
+    def tearDown(self):
+        timing_utils.stop_timing()
+
+    def test_get_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(50, timing_utils.get_percentile(values, 50))
+        self.assertEqual(95, timing_utils.get_percentile(values, 95))
+        self.assertEqual(100, timing_utils.get_percentile(values, 100))
+        self.assertEqual(7, timing_utils.get_percentile([7], 0))
+
+    def test_timed_disabled(self):
+        self.assertIsNone(timing_utils.get_timings())
+        with timing_utils.timed("stage"):
+            pass
+        self.assertIsNone(timing_utils.stop_timing())
+
+    def test_timed(self):
+        timings = timing_utils.start_timing()
+        self.assertIs(timings, timing_utils.get_timings())
+        with timing_utils.timed("save_url", url="/a"):
+            with timing_utils.timed("view"):
+                pass
+        with self.assertRaises(ValueError):
+            with timing_utils.timed("view"):
+                raise ValueError()
+        self.assertIs(timings, timing_utils.stop_timing())
+        self.assertEqual(1, len(timings.stages["save_url"]))
+        self.assertEqual(2, len(timings.stages["view"]))
+        self.assertEqual(["/a"], [url for _, url in timings.urls])
+
+    def test_merge_and_report(self):
+        timings = timing_utils.Timings()
+        timings.add("write", 0.5)
+        worker = timing_utils.Timings()
+        for index in range(timing_utils.SLOWEST_URLS + 10):
+            worker.add("save_url", index / 100, url=f"/{index}")
+        data = worker.get_data()
+        self.assertEqual(timing_utils.SLOWEST_URLS, len(data["urls"]))
+        timings.merge(data)
+
+        report = timings.get_report()
+        self.assertEqual(["save_url", "write"], list(report["stages"].keys()))
+        save_url = report["stages"]["save_url"]
+        self.assertEqual(60, save_url["count"])
+        self.assertEqual(0.29, save_url["p50"])
+        self.assertEqual(0.56, save_url["p95"])
+        self.assertEqual(0.59, save_url["max"])
+        self.assertEqual(
+            {"url": "/59", "seconds": 0.59}, report["slowest_urls"][0]
+        )
+        self.assertEqual(
+            timing_utils.SLOWEST_URLS, len(report["slowest_urls"])
+        )
@@ -1,6 +1,7 @@
 # Standard library
 import logging
 import os
+import stat
 import tempfile
 from io import StringIO
 from unittest import mock
@@ -235,6 +236,106 @@ class SaveURLAsStaticFileTest(TestCase):
         mock_save.assert_called_with("STRING", "/OUTPUT_DIR/FILE_PATH")
 
 
+class OutputSyncTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.output_sync = utils.start_output_sync()
+
+    def tearDown(self):
+        utils.stop_output_sync()
+        self.tmpdir.cleanup()
+
+    def test_skip_unchanged(self):
+        filename = os.path.join(self.tmpdir.name, "a", "b.html")
+        utils.save_bytes_to_file(b"abc", filename)
+        inode = os.stat(filename).st_ino
+        utils.save_bytes_to_file(b"abc", filename)
+        self.assertEqual(inode, os.stat(filename).st_ino)
+        self.assertEqual(1, self.output_sync.written)
+        self.assertEqual(1, self.output_sync.skipped)
+
+        utils.save_bytes_to_file(b"xyz", filename)
+        with open(filename, "rb") as f:
+            self.assertEqual(b"xyz", f.read())
+        self.assertNotEqual(inode, os.stat(filename).st_ino)
+        # Replaced files get the same permissions as files created with open()
+        reference = os.path.join(self.tmpdir.name, "reference")
+        open(reference, "wb").close()
+        self.assertEqual(os.stat(reference).st_mode, os.stat(filename).st_mode)
+        os.remove(reference)
+        self.assertEqual(["b.html"], os.listdir(os.path.dirname(filename)))
+
+    def test_umask(self):
+        filename = os.path.join(self.tmpdir.name, "a.html")
+        umask = os.umask(0o077)
+        try:
+            utils.save_bytes_to_file(b"abc", filename)
+        finally:
+            os.umask(umask)
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(filename).st_mode))
+
+    def test_symlinks(self):
+        path = os.path.join(self.tmpdir.name, "link")
+        utils.save_symlink("a", path)
+        utils.save_symlink("a", path)
+        self.assertEqual("a", os.readlink(path))
+        utils.save_symlink("b", path)
+        self.assertEqual("b", os.readlink(path))
+
+    def test_remove_orphans(self):
+        output_dir = self.tmpdir.name
+        utils.save_bytes_to_file(b"a", os.path.join(output_dir, "a.html"))
+        utils.save_symlink("a.html", os.path.join(output_dir, "b.html"))
+        for relpath in ["orphan.html", "old/orphan.html", ".git/config"]:
+            utils.save_bytes_to_file(b"", os.path.join(output_dir, relpath))
+        os.symlink("a.html", os.path.join(output_dir, "orphan_link"))
+
+        # Outputs recorded by another process are merged
+        output_sync = utils.OutputSync()
+        output_sync.merge(self.output_sync.get_data())
+        output_sync.outputs.discard(os.path.join(output_dir, "orphan.html"))
+        output_sync.outputs.discard(
+            os.path.join(output_dir, "old", "orphan.html")
+        )
+
+        self.assertEqual(3, output_sync.remove_orphans(output_dir, [".git"]))
+        self.assertEqual(
+            [".git", "a.html", "b.html"], sorted(os.listdir(output_dir))
+        )
+
+
+class FileWriterTest(TestCase):
+    def tearDown(self):
+        utils.stop_file_writer()
+
+    def test_file_writer(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            utils.start_file_writer(2)
+            with mock.patch.object(
+                utils, "make_parent_dir", wraps=utils.make_parent_dir
+            ) as make_parent_dir:
+                for index in range(50):
+                    filename = os.path.join(tmpdir, "a", f"{index}.html")
+                    utils.save_bytes_to_file(b"%d" % index, filename)
+            # The directory was created once, when the first file was added
+            make_parent_dir.assert_called_once()
+            utils.stop_file_writer()
+            for index in range(50):
+                filename = os.path.join(tmpdir, "a", f"{index}.html")
+                with open(filename, "rb") as f:
+                    self.assertEqual(b"%d" % index, f.read())
+
+    def test_file_writer_error(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            utils.start_file_writer(1)
+            with mock.patch.object(
+                utils, "write_bytes_to_file", side_effect=OSError("full")
+            ):
+                utils.save_bytes_to_file(b"", os.path.join(tmpdir, "a"))
+                with self.assertRaises(OSError):
+                    utils.stop_file_writer()
+
+
 class ParseLegalcodeFilenameTest(TestCase):
     def test_parse_legal_code_filename(self):
         data = [
@@ -1206,7 +1206,10 @@ class ViewMetadataTest(TestCase):
         tool1 = ToolFactory(
             category="publicdomain", unit="zero", version="1.0"
         )
-        rsp = self.client.get(reverse("metadata_csv"))
+        LegalCodeFactory(tool=tool0, language_code="en")
+        LegalCodeFactory(tool=tool1, language_code="nl")
+        with self.assertNumQueries(2):
+            rsp = self.client.get(reverse("metadata_csv"))
         self.assertEqual(200, rsp.status_code)
         rows = list(csv.DictReader(io.StringIO(rsp.content.decode())))
         self.assertEqual(tool0.category, rows[0]["CATEGORY"])
@@ -1238,7 +1241,8 @@ class RenderRedirect(TestCase):
         destination = "DESTINATION"
         language_code = "en"
         title = "TITLE"
-        rendered = render_redirect(title, destination, language_code)
+        rendered, deferred = render_redirect(title, destination, language_code)
+        self.assertIsNone(deferred)
         rendered = rendered.decode("utf-8")
         self.assertTemplateUsed("redirect.html")
         self.assertIn(f'dir="ltr" lang="{language_code}">', rendered)
@@ -1249,7 +1253,8 @@ class RenderRedirect(TestCase):
         destination = "DESTINATION"
         language_code = "ar"
         title = "TITLE"
-        rendered = render_redirect(title, destination, language_code)
+        rendered, deferred = render_redirect(title, destination, language_code)
+        self.assertIsNone(deferred)
         rendered = rendered.decode("utf-8")
         self.assertTemplateUsed("redirect.html")
         self.assertIn(f'dir="rtl" lang="{language_code}">', rendered)
@@ -0,0 +1,119 @@
+"""
+Timing of the publish stages.
+
+Each process records the durations of the timed stages while timing is
+enabled. Pool workers return their timings with the results of each chunk of
+tasks and the publish command merges them into a single report.
+"""
+
+# Standard library
+import heapq
+import math
+import time
+from contextlib import contextmanager
+
+SLOWEST_URLS = 50
+PERCENTILES = (50, 95, 99)
+
+# Timings of this process (None if timing is disabled)
+_timings = None
+
+
+class Timings:
+    """
+    Stage durations (seconds) and the slowest URLs.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.urls = []
+
+    def add(self, stage, seconds, url=None):
+        self.stages.setdefault(stage, []).append(seconds)
+        if url is not None:
+            self.urls.append((seconds, url))
+
+    def get_data(self):
+        """
+        Return the timings as plain (picklable) data. Only the slowest URLs are
+        kept as they are the only ones reported.
+        """
+        return {
+            "stages": self.stages,
+            "urls": heapq.nlargest(SLOWEST_URLS, self.urls),
+        }
+
+    def merge(self, data):
+        for stage, durations in data["stages"].items():
+            self.stages.setdefault(stage, []).extend(durations)
+        self.urls = heapq.nlargest(
+            SLOWEST_URLS, self.urls + [tuple(url) for url in data["urls"]]
+        )
+
+    def get_report(self):
+        stages = {}
+        for stage, durations in sorted(self.stages.items()):
+            durations = sorted(durations)
+            summary = {
+                "count": len(durations),
+                "total": round(sum(durations), 6),
+            }
+            for percentile in PERCENTILES:
+                summary[f"p{percentile}"] = round(
+                    get_percentile(durations, percentile), 6
+                )
+            summary["max"] = round(durations[-1], 6)
+            stages[stage] = summary
+        return {
+            "stages": stages,
+            "slowest_urls": [
+                {"url": url, "seconds": round(seconds, 6)}
+                for seconds, url in heapq.nlargest(SLOWEST_URLS, self.urls)
+            ],
+        }
+
+
+def get_percentile(sorted_values, percentile):
+    """
+    Return the percentile of the sorted values (nearest-rank method).
+    """
+    rank = math.ceil(percentile / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+def start_timing():
+    global _timings
+    _timings = Timings()
+    return _timings
+
+
+def stop_timing():
+    """
+    Disable timing and return the timings recorded since it was started (or
+    None if it was not).
+    """
+    global _timings
+    timings = _timings
+    _timings = None
+    return timings
+
+
+def get_timings():
+    return _timings
+
+
+@contextmanager
+def timed(stage, url=None):
+    """
+    Record the duration of the block as a stage (and as the duration of the
+    URL, if given) while timing is enabled.
+    """
+    timings = _timings
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(stage, time.perf_counter() - start, url)
@@ -14,6 +14,7 @@ from django.views.generic.base import RedirectView
 
 # First-party/Local
 from i18n import LANGUAGE_CODE_REGEX_STRING
+from legal_tools.budget_utils import query_budget
 from legal_tools.views import (
     view_branch_status,
     view_deed,
@@ -166,92 +167,146 @@ register_converter(LangConverter, "language_code")
 #       deed for BY-SA 2.0, jurisdiction England and Wales, in Spanish
 # /licenses/by-sa/2.0/uk/legalcode
 #       license for BY-SA 2.0, jurisdiction England and Wales, in English
+#
+# Each view URL pattern declares its query budget: the maximum number of
+# database queries to render one of its URLs, from the database (queries) and
+# in the publish tasks (published). See legal_tools.budget_utils.
+#
+# The budgets are the largest counts measured on the URL sample of the tests
+# (ToolsTestsMixin): a deed or legal code of a ported tool that was replaced
+# runs the most queries (up to 6 and 8), as it also looks up the legal codes
+# of the replacing tool. Whether the counts grow with the number of tools is
+# checked separately (QueryBudgetScalingTest).
 
 
 urlpatterns = [
     # DEV #####################################################################
-    path(
-        "",
-        view_dev_index,
-        name="dev_index",
+    query_budget(
+        path(
+            "",
+            view_dev_index,
+            name="dev_index",
+        ),
+        queries=1,
     ),
     # METADATA ################################################################
-    path(
-        "cc-legal-tools.csv",
-        view_metadata_csv,
-        name="metadata_csv",
+    query_budget(
+        path(
+            "cc-legal-tools.csv",
+            view_metadata_csv,
+            name="metadata_csv",
+        ),
+        queries=2,
     ),
     # LIST PAGES ##############################################################
     # List: with language
-    path(
-        "<category:category>/list.<language_code:language_code>",
-        view_list,
-        name="view_list_language_specified",
+    query_budget(
+        path(
+            "<category:category>/list.<language_code:language_code>",
+            view_list,
+            name="view_list_language_specified",
+        ),
+        queries=1,
+        published=0,
     ),
     # List: no language
-    path(
-        "<category:category>/list",
-        view_list,
-        name="view_list",
+    query_budget(
+        path(
+            "<category:category>/list",
+            view_list,
+            name="view_list",
+        ),
+        queries=1,
+        published=0,
     ),
     # List: Licenses list, no language
-    path(
-        "licenses/list",
-        view_list,
-        kwargs=dict(category="licenses"),
-        name="view_list_licenses",
+    query_budget(
+        path(
+            "licenses/list",
+            view_list,
+            kwargs=dict(category="licenses"),
+            name="view_list_licenses",
+        ),
+        queries=1,
+        published=0,
     ),
     # List: Public Domain list, no language
-    path(
-        "publicdomain/list",
-        view_list,
-        kwargs=dict(category="publicdomain"),
-        name="view_list_publicdomain",
+    query_budget(
+        path(
+            "publicdomain/list",
+            view_list,
+            kwargs=dict(category="publicdomain"),
+            name="view_list_publicdomain",
+        ),
+        queries=1,
+        published=0,
     ),
     # DEED PAGES ##############################################################
     # Redirect URLs without a document/layer to the deed (no language_code)
-    re_path(
-        f"^(?P<path>(?:{RE_CATEGORY})/{RE_UNIT}/{RE_VERSION}"
-        f"(/(?:{RE_JURISDICTION}))?)/?$",
-        # "^(?P<path>licenses/by/4.0)",
-        RedirectView.as_view(url="/%(path)s/deed", permanent=False),
-        name="nodocument_redirect",
+    query_budget(
+        re_path(
+            f"^(?P<path>(?:{RE_CATEGORY})/{RE_UNIT}/{RE_VERSION}"
+            f"(/(?:{RE_JURISDICTION}))?)/?$",
+            # "^(?P<path>licenses/by/4.0)",
+            RedirectView.as_view(url="/%(path)s/deed", permanent=False),
+            name="nodocument_redirect",
+        ),
+        queries=0,
     ),
     # Deed: with Jurisdiction (ported), with language_code
-    path(
-        "<category:category>/<unit:unit>/<version:version>"
-        "/<jurisdiction:jurisdiction>/deed.<language_code:language_code>",
-        view_deed,
-        name="view_deed_ported_language_specified",
+    query_budget(
+        path(
+            "<category:category>/<unit:unit>/<version:version>"
+            "/<jurisdiction:jurisdiction>/deed.<language_code:language_code>",
+            view_deed,
+            name="view_deed_ported_language_specified",
+        ),
+        queries=6,
+        published=0,
     ),
     # Deed: with Jurisdiction (ported), no language_code
-    path(
-        "<category:category>/<unit:unit>/<version:version>"
-        "/<jurisdiction:jurisdiction>/deed",
-        view_deed,
-        name="view_deed_ported",
+    query_budget(
+        path(
+            "<category:category>/<unit:unit>/<version:version>"
+            "/<jurisdiction:jurisdiction>/deed",
+            view_deed,
+            name="view_deed_ported",
+        ),
+        queries=6,
+        published=0,
     ),
     # Deed: no Jurisdiction (international/unported), with language_code
-    path(
-        "<category:category>/<unit:unit>/<version:version>/deed"
-        ".<language_code:language_code>",
-        view_deed,
-        kwargs=dict(jurisdiction=""),
-        name="view_deed_unported_language_specified",
+    query_budget(
+        path(
+            "<category:category>/<unit:unit>/<version:version>/deed"
+            ".<language_code:language_code>",
+            view_deed,
+            kwargs=dict(jurisdiction=""),
+            name="view_deed_unported_language_specified",
+        ),
+        queries=6,
+        published=0,
     ),
     # Deed: no Jurisdiction (international/unported), no language_code
-    path(
-        "<category:category>/<unit:unit>/<version:version>/deed",
-        view_deed,
-        kwargs=dict(jurisdiction=""),
-        name="view_deed_unported",
+    query_budget(
+        path(
+            "<category:category>/<unit:unit>/<version:version>/deed",
+            view_deed,
+            kwargs=dict(jurisdiction=""),
+            name="view_deed_unported",
+        ),
+        queries=6,
+        published=0,
     ),
     # LEGALCODE PAGES #########################################################
     # Legalcode: plain text
-    path(
-        "<category:category>/<unit:unit>/<version:version>/legalcode.txt",
-        view_legacy_plaintext,
-        name="view_legacy_plaintext",
+    query_budget(
+        path(
+            "<category:category>/<unit:unit>/<version:version>/legalcode.txt",
+            view_legacy_plaintext,
+            name="view_legacy_plaintext",
+        ),
+        queries=0,
     ),
     # NOTE: programmatic plaintext functionality disabled
     # # Plaintext Legalcode: no Jurisdiction (int/unported), no language_code
@@ -262,77 +317,115 @@ urlpatterns = [
     #     name="view_legal_code_unported",
     # ),
     # Legalcode: with Jurisdiction (ported), with language_code
-    path(
-        "<category:category>/<unit:unit>/<version:version>"
-        "/<jurisdiction:jurisdiction>/legalcode.<language_code:language_code>",
-        view_legal_code,
-        name="view_legal_code_ported_language_specified",
+    query_budget(
+        path(
+            "<category:category>/<unit:unit>/<version:version>"
+            "/<jurisdiction:jurisdiction>/legalcode"
+            ".<language_code:language_code>",
+            view_legal_code,
+            name="view_legal_code_ported_language_specified",
+        ),
+        queries=8,
+        published=1,
     ),
     # Legalcode: with Jurisdiction (ported), no language_code
-    path(
-        "<category:category>/<unit:unit>/<version:version>"
-        "/<jurisdiction:jurisdiction>/legalcode",
-        view_legal_code,
-        name="view_legal_code_ported",
+    query_budget(
+        path(
+            "<category:category>/<unit:unit>/<version:version>"
+            "/<jurisdiction:jurisdiction>/legalcode",
+            view_legal_code,
+            name="view_legal_code_ported",
+        ),
+        queries=8,
+        published=1,
     ),
     # Legalcode: no Jurisdiction (international/unported), with language_code
-    path(
-        "<category:category>/<unit:unit>/<version:version>/legalcode"
-        ".<language_code:language_code>",
-        view_legal_code,
-        kwargs=dict(jurisdiction=""),
-        name="view_legal_code_unported_language_specified",
+    query_budget(
+        path(
+            "<category:category>/<unit:unit>/<version:version>/legalcode"
+            ".<language_code:language_code>",
+            view_legal_code,
+            kwargs=dict(jurisdiction=""),
+            name="view_legal_code_unported_language_specified",
+        ),
+        queries=8,
+        published=1,
     ),
     # Legalcode: no Jurisdiction (international/unported), no language_code
-    path(
-        "<category:category>/<unit:unit>/<version:version>/legalcode",
-        view_legal_code,
-        kwargs=dict(jurisdiction=""),
-        name="view_legal_code_unported",
+    query_budget(
+        path(
+            "<category:category>/<unit:unit>/<version:version>/legalcode",
+            view_legal_code,
+            kwargs=dict(jurisdiction=""),
+            name="view_legal_code_unported",
+        ),
+        queries=8,
+        published=1,
     ),
     # CCREL DOCUMENTS #########################################################
     # Legal tool RDF/XML: no Jurisdiction (international/unported)
-    path(
-        "<category:category>/<unit:unit>/<version:version>/rdf",
-        view_legal_tool_rdf,
-        name="view_legal_tool_rdf_unported",
+    query_budget(
+        path(
+            "<category:category>/<unit:unit>/<version:version>/rdf",
+            view_legal_tool_rdf,
+            name="view_legal_tool_rdf_unported",
+        ),
+        queries=2,
     ),
     # Legal tool RDF/XML: with Jurisdiction (ported)
-    path(
-        "<category:category>/<unit:unit>/<version:version>/"
-        "<jurisdiction:jurisdiction>/rdf",
-        view_legal_tool_rdf,
-        name="view_legal_tool_rdf_ported",
+    query_budget(
+        path(
+            "<category:category>/<unit:unit>/<version:version>/"
+            "<jurisdiction:jurisdiction>/rdf",
+            view_legal_tool_rdf,
+            name="view_legal_tool_rdf_ported",
+        ),
+        queries=2,
     ),
     # index.rdf - RDF/XML of all legal tools
-    path(
-        "rdf/index.rdf",
-        view_legal_tool_rdf,
-        name="view_legal_tool_rdf_index",
+    query_budget(
+        path(
+            "rdf/index.rdf",
+            view_legal_tool_rdf,
+            name="view_legal_tool_rdf_index",
+        ),
+        queries=2,
     ),
     # images.rdf - RDF/XML of all legal tool images (badges)
-    path(
-        "rdf/images.rdf",
-        view_image_rdf,
-        name="view_image_rdf",
+    query_budget(
+        path(
+            "rdf/images.rdf",
+            view_image_rdf,
+            name="view_image_rdf",
+        ),
+        queries=1,
     ),
     # images.rdf - ccREL description & namespace
-    re_path(
-        r"^rdf/ns",
-        view_ns_html,
-        name="ns_html",
+    query_budget(
+        re_path(
+            r"^rdf/ns",
+            view_ns_html,
+            name="ns_html",
+        ),
+        queries=0,
     ),
     # Redirect /ns to /rdf/ns
-    re_path(
-        r"^ns",
-        RedirectView.as_view(url="/rdf/ns", permanent=False),
-        name="ns_html_redirect",
+    query_budget(
+        re_path(
+            r"^ns",
+            RedirectView.as_view(url="/rdf/ns", permanent=False),
+            name="ns_html_redirect",
+        ),
+        queries=0,
     ),
     # Redirect rdf/schema.rdf to static/rdf/schema.rdf
-    re_path(
-        r"^(?P<rdf>rdf/schema.rdf)",
-        RedirectView.as_view(url="/static/%(rdf)s", permanent=False),
-        name="static_rdf_redirect",
+    query_budget(
+        re_path(
+            r"^(?P<rdf>rdf/schema.rdf)",
+            RedirectView.as_view(url="/static/%(rdf)s", permanent=False),
+            name="static_rdf_redirect",
+        ),
+        queries=0,
     ),
     # TRANSLATION PAGES #######################################################
     re_path(
@@ -2,6 +2,11 @@
 import logging
 import os
 import posixpath
+import queue
+import shutil
+import stat
+import threading
+import uuid
 
 # Third-party
 from colorlog.escape_codes import escape_codes
@@ -12,6 +17,7 @@ from django.utils import translation
 
 # First-party/Local
 import legal_tools.models
+import legal_tools.registry
 from i18n import UNIT_NAMES
 from i18n.utils import (
     active_translation,
@@ -20,8 +26,19 @@ from i18n.utils import (
     get_translation_object,
     map_legacy_to_django_language_code,
 )
+from legal_tools.format_utils import get_format_queue
+from legal_tools.timing_utils import timed
 
 LOG = logging.getLogger(__name__)
+# Output sync of this process (None unless outputs are synced)
+_output_sync = None
+# File writer of this process (None unless writes are threaded)
+_file_writer = None
+# Bound of the file writer queue, per writer thread
+FILE_WRITER_QUEUE_SIZE = 16
+# Precomputed titles of this process (None unless initialized, see
+# init_title_table)
+_title_table = None
 
 
 class MockRequest:
@@ -29,8 +46,11 @@ class MockRequest:
     META = {}
     GET = {"distilling": 1}
 
-    def __init__(self, path):
+    def __init__(self, path, defer_formatting=False):
         self.path = path
+        # Allow the view to defer formatting to the format queue (see
+        # pretty_html_response)
+        self.defer_formatting = defer_formatting
 
 
 def init_utils_logger(logger: logging.Logger = None):
@@ -41,13 +61,262 @@ def init_utils_logger(logger: logging.Logger = None):
         LOG = logger
 
 
-def save_bytes_to_file(filebytes, output_filename):
+def make_parent_dir(output_filename):
     dirname = os.path.dirname(output_filename)
     if os.path.isfile(dirname):
         os.remove(dirname)
     os.makedirs(dirname, mode=0o755, exist_ok=True)
-    with open(output_filename, "wb") as f:
-        f.write(filebytes)
+
+
+class OutputSync:
+    """
+    Sync the outputs instead of rewriting them: files whose content is
+    unchanged are not written, changed files are replaced atomically, and every
+    output is recorded so that orphaned files can be removed afterwards.
+    """
+
+    def __init__(self):
+        self.outputs = set()
+        self.written = 0
+        self.skipped = 0
+        # The files may be saved by the threads of a file writer
+        self.lock = threading.Lock()
+
+    def record(self, path):
+        self.outputs.add(os.path.abspath(path))
+
+    def is_unchanged(self, filebytes, path):
+        try:
+            path_stat = os.lstat(path)
+        except FileNotFoundError:
+            return False
+        # Compare the size before reading the file
+        if not stat.S_ISREG(path_stat.st_mode):
+            return False
+        if path_stat.st_size != len(filebytes):
+            return False
+        with open(path, "rb") as f:
+            return f.read() == filebytes
+
+    def save(self, filebytes, path):
+        self.record(path)
+        if self.is_unchanged(filebytes, path):
+            with self.lock:
+                self.skipped += 1
+            return
+        temp_path = os.path.join(
+            os.path.dirname(path), f".{uuid.uuid4().hex}.tmp"
+        )
+        # Unlike mkstemp (0o600), the file is created with the permissions of
+        # open(): the process umask is applied to 0o666 by the kernel
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(filebytes)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        with self.lock:
+            self.written += 1
+
+    def get_data(self):
+        return {
+            "outputs": sorted(self.outputs),
+            "written": self.written,
+            "skipped": self.skipped,
+        }
+
+    def merge(self, data):
+        self.outputs.update(data["outputs"])
+        self.written += data["written"]
+        self.skipped += data["skipped"]
+
+    def remove_orphans(self, output_dir, ignore):
+        """
+        Remove the files (and then empty directories) of the output directory
+        that were not recorded. Top-level items in ignore are kept.
+        """
+        removed = 0
+        output_dir = os.path.abspath(output_dir)
+        ignored = {os.path.join(output_dir, name) for name in ignore}
+        for dirpath, dirnames, filenames in os.walk(output_dir, False):
+            for name in filenames + dirnames:
+                path = os.path.join(dirpath, name)
+                top_level = os.path.join(
+                    output_dir,
+                    os.path.relpath(path, output_dir).split(os.sep)[0],
+                )
+                if top_level in ignored:
+                    continue
+                if path in self.outputs:
+                    continue
+                if os.path.isdir(path) and not os.path.islink(path):
+                    if not os.listdir(path):
+                        os.rmdir(path)
+                    continue
+                LOG.debug(f"    removing orphan: {path}")
+                os.remove(path)
+                removed += 1
+        return removed
+
+
+def start_output_sync():
+    global _output_sync
+    _output_sync = OutputSync()
+    return _output_sync
+
+
+def stop_output_sync():
+    """
+    Stop syncing and return the output sync (or None, if outputs were not
+    synced).
+    """
+    global _output_sync
+    output_sync = _output_sync
+    _output_sync = None
+    return output_sync
+
+
+def get_output_sync():
+    return _output_sync
+
+
+class FileWriter:
+    """
+    Write files from a pool of I/O threads so that rendering does not wait on
+    the file system. The queue is bounded so that rendering can only get
+    queue_size files ahead of the writes.
+
+    Directories are created when the files are added (so that symlinks to the
+    files can be created before they are written), once per directory.
+    """
+
+    def __init__(self, threads, queue_size):
+        self.queue = queue.Queue(queue_size)
+        self.dirs = set()
+        self.error = None
+        self.threads = [
+            threading.Thread(target=self.run, daemon=True)
+            for _ in range(threads)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def make_parent_dir(self, output_filename):
+        dirname = os.path.dirname(output_filename)
+        if dirname not in self.dirs:
+            make_parent_dir(output_filename)
+            self.dirs.add(dirname)
+
+    def add(self, filebytes, output_filename):
+        if self.error:
+            raise self.error
+        self.make_parent_dir(output_filename)
+        self.queue.put((filebytes, output_filename))
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                # Once a write failed, the remaining files are discarded
+                if self.error is None:
+                    write_bytes_to_file(*item)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def close(self):
+        """
+        Wait for the queued files to be written and stop the threads. Raises
+        the error of the first write that failed.
+        """
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        if self.error:
+            raise self.error
+
+
+def start_file_writer(threads):
+    global _file_writer
+    _file_writer = FileWriter(threads, threads * FILE_WRITER_QUEUE_SIZE)
+    return _file_writer
+
+
+def stop_file_writer():
+    """
+    Write the remaining queued files and stop threading writes.
+    """
+    global _file_writer
+    file_writer = _file_writer
+    _file_writer = None
+    if file_writer:
+        file_writer.close()
+
+
+def save_bytes_to_file(filebytes, output_filename):
+    if _file_writer:
+        _file_writer.add(filebytes, output_filename)
+        return
+    make_parent_dir(output_filename)
+    write_bytes_to_file(filebytes, output_filename)
+
+
+def write_bytes_to_file(filebytes, output_filename):
+    """
+    Write the bytes to the file (its directory must exist).
+    """
+    with timed("write"):
+        if _output_sync:
+            _output_sync.save(filebytes, output_filename)
+            return
+        with open(output_filename, "wb") as f:
+            f.write(filebytes)
+
+
+def copy_file(src, dst):
+    """
+    Copy the file (with shutil.copy2 unless the outputs are synced). Can be
+    used as the copy_function of shutil.copytree.
+    """
+    if _output_sync:
+        with open(src, "rb") as f:
+            save_bytes_to_file(f.read(), dst)
+        return dst
+    return shutil.copy2(src, dst)
+
+
+def save_symlink(target, path):
+    """
+    Create (or replace) the symlink at path unless it already points to target.
+    """
+    if _output_sync:
+        _output_sync.record(path)
+    if os.path.islink(path):
+        if os.readlink(path) == target:
+            return
+        os.remove(path)
+    os.symlink(target, path)
+
+
+def save_or_queue_bytes(filebytes, output_filename, deferred=None):
+    """
+    Save the bytes to the file or, if formatting of the content was deferred
+    (deferred holds the format queue arguments, see prepare_html_bytes), add
+    them to the format queue (which saves them once they are formatted).
+    """
+    if deferred is not None:
+        # Ensure the directory exists so that symlinks can be created before
+        # the queue is flushed
+        make_parent_dir(output_filename)
+        get_format_queue().add(output_filename, filebytes, **deferred)
+    else:
+        save_bytes_to_file(filebytes, output_filename)
 
 
 def save_url_as_static_file(output_dir, url, relpath):
@@ -61,16 +330,29 @@ def save_url_as_static_file(output_dir, url, relpath):
     # because the request host wasn't in the ALLOWED_HOSTS. So, resolve the URL
     # and call the view directly.
     LOG.debug(f"    {relpath}")
-    resolver = get_resolver()
-    match = resolver.resolve(url)  # ResolverMatch
-    rsp = match.func(request=MockRequest(url), *match.args, **match.kwargs)
-    if rsp.status_code != 200:
-        raise ValueError(f"ERROR: Status {rsp.status_code} for url {url}")
-    output_filename = os.path.join(output_dir, relpath)
-    save_bytes_to_file(rsp.content, output_filename)
+    with timed("save_url", url=url):
+        resolver = get_resolver()
+        match = resolver.resolve(url)  # ResolverMatch
+        with timed("view"):
+            rsp = match.func(
+                request=MockRequest(url, defer_formatting=True),
+                *match.args,
+                **match.kwargs,
+            )
+        if rsp.status_code != 200:
+            raise ValueError(f"ERROR: Status {rsp.status_code} for url {url}")
+        output_filename = os.path.join(output_dir, relpath)
+        save_or_queue_bytes(
+            rsp.content, output_filename, getattr(rsp, "deferred", None)
+        )
 
 
 def relative_symlink(src1, src2, dst):
+    with timed("symlink"):
+        _relative_symlink(src1, src2, dst)
+
+
+def _relative_symlink(src1, src2, dst):
     padding = " " * len(os.path.dirname(src2))
     src = os.path.abspath(os.path.join(src1, src2))
     dir_path, src_file = os.path.split(src)
@@ -81,17 +363,24 @@ def relative_symlink(src1, src2, dst):
         src_file = os.path.join(subdir, src_file)
         padding = padding[:-3]
     dir_fd = os.open(dir_path, os.O_RDONLY)
+    dst_path = os.path.join(dir_path, dst)
+    if _output_sync:
+        _output_sync.record(dst_path)
     try:
         os.symlink(src_file, dst, dir_fd=dir_fd)
         LOG.debug(f"    {padding}^{dst}")
     except FileExistsError:
-        # If symlink destination is a symlink, remove it and try again
-        dst_path = os.path.join(dir_path, dst)
+        # If symlink destination is a symlink, remove it and try again (unless
+        # it is already the same symlink)
         small_path = os.path.relpath(dst_path, start=src1)
+        if os.path.islink(dst_path) and (
+            os.readlink(dst, dir_fd=dir_fd) == src_file
+        ):
+            return
         if os.path.islink(dst_path):
             LOG.debug(f"overwriting symlink: {small_path}")
             os.remove(dst, dir_fd=dir_fd)
-            relative_symlink(src1, src2, dst)
+            _relative_symlink(src1, src2, dst)
         else:
             LOG.error(f"unable to create symlink, file exists: {small_path}")
             raise
@@ -99,12 +388,24 @@ def relative_symlink(src1, src2, dst):
         os.close(dir_fd)
 
 
-def save_redirect(output_dir, redirect_file, redirect_content):
-    path, filename = os.path.split(redirect_file)
-    padding = " " * (len(os.path.dirname(path)) + 8)
-    LOG.debug(f"{padding}*{filename}")
-    output_filename = os.path.join(output_dir, redirect_file)
-    save_bytes_to_file(redirect_content, output_filename)
+def save_redirect(output_dir, redirect_file, redirect_content, deferred=None):
+    save_redirects(output_dir, [redirect_file], redirect_content, deferred)
+
+
+def save_redirects(
+    output_dir, redirect_files, redirect_content, deferred=None
+):
+    """
+    Save the (rendered once) redirect content to each of the redirect files.
+    If formatting of the content was deferred, each file is queued with the
+    same format queue arguments (see save_or_queue_bytes).
+    """
+    for redirect_file in redirect_files:
+        path, filename = os.path.split(redirect_file)
+        padding = " " * (len(os.path.dirname(path)) + 8)
+        LOG.debug(f"{padding}*{filename}")
+        output_filename = os.path.join(output_dir, redirect_file)
+        save_or_queue_bytes(redirect_content, output_filename, deferred)
 
 
 def parse_legal_code_filename(filename):
@@ -292,13 +593,20 @@ def clean_string(s):
     return s
 
 
-def get_tool_title(unit, version, category, jurisdiction, language_code):
+def get_tool_title(
+    unit, version, category, jurisdiction, language_code, legal_code_title=None
+):
     """
     Determine tool title:
     1. If English, use English
-    2. Attempt to pull translated title from DB
+    2. Attempt to pull translated title from DB (unless the legal code title
+       is already known: legal_code_title, empty if there is no legal code)
     3. Translate title using Deeds & UX translation domain
+    (unless the title is in the title table, see init_title_table)
     """
+    titles = get_title_table_entry(unit, version, jurisdiction, language_code)
+    if titles:
+        return titles[0]
     prefix = f"{unit}-{version}-{jurisdiction}-{language_code}-"
     tool_title = cache.get(f"{prefix}title", "")
     if tool_title:
@@ -312,18 +620,12 @@ def get_tool_title(unit, version, category, jurisdiction, language_code):
         return tool_title
 
     # Use the legal code title, if it exists
-    try:
-        legal_code = legal_tools.models.LegalCode.objects.get(
-            tool__category=category,
-            tool__version=version,
-            tool__unit=unit,
-            tool__jurisdiction_code=jurisdiction,
-            language_code=language_code,
+    if legal_code_title is None:
+        legal_code_title = get_legal_code_title(
+            unit, version, category, jurisdiction, language_code
         )
-    except legal_tools.models.LegalCode.DoesNotExist:
-        legal_code = False
-    if legal_code:
-        tool_title_db = clean_string(legal_code.title)
+    if legal_code_title:
+        tool_title_db = clean_string(legal_code_title)
         if tool_title_db and tool_title_db != tool_title_en:
             tool_title = tool_title_db
             cache.add(f"{prefix}title", tool_title)
@@ -341,6 +643,72 @@ def get_tool_title(unit, version, category, jurisdiction, language_code):
     return tool_title
 
 
+def get_replaced_titles(title, language_code):
+    """
+    Return the titles of the links to the deed and the legal code of a tool
+    (with the tool title) that replaces another, in the language.
+    """
+    with translation.override(language_code):
+        deed_str = translation.gettext("Deed")
+        legal_code_str = translation.gettext("Legal Code")
+    return f"{deed_str} - {title}", f"{legal_code_str} - {title}"
+
+
+def init_title_table(table):
+    """
+    Use the title table (or, if table is None, compute and cache the titles
+    on demand) for the titles of this process.
+
+    The table maps each (unit, version, jurisdiction code, language code) to
+    the tool title and the titles of the links to the deed and legal code of
+    the tool when it replaces another (see get_replaced_titles). It is built
+    once before the publish pool starts and shared read-only by the workers
+    (see publish_utils.build_title_table).
+    """
+    global _title_table
+    _title_table = table
+
+
+def get_title_table_entry(unit, version, jurisdiction, language_code):
+    """
+    Return the titles of the tool in the language from the title table (or
+    None).
+    """
+    if _title_table is None:
+        return None
+    return _title_table.get((unit, version, jurisdiction, language_code))
+
+
+def get_legal_code_title(unit, version, category, jurisdiction, language_code):
+    """
+    Return the title of the legal code of the tool in the language (empty if
+    there is none).
+    """
+    if legal_tools.registry.get_registry():
+        try:
+            tool = legal_tools.registry.find_tool(unit, version, jurisdiction)
+            if tool.category != category:
+                return ""
+            return legal_tools.registry.find_legal_code(
+                tool, language_code
+            ).title
+        except (
+            legal_tools.models.Tool.DoesNotExist,
+            legal_tools.models.LegalCode.DoesNotExist,
+        ):
+            return ""
+    try:
+        return legal_tools.models.LegalCode.objects.get(
+            tool__category=category,
+            tool__version=version,
+            tool__unit=unit,
+            tool__jurisdiction_code=jurisdiction,
+            language_code=language_code,
+        ).title
+    except legal_tools.models.LegalCode.DoesNotExist:
+        return ""
+
+
 def get_tool_title_en(unit, version, category, jurisdiction):
     prefix = f"{unit}-{version}-{jurisdiction}-en-"
     tool_title_en = cache.get(f"{prefix}title", "")
@@ -1,12 +1,9 @@
 # Standard library
 import os
-import subprocess
 from operator import itemgetter
 from typing import Iterable
 
 # Third-party
-import requests
-from bs4 import BeautifulSoup
 from django.conf import settings
 from django.core.cache import cache
 from django.utils import translation
@@ -16,8 +13,21 @@ from i18n.utils import (
     get_default_language_for_jurisdiction_deed,
     get_default_language_for_jurisdiction_naive,
 )
+from legal_tools.format_utils import (
+    clean_html_bytes,
+    format_html_bytes,
+    get_format_cache,
+    get_format_queue,
+    get_html_formatter,
+)
 from legal_tools.models import LegalCode
-from legal_tools.utils import get_tool_title
+from legal_tools.registry import find_legal_code
+from legal_tools.timing_utils import timed
+from legal_tools.utils import (
+    get_replaced_titles,
+    get_title_table_entry,
+    get_tool_title,
+)
 
 
 def get_category_and_category_title(category=None, tool=None):
@@ -122,53 +132,34 @@ def get_legal_code_replaced_rel_path(
         return None, None, None, None
     try:
         # Same language
-        legal_code = LegalCode.objects.valid().get(
-            tool=tool, language_code=language_code
-        )
+        legal_code = find_legal_code(tool, language_code, valid=True)
     except LegalCode.DoesNotExist:
         try:
             # Jurisdiction default language
-            legal_code = LegalCode.objects.valid().get(
-                tool=tool, language_code=language_default
-            )
+            legal_code = find_legal_code(tool, language_default, valid=True)
         except LegalCode.DoesNotExist:
             # Global default language
-            legal_code = LegalCode.objects.valid().get(
-                tool=tool, language_code=settings.LANGUAGE_CODE
+            legal_code = find_legal_code(
+                tool, settings.LANGUAGE_CODE, valid=True
             )
-    title = get_tool_title(
+    titles = get_title_table_entry(
         tool.unit,
         tool.version,
-        tool.category,
         tool.jurisdiction_code,
         legal_code.language_code,
     )
-    prefix = (
-        f"{tool.unit}-{tool.version}-"
-        f"{tool.jurisdiction_code}-{legal_code.language_code}-"
-    )
-    replaced_deed_title = cache.get(f"{prefix}replaced_deed_title", "")
-    if not replaced_deed_title:
-        with translation.override(legal_code.language_code):
-            deed_str = translation.gettext("Deed")
-        replaced_deed_title = f"{deed_str} - {title}"
-        cache.add(f"{prefix}replaced_deed_title", replaced_deed_title)
+    if titles:
+        _, replaced_deed_title, replaced_legal_code_title = titles
+    else:
+        replaced_deed_title, replaced_legal_code_title = (
+            get_cached_replaced_titles(tool, legal_code.language_code)
+        )
     replaced_deed_path = get_deed_rel_path(
         legal_code.deed_url,
         path_start,
         language_code,
         language_default,
     )
-    replaced_legal_code_title = cache.get(
-        f"{prefix}replaced_legal_code_title", ""
-    )
-    if not replaced_legal_code_title:
-        with translation.override(legal_code.language_code):
-            legal_code_str = translation.gettext("Legal Code")
-        replaced_legal_code_title = f"{legal_code_str} - {title}"
-        cache.add(
-            f"{prefix}replaced_legal_code_title", replaced_legal_code_title
-        )
     replaced_legal_code_path = os.path.relpath(
         legal_code.legal_code_url, path_start
     )
@@ -180,6 +171,36 @@ def get_legal_code_replaced_rel_path(
     )
 
 
+def get_cached_replaced_titles(tool, language_code):
+    """
+    Return the titles of the links to the deed and legal code of the tool
+    that replaces another, in the language (see get_replaced_titles), cached.
+    """
+    prefix = (
+        f"{tool.unit}-{tool.version}-{tool.jurisdiction_code}-{language_code}-"
+    )
+    replaced_deed_title = cache.get(f"{prefix}replaced_deed_title", "")
+    replaced_legal_code_title = cache.get(
+        f"{prefix}replaced_legal_code_title", ""
+    )
+    if not replaced_deed_title or not replaced_legal_code_title:
+        title = get_tool_title(
+            tool.unit,
+            tool.version,
+            tool.category,
+            tool.jurisdiction_code,
+            language_code,
+        )
+        replaced_deed_title, replaced_legal_code_title = get_replaced_titles(
+            title, language_code
+        )
+        cache.add(f"{prefix}replaced_deed_title", replaced_deed_title)
+        cache.add(
+            f"{prefix}replaced_legal_code_title", replaced_legal_code_title
+        )
+    return replaced_deed_title, replaced_legal_code_title
+
+
 def get_list_paths(language_code, language_default):
     paths = [
         f"/licenses/list.{language_code}",
@@ -221,32 +242,41 @@ def normalize_path_and_lang(request_path, jurisdiction, language_code):
     return request_path, language_code
 
 
-def pretty_html_bytes(path, html_bytes):  # pragma: no cover
+def prepare_html_bytes(html_bytes, defer=False):
+    """
+    1. Return the cached result, if the format cache is enabled and contains
+       the HTML
+    2. Clean-up HTML using BeautifulSoup4
+    3. Format HTML using the configured backend (if defer is True, Prettier
+       formatting is deferred to the format queue of this thread, if active)
+
+    Returns the HTML and, if its formatting was deferred, the keyword arguments
+    with which it must be added to the format queue (otherwise None).
+    """
+    cache = get_format_cache()
+    cache_key = None
+    if cache:
+        cache_key = cache.get_key(html_bytes)
+        formatted = cache.get(cache_key)
+        if formatted is not None:
+            return formatted, None
+    with timed("clean_html"):
+        data = clean_html_bytes(html_bytes)
+    if defer and get_format_queue() and get_html_formatter() == "prettier":
+        return data, {"cache_key": cache_key}
+    with timed("format_html"):
+        formatted = format_html_bytes(data)
+    if cache:
+        cache.put(cache_key, formatted)
+    return formatted, None
+
+
+def pretty_html_bytes(path, html_bytes):
     """
-    1. Clean-up HTML using BeautifulSoup4
-    2. Format HTML using Prettier
+    Clean-up and format HTML (see prepare_html_bytes)
     """
-    if not isinstance(html_bytes, bytes):
-        html_bytes = html_bytes.encode("utf-8")
-    data = BeautifulSoup(html_bytes, features="lxml").encode()
-    if settings.PRETTIER_SLOW:
-        # This logic path should only used by GitHub Actions
-        # (The multiple Prettier container model, below, is about 25% faster)
-        cmd = "prettier --parser html".split()
-        completed = subprocess.run(cmd, input=data, capture_output=True)
-        return completed.stdout
-    else:
-        url = "http://prettier:3000"
-        headers = {"Content-Type": "text/html"}
-        timeout = 5
-        response = requests.post(
-            url,
-            data=data,
-            headers=headers,
-            timeout=timeout,
-        )
-        response.raise_for_status()
-        return response.content
+    formatted, _ = prepare_html_bytes(html_bytes)
+    return formatted
     # This function is currently expected to complete without error. The
     # primary downside is that HTML syntax errors are not currently exposed. A
     # new function and command line should be created to test validity of HTML
@@ -254,3 +284,17 @@ def pretty_html_bytes(path, html_bytes):  # pragma: no cover
     #
     # except requests.HTTPError as e:
     #     LOG.warning(f"{path}: {e.response.text}")
+
+
+def pretty_html_response(request, html_response):
+    """
+    Clean-up and format the HTML of the response (see prepare_html_bytes).
+    Formatting is only deferred if the request asks for it (see
+    save_url_as_static_file), in which case html_response.deferred holds the
+    format queue arguments.
+    """
+    html_response.content, html_response.deferred = prepare_html_bytes(
+        html_response.content,
+        defer=getattr(request, "defer_formatting", False),
+    )
+    return html_response
@@ -7,7 +7,7 @@ from operator import itemgetter
 # Third-party
 from django.conf import settings
 from django.http import Http404, HttpResponse
-from django.shortcuts import get_object_or_404, render
+from django.shortcuts import render
 from django.template.loader import render_to_string
 from django.utils import translation
 
@@ -28,8 +28,14 @@ from legal_tools.models import (
 )
 from legal_tools.rdf_utils import (
     generate_images_rdf,
-    generate_legal_code_rdf,
-    order_rdf_xml,
+    generate_legal_code_rdf_xml,
+    serialize_rdf,
+)
+from legal_tools.registry import (
+    find_legal_code_by_url,
+    find_legal_codes,
+    find_tool,
+    find_valid_legal_codes,
 )
 from legal_tools.utils import get_tool_title
 from legal_tools.view_utils import (
@@ -40,7 +46,8 @@ from legal_tools.view_utils import (
     get_legal_code_replaced_rel_path,
     get_list_paths,
     normalize_path_and_lang,
-    pretty_html_bytes,
+    prepare_html_bytes,
+    pretty_html_response,
 )
 
 NUM_COMMITS = 3
@@ -76,15 +83,12 @@ def view_dev_index(request):
 
     branches = TranslationBranch.objects.exclude(complete=True)
 
-    legal_code_objects = (
+    legal_code_langauge_codes = list(
         LegalCode.objects.valid()
-        .select_related("tool")
-        .order_by(
-            "language_code",
-        )
+        .order_by("language_code")
+        .values_list("language_code", flat=True)
+        .distinct()
     )
-    legal_code_langauge_codes = [lc.language_code for lc in legal_code_objects]
-    legal_code_langauge_codes = sorted(list(set(legal_code_langauge_codes)))
 
     deed_ux_translation_info = {}
     locale_dir = os.path.join(settings.DATA_REPOSITORY_DIR, "locale")
@@ -151,10 +155,7 @@ def view_dev_index(request):
             "count_zero": count_zero,
         },
     )
-    html_response.content = pretty_html_bytes(
-        request.path, html_response.content
-    )
-    return html_response
+    return pretty_html_response(request, html_response)
 
 
 def view_list(request, category, language_code=None):
@@ -172,17 +173,7 @@ def view_list(request, category, language_code=None):
     list_licenses, list_publicdomain = get_list_paths(language_code, None)
     # Get the list of units and languages that occur among the tools
     # to let the template iterate over them as it likes.
-    legal_code_objects = (
-        LegalCode.objects.valid()
-        .filter(tool__category=category)
-        .select_related("tool")
-        .order_by(
-            "-tool__version",
-            "tool__jurisdiction_code",
-            "language_code",
-            "tool__unit",
-        )
-    )
+    legal_code_objects = find_valid_legal_codes(category)
     tools = []
     path_start = os.path.dirname(request.path)
     for lc in legal_code_objects:
@@ -264,10 +255,7 @@ def view_list(request, category, language_code=None):
             "tools": tools,
         },
     )
-    html_response.content = pretty_html_bytes(
-        request.path, html_response.content
-    )
-    return html_response
+    return pretty_html_response(request, html_response)
 
 
 def view_deed(
@@ -290,9 +278,7 @@ def view_deed(
     language_default = get_default_language_for_jurisdiction_deed(jurisdiction)
 
     try:
-        tool = Tool.objects.get(
-            unit=unit, version=version, jurisdiction_code=jurisdiction
-        )
+        tool = find_tool(unit, version, jurisdiction)
     except Tool.DoesNotExist as e:
         translation.activate(language_code)
         return view_page_not_found(request, e)
@@ -381,10 +367,7 @@ def view_deed(
             "tool_title": tool_title,
         },
     )
-    html_response.content = pretty_html_bytes(
-        request.path, html_response.content
-    )
-    return html_response
+    return pretty_html_response(request, html_response)
 
 
 def view_legal_code(
@@ -422,10 +405,7 @@ def view_legal_code(
     #         legal_code_url=request.path,
     #     )
 
-    legal_code = get_object_or_404(
-        LegalCode,
-        legal_code_url=request.path,
-    )
+    legal_code = find_legal_code_by_url(request.path, with_html=True)
 
     # Use Deeds & UX translations for title instead of Legal Code
     if language_code in settings.LANGUAGES_MOSTLY_TRANSLATED:
@@ -459,7 +439,7 @@ def view_legal_code(
 
         languages_and_links = get_languages_and_links_for_legal_codes(
             path_start=path_start,
-            legal_codes=tool.legal_codes.all(),
+            legal_codes=find_legal_codes(tool),
             selected_language_code=language_code,
         )
 
@@ -528,10 +508,7 @@ def view_legal_code(
         #         return response
         #
         html_response = render(request, **kwargs)
-        html_response.content = pretty_html_bytes(
-            request.path, html_response.content
-        )
-        return html_response
+        return pretty_html_response(request, html_response)
 
 
 def branch_status_helper(repo, translation_branch):
@@ -607,7 +584,7 @@ def view_branch_status(request, id):  # pragma: no cover
 def view_metadata_csv(request):
     csv_obj = io.StringIO()
     rows = []
-    for tool in Tool.objects.all():
+    for tool in Tool.objects.with_metadata():
         data = tool.get_metadata()
         rows.append(
             {
@@ -660,29 +637,30 @@ def view_page_not_found(request, exception, template_name="dev/404.html"):
     )
 
 
-def render_redirect(title, destination, language_code):
+def render_redirect(title, destination, language_code, defer=False):
+    """
+    Return the redirect HTML and, if its formatting was deferred, the format
+    queue arguments (see prepare_html_bytes).
+    """
     translation.activate(language_code)
     html_content = render_to_string(
         "redirect.html",
         context={"title": title, "destination": destination},
     )
-    return pretty_html_bytes(
-        f"{title} redirect to {destination}", html_content
-    )
+    return prepare_html_bytes(html_content, defer=defer)
 
 
 def view_legal_tool_rdf(
     request, category=None, unit=None, version=None, jurisdiction=None
 ):
     if category:
-        rdf_content = generate_legal_code_rdf(
+        serialized_rdf_content = generate_legal_code_rdf_xml(
             category, unit, version, jurisdiction
         )
     else:
-        rdf_content = generate_legal_code_rdf(generate_all_licenses=True)
-
-    serialized_rdf_content = rdf_content.serialize(format="pretty-xml")
-    serialized_rdf_content = order_rdf_xml(serialized_rdf_content)
+        serialized_rdf_content = generate_legal_code_rdf_xml(
+            generate_all_licenses=True
+        )
     response = HttpResponse(
         serialized_rdf_content, content_type="application/rdf+xml"
     )
@@ -691,8 +669,7 @@ def view_legal_tool_rdf(
 
 def view_image_rdf(request):
     generated_image_rdf = generate_images_rdf()
-    serialized_rdf_content = generated_image_rdf.serialize(format="pretty-xml")
-    serialized_rdf_content = order_rdf_xml(serialized_rdf_content)
+    serialized_rdf_content = serialize_rdf(generated_image_rdf)
     response = HttpResponse(
         serialized_rdf_content, content_type="application/rdf+xml"
     )
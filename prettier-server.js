@@ -3,23 +3,86 @@ const prettier = require("prettier");
 
 const app = express();
 
+// Documents that Prettier can't format are reported with status 422 so that
+// clients only retry server errors (5xx).
+//
+// Batch request and response bodies are a sequence of frames. Each frame is
+// the byte length of a document as a decimal number, a newline, and the
+// document (UTF-8). Documents are returned in the order they were received.
+const FRAME_SEPARATOR = 0x0a; // "\n"
+
+function parseFrames(buffer) {
+  const documents = [];
+  let offset = 0;
+  while (offset < buffer.length) {
+    const separator = buffer.indexOf(FRAME_SEPARATOR, offset);
+    if (separator === -1) {
+      throw new Error(`invalid frame header at byte ${offset}`);
+    }
+    const length = Number(buffer.toString("ascii", offset, separator));
+    const start = separator + 1;
+    if (!Number.isInteger(length) || start + length > buffer.length) {
+      throw new Error(`invalid frame length at byte ${offset}`);
+    }
+    documents.push(buffer.toString("utf8", start, start + length));
+    offset = start + length;
+  }
+  return documents;
+}
+
+function buildFrames(documents) {
+  const frames = [];
+  for (const document of documents) {
+    const body = Buffer.from(document, "utf8");
+    frames.push(Buffer.from(`${body.length}\n`, "ascii"), body);
+  }
+  return Buffer.concat(frames);
+}
+
 // https://expressjs.com/en/5x/api.html#express.text
 //
 // As of 2025-11-19, the largest file in cc-legal-tools-data/docs is 7.5K
-app.use(express.text({ limit: "2mb", type: "*/*" }));
-
-app.post("/", async (req, res) => {
+app.post("/", express.text({ limit: "2mb", type: "*/*" }), async (req, res) => {
   try {
     const formatted = await prettier.format(req.body, { parser: "html" });
     res.type("text/html").send(formatted);
   } catch (error) {
     res
-      .status(500)
+      .status(422)
       .type("text/plain")
       .send(`Prettier error:\n${error.message}`);
   }
 });
 
+// https://expressjs.com/en/5x/api.html#express.raw
+app.post(
+  "/batch",
+  express.raw({ limit: "64mb", type: "*/*" }),
+  async (req, res) => {
+    let index = 0;
+    try {
+      const documents = parseFrames(req.body);
+      const formatted = [];
+      for (index = 0; index < documents.length; index++) {
+        formatted.push(
+          await prettier.format(documents[index], { parser: "html" }),
+        );
+      }
+      res.type("application/octet-stream").send(buildFrames(formatted));
+    } catch (error) {
+      res
+        .status(422)
+        .type("text/plain")
+        .send(`Prettier error (batch document ${index}):\n${error.message}`);
+    }
+  },
+);
+
+// The Prettier version is part of the keys of the publish format cache
+app.get("/version", (req, res) => {
+  res.type("text/plain").send(prettier.version);
+});
+
 const server = app.listen(3000);
 
 process.on("SIGINT", () => {